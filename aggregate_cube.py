@@ -0,0 +1,144 @@
+"""Precomputed (country/region, year, source) cube for multi-country comparisons.
+
+Comparing N countries from the wide table means N filter-and-melt passes.
+``AggregateCube`` lays the per-source consumption out once as a dense
+float32 array indexed by (entity, year, source), next to per-entity primary
+energy and population (entity, year), and derives two more measures from
+them:
+
+* ``consumption`` - TWh
+* ``share``       - percent of the entity's primary energy consumption
+* ``per_capita``  - kWh per person
+
+Entities are every country and region row of the dataset (World, continents,
+income groups, ...), so regional comparisons are lookups too. A comparison of
+N entities is then one fancy-indexed slice of the cube; ``rollup`` combines
+entities into one series, summing consumption and re-deriving share and
+per-capita values from the summed totals rather than adding percentages.
+
+For the real dataset (~220 entities x 123 years x 9 sources) the cube holds
+about 3 MB; it is built on first use per data snapshot, and a data refresh
+(data_refresh.py) only rewrites the entities whose rows changed.
+"""
+import copy
+
+from data_store import ENERGY_SOURCES, get_snapshot, register_derived_update
+from startup import lazy_import
+
+np = lazy_import('numpy')
+
+MEASURES = ('consumption', 'share', 'per_capita')
+MEASURE_LABELS = {
+    'consumption': 'Consumption (TWh)',
+    'share': 'Share of Primary Energy (%)',
+    'per_capita': 'Per Capita (kWh)',
+}
+TWH_TO_KWH = 1e9
+
+
+def _ratio(numerator, denominator, scale):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = numerator / denominator * scale
+    values[~np.isfinite(values)] = np.nan
+    return values.astype('float32')
+
+
+def _sum_sources(block):
+    """Sum the last axis, NaN where every source is missing."""
+    return np.where(np.isnan(block).all(axis=-1), np.nan, np.nansum(block, axis=-1))
+
+
+class AggregateCube:
+    def __init__(self, df, sources=ENERGY_SOURCES):
+        years = df['year'].to_numpy()
+        self.entities = list(df['country'].cat.categories)
+        self.entity_index = {name: i for i, name in enumerate(self.entities)}
+        self.sources = [source for source in sources if source in df.columns]
+        self.source_index = {source: i for i, source in enumerate(self.sources)}
+        self.years = np.arange(int(years.min()), int(years.max()) + 1)
+
+        shape = (len(self.entities), len(self.years))
+        self.primary = np.full(shape, np.nan, dtype='float32')
+        self.population = np.full(shape, np.nan, dtype='float32')
+        # measure x entity x year x source
+        self.values = np.full((len(MEASURES),) + shape + (len(self.sources),), np.nan, dtype='float32')
+        self._fill(df, df['country'].cat.codes.to_numpy() >= 0)
+
+    def _fill(self, df, keep):
+        rows = df['country'].cat.codes.to_numpy()[keep]
+        cols = df['year'].to_numpy()[keep] - self.years[0]
+        primary = df['primary_energy_consumption'].to_numpy(dtype='float32')[keep]
+        population = df['population'].to_numpy(dtype='float32')[keep]
+        consumption = df[self.sources].to_numpy(dtype='float32')[keep]
+        self.primary[rows, cols] = primary
+        self.population[rows, cols] = population
+        self.values[0][rows, cols] = consumption
+        self.values[1][rows, cols] = _ratio(consumption, primary[:, None], 100)
+        self.values[2][rows, cols] = _ratio(consumption, population[:, None], TWH_TO_KWH)
+
+    def updated(self, df, countries):
+        """This cube for ``df``, re-reading only the rows of ``countries``.
+
+        Falls back to a full build when the entities or the year span changed.
+        """
+        years = df['year'].to_numpy()
+        if (list(df['country'].cat.categories) != self.entities or
+                int(years.min()) != self.years[0] or int(years.max()) != self.years[-1]):
+            return AggregateCube(df, self.sources)
+        cube = copy.copy(self)
+        cube.values, cube.primary, cube.population = self.values.copy(), self.primary.copy(), self.population.copy()
+        rows = [self.entity_index[country] for country in countries if country in self.entity_index]
+        cube.values[:, rows] = np.nan
+        cube.primary[rows] = np.nan
+        cube.population[rows] = np.nan
+        cube._fill(df, np.isin(df['country'].cat.codes.to_numpy(), rows))
+        return cube
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + self.primary.nbytes + self.population.nbytes
+
+    def _axes(self, entities, sources, year_range):
+        found = [entity for entity in entities if entity in self.entity_index]
+        rows = np.array([self.entity_index[entity] for entity in found], dtype=np.intp)
+        cols = np.array([self.source_index[source] for source in sources if source in self.source_index],
+                        dtype=np.intp)
+        lo = int(np.searchsorted(self.years, year_range[0], side='left'))
+        hi = int(np.searchsorted(self.years, year_range[1], side='right'))
+        return found, rows, cols, slice(lo, hi)
+
+    def select(self, entities, sources, year_range, measure='consumption'):
+        """(entities found, years, values[entity, year]) with the selected sources summed."""
+        found, rows, cols, years = self._axes(entities, sources, year_range)
+        block = self.values[MEASURES.index(measure)][rows, years][:, :, cols]
+        return found, self.years[years], _sum_sources(block)
+
+    def rollup(self, entities, sources, year_range, measure='consumption'):
+        """(years, values[year]) for the entities combined into one series.
+
+        Per year, only entities with both a consumption value and the measure's
+        denominator contribute, so share and per-capita values stay ratios of
+        like-for-like totals.
+        """
+        _, rows, cols, years = self._axes(entities, sources, year_range)
+        consumption = _sum_sources(self.values[0][rows, years][:, :, cols])
+        if measure == 'consumption':
+            return self.years[years], _sum_sources(consumption.T)
+        denominator = (self.primary if measure == 'share' else self.population)[rows, years]
+        usable = ~np.isnan(consumption) & ~np.isnan(denominator)
+        total = np.where(usable, consumption, 0).sum(axis=0)
+        base = np.where(usable, denominator, 0).sum(axis=0)
+        values = _ratio(total, base, 100 if measure == 'share' else TWH_TO_KWH)
+        values[~usable.any(axis=0)] = np.nan
+        return self.years[years], values
+
+
+def cube_for(snapshot):
+    return snapshot.derived('aggregate_cube', lambda snapshot: AggregateCube(snapshot.df))
+
+
+def get_aggregate_cube():
+    return cube_for(get_snapshot())
+
+
+register_derived_update('aggregate_cube', lambda cube, snapshot, changes: cube.updated(snapshot.df, changes.countries))
@@ -1,14 +1,40 @@
+import gzip
+import os
+from collections import namedtuple
+from functools import lru_cache
+from urllib.parse import urlsplit
+
 import dash
-from dash import dcc, html
-from dash.dependencies import Input, Output
-import plotly.express as px
-import pandas as pd
+from dash import Patch, dcc, html
+from dash.dependencies import Input, Output, State
+from dash.exceptions import PreventUpdate
+from flask import Response, abort, jsonify, request
+
+import background_jobs
+import data_refresh
+import derived_metrics
+import fast_json
+import figure_dicts
+import http_responses
+import metrics
+import prerender
+import request_guard
+import shared_views
+import startup
+from aggregate_cube import MEASURE_LABELS, get_aggregate_cube
+from correlation_engine import get_correlation_engine
+from data_store import ENERGY_SOURCES, SOURCE_LABELS, get_country_index, get_df, get_snapshot, layout_metadata
+from figure_cache import cache_from_env
+from figure_pool import pool_from_env
+from map_frames import get_map_frames
 
-# Data load
-df = pd.read_csv('Data/World Energy Consumption.csv')
+# Executed on first use, so workers start without them (startup.py)
+np = startup.lazy_import('numpy')
+pd = startup.lazy_import('pandas')
+px = startup.lazy_import('plotly.express')
 
 # Color palette
-CHART_TEMPLATE = 'plotly_white'
+CHART_TEMPLATE = figure_dicts.CHART_TEMPLATE
 PRIMARY_COLOR = '#2C3E50'
 SECONDARY_COLOR = '#3498DB'
 ACCENT_COLOR = '#E74C3C'
@@ -18,10 +44,24 @@ TEXT_COLOR = '#2C3E50'
 # Initialize application
 app = dash.Dash(
     __name__,
-    external_stylesheets=["https://codepen.io/chriddyp/pen/bWLwgP.css"]
+    external_stylesheets=["https://codepen.io/chriddyp/pen/bWLwgP.css"],
+    hooks={'request_pre': request_guard.REQUEST_PRE_HOOK}
 )
 app.title = "World Energy Consumption Dashboard"
 server = app.server  # Expose the Flask server for deployment
+# Compressed responses and ETag/Cache-Control validators (http_responses.py)
+http_responses.init_app(server)
+# Skip callback requests a newer one from the same page replaced (request_guard.py)
+request_guard.init_app(server)
+# Reload the data when its file changes; each request reads one snapshot (data_refresh.py)
+data_refresh.init_app(server)
+
+# Sources preselected in the checklist
+DEFAULT_SOURCES = ['coal_consumption', 'oil_consumption', 'gas_consumption']
+# Regions preselected in the multi-country comparison
+COMPARISON_DEFAULTS = ['Africa', 'Asia', 'Europe', 'North America', 'South America']
+# Window lengths (years) offered by the rolling correlation heatmap
+CORRELATION_WINDOWS = [5, 10, 15, 20, 30]
 
 # Define custom style
 CUSTOM_STYLE = {
@@ -60,605 +100,810 @@ LABEL_STYLE = {
     'display': 'block'
 }
 
-# Dashboard layout
-app.layout = html.Div(style=CUSTOM_STYLE, children=[
-    
-    # Header
-    html.Div(style=HEADER_STYLE, children=[
-        html.Div(style={'maxWidth': '1200px', 'margin': '0 auto'}, children=[
-            html.H1("🌍 World Energy Consumption Dashboard", 
-                   style={'margin': '0 0 10px 0', 'fontSize': '36px', 'fontWeight': '700'}),
-            html.P("An Interactive Data Visualization Platform for Analyzing Global Energy Trends and Consumption Patterns",
-                  style={'margin': '0', 'fontSize': '16px', 'opacity': '0.9'}),
-        ])
-    ]),
-
-    # Project overview
-    html.Div(style={'maxWidth': '1200px', 'margin': '20px auto', 'padding': '0 20px'}, children=[
-        html.Div(style={**CONTROL_PANEL_STYLE, 'marginBottom': '25px'}, children=[
-            html.H3("📊 Overview", style={'color': PRIMARY_COLOR, 'marginTop': '0', 'marginBottom': '15px'}),
-            html.P([
-                "This interactive dashboard visualizes global energy consumption patterns from 1900 to 2020, covering over 200 countries and regions. ",
-                "Analyze how energy sources have evolved from fossil fuel dominance to emerging renewable adoption, explore correlations between ",
-                "economic growth (GDP) and energy demand, and track environmental impacts through greenhouse gas emissions data. ",
-                "The platform combines 11 different visualization types to provide comprehensive insights into the global energy transition."
-            ], style={'lineHeight': '1.6', 'marginBottom': '10px'}),
-            html.P([
-                html.Strong("Dataset: "), 
-                html.A("World Energy Consumption (1900-2020)", 
-                       href="https://www.kaggle.com/datasets/pralabhpoudel/world-energy-consumption", 
-                       target="_blank",
-                       style={'color': PRIMARY_COLOR, 'textDecoration': 'none', 'fontWeight': 'bold'}),
-                " | ",
-                html.Strong("Coverage: "), "200+ Countries & Regions | ",
-                html.Strong("Sources: "), "Coal, Oil, Gas, Nuclear, Hydro, Solar, Wind, Biofuel, Other Renewables | ",
-                html.Strong("Key Metrics: "), "Primary Energy (TWh), GDP (USD), GHG Emissions (Mt CO₂), Population"
-            ], style={'lineHeight': '1.6', 'fontSize': '14px', 'color': '#555'}),
+# Background job progress bar (map card)
+PROGRESS_SHOWN = {'display': 'block', 'width': '100%', 'height': '6px'}
+PROGRESS_HIDDEN = {'display': 'none'}
+
+
+# Dashboard layout, built per page load so the controls follow data refreshes.
+# Built from the saved layout metadata, so a fresh worker serves it without loading the data.
+def serve_layout():
+    meta = layout_metadata()
+    first_year, last_year = meta['years']
+    return html.Div(style=CUSTOM_STYLE, children=[
+        # The shared view's state is read from the query on load and written by the Share button
+        dcc.Location(id='url', refresh=False),
+        dcc.Store(id='shared-view-query'),
+
+        # Header
+        html.Div(style=HEADER_STYLE, children=[
+            html.Div(style={'maxWidth': '1200px', 'margin': '0 auto'}, children=[
+                html.H1("🌍 World Energy Consumption Dashboard", 
+                       style={'margin': '0 0 10px 0', 'fontSize': '36px', 'fontWeight': '700'}),
+                html.P("An Interactive Data Visualization Platform for Analyzing Global Energy Trends and Consumption Patterns",
+                      style={'margin': '0', 'fontSize': '16px', 'opacity': '0.9'}),
+            ])
         ]),
 
-        # control panel: Country, year range, and energy source filters
-        html.Div(style=CONTROL_PANEL_STYLE, children=[
-            html.H3("⚙️ Controls", style={'color': PRIMARY_COLOR, 'marginTop': '0', 'marginBottom': '20px'}),
-            
-            # Country/Region selector
-            html.Div(style=SECTION_STYLE, children=[
-                html.Label("Select Country / Region:", style=LABEL_STYLE),
-                dcc.Dropdown(
-                    id='country-dropdown',
-                    options=[{'label': str(country).title(), 'value': country} for country in df['country'].unique()],
-                    value='World',
-                    style={'marginBottom': '10px'},
-                    clearable=False
-                ),
-                html.P("Choose a specific country or 'World' for global aggregated data.", 
-                      style={'fontSize': '12px', 'color': '#777', 'marginTop': '5px', 'fontStyle': 'italic'})
+        # Project overview
+        html.Div(style={'maxWidth': '1200px', 'margin': '20px auto', 'padding': '0 20px'}, children=[
+            html.Div(style={**CONTROL_PANEL_STYLE, 'marginBottom': '25px'}, children=[
+                html.H3("📊 Overview", style={'color': PRIMARY_COLOR, 'marginTop': '0', 'marginBottom': '15px'}),
+                html.P([
+                    "This interactive dashboard visualizes global energy consumption patterns from 1900 to 2020, covering over 200 countries and regions. ",
+                    "Analyze how energy sources have evolved from fossil fuel dominance to emerging renewable adoption, explore correlations between ",
+                    "economic growth (GDP) and energy demand, and track environmental impacts through greenhouse gas emissions data. ",
+                    "The platform combines 11 different visualization types to provide comprehensive insights into the global energy transition."
+                ], style={'lineHeight': '1.6', 'marginBottom': '10px'}),
+                html.P([
+                    html.Strong("Dataset: "), 
+                    html.A("World Energy Consumption (1900-2020)", 
+                           href="https://www.kaggle.com/datasets/pralabhpoudel/world-energy-consumption", 
+                           target="_blank",
+                           style={'color': PRIMARY_COLOR, 'textDecoration': 'none', 'fontWeight': 'bold'}),
+                    " | ",
+                    html.Strong("Coverage: "), "200+ Countries & Regions | ",
+                    html.Strong("Sources: "), "Coal, Oil, Gas, Nuclear, Hydro, Solar, Wind, Biofuel, Other Renewables | ",
+                    html.Strong("Key Metrics: "), "Primary Energy (TWh), GDP (USD), GHG Emissions (Mt CO₂), Population"
+                ], style={'lineHeight': '1.6', 'fontSize': '14px', 'color': '#555'}),
             ]),
 
-            # Time period selector
-            html.Div(style=SECTION_STYLE, children=[
-                html.Label("Select Year Range:", style=LABEL_STYLE),
-                dcc.RangeSlider(
-                    id='year-slider',
-                    min=df['year'].min(),
-                    max=df['year'].max(),
-                    value=[df['year'].min(), df['year'].max()],
-                    marks={str(year): {'label': str(year), 'style': {'fontSize': '11px'}} 
-                           for year in df['year'].unique() if year % 10 == 0},
-                    tooltip={"placement": "bottom", "always_visible": False}
-                ),
-                html.P("Adjust the slider to analyze trends within a specific time period.", 
-                      style={'fontSize': '12px', 'color': '#777', 'marginTop': '15px', 'fontStyle': 'italic'})
-            ]),
+            # control panel: Country, year range, and energy source filters
+            html.Div(style=CONTROL_PANEL_STYLE, children=[
+                html.H3("⚙️ Controls", style={'color': PRIMARY_COLOR, 'marginTop': '0', 'marginBottom': '20px'}),
 
-            # Energy source selector
-            html.Div(style=SECTION_STYLE, children=[
-                html.Label("Select Energy Sources to Analyze:", style=LABEL_STYLE),
-                dcc.Checklist(
-                    id='energy-source-checklist',
-                    options=[{'label': ' ' + source.replace('_consumption', '').replace('_', ' ').title(), 'value': source} 
-                            for source in ['coal_consumption', 'oil_consumption', 'gas_consumption', 'nuclear_consumption', 
-                                          'hydro_consumption', 'solar_consumption', 'wind_consumption', 
-                                          'biofuel_consumption', 'other_renewable_consumption']],
-                    value=['coal_consumption', 'oil_consumption', 'gas_consumption'],
-                    labelStyle={'display': 'inline-block', 'marginRight': '15px', 'marginBottom': '8px'},
-                    style={'marginTop': '10px'}
-                ),
-                html.P("These selections will filter data in the Pie Chart, Trend Chart, Heatmap, Stacked Area, Stream Graph, Sunburst, and Treemap.", 
-                      style={'fontSize': '12px', 'color': '#777', 'marginTop': '10px', 'fontStyle': 'italic'})
-            ]),
-        ])        
-    ]),
+                # Country/Region selector
+                html.Div(style=SECTION_STYLE, children=[
+                    html.Label("Select Country / Region:", style=LABEL_STYLE),
+                    dcc.Dropdown(
+                        id='country-dropdown',
+                        options=[{'label': country.title(), 'value': country} for country in meta['countries']],
+                        value='World',
+                        style={'marginBottom': '10px'},
+                        clearable=False
+                    ),
+                    html.P("Choose a specific country or 'World' for global aggregated data.", 
+                          style={'fontSize': '12px', 'color': '#777', 'marginTop': '5px', 'fontStyle': 'italic'})
+                ]),
 
-    # Visualization charts and graphs
-    html.Div(style={'maxWidth': '1200px', 'margin': '0 auto', 'padding': '0 20px'}, children=[
+                # Time period selector
+                html.Div(style=SECTION_STYLE, children=[
+                    html.Label(["Select Year Range: ",
+                                html.Span(f"{first_year} – {last_year}", id='year-slider-readout')],
+                               style=LABEL_STYLE),
+                    # value changes on release only; drag_value drives the readout above
+                    dcc.RangeSlider(
+                        id='year-slider',
+                        min=first_year,
+                        max=last_year,
+                        value=[first_year, last_year],
+                        marks={str(year): {'label': str(year), 'style': {'fontSize': '11px'}} 
+                               for year in meta['decades']},
+                        tooltip={"placement": "bottom", "always_visible": False},
+                        updatemode='mouseup'
+                    ),
+                    dcc.Store(id='year-slider-settled', data=[first_year, last_year]),
+                    html.P("Adjust the slider to analyze trends within a specific time period.", 
+                          style={'fontSize': '12px', 'color': '#777', 'marginTop': '15px', 'fontStyle': 'italic'})
+                ]),
         
-        # First row: Energy Mix (Pie Chart) and Total Primary Energy Consumption (Line Chart)
-        html.Div([
-            html.Div([
-                html.Div(style={ 'backgroundColor': 'white', 'padding': '15px', 'borderRadius': '8px', 'boxShadow': '0 2px 8px rgba(0,0,0,0.1)', 'height': '100%'}, children=[
-                    html.H4("🥧 Energy Mix (Pie Chart)", style={'color': SECONDARY_COLOR, 'marginTop': '0'}),
-                    html.P("Displays the proportional distribution of selected energy sources for the latest year in the chosen range. Use this to understand which sources dominate the energy mix.", 
-                          style={'fontSize': '13px', 'color': '#666', 'marginBottom': '15px'}),
-                    dcc.Loading(dcc.Graph(id='energy-mix-pie-chart'))
-                ])
-            ], className="six columns"),
-            html.Div([
-                html.Div(style={'backgroundColor': 'white', 'padding': '15px', 'borderRadius': '8px', 'boxShadow': '0 2px 8px rgba(0,0,0,0.1)', 'height': '100%'}, children=[
-                    html.H4("📉 Total Primary Energy Consumption (Line Chart)", style={'color': SECONDARY_COLOR, 'marginTop': '0'}),
-                    html.P("Shows the overall trend of total primary energy consumption over the selected time period. Increasing trends indicate growing energy demand.", 
-                          style={'fontSize': '13px', 'color': '#666', 'marginBottom': '15px'}),
-                    dcc.Loading(dcc.Graph(id='primary-energy-consumption-line-chart'))
-                ])
-            ], className="six columns"),
-        ], className="row", style={'marginBottom': '20px'}),
-
-        # Row 2: Energy Source Trend Chart & Stacked Area Chart
-        html.Div([
-            html.Div([
-                html.Div(style={'backgroundColor': 'white', 'padding': '15px', 'borderRadius': '8px', 'boxShadow': '0 2px 8px rgba(0,0,0,0.1)', 'height': '100%'}, children=[
-                    html.H4("📊 Energy Source Trends (Multi-Line Chart)", style={'color': SECONDARY_COLOR, 'marginTop': '0'}),
-                    html.P("Compares the absolute consumption trends of selected energy sources over time. Each line represents a different source, allowing for direct comparison of growth rates.", 
-                          style={'fontSize': '13px', 'color': '#666', 'marginBottom': '15px'}),
-                    dcc.Loading(dcc.Graph(id='energy-source-trend-chart'))
-                ])
-            ], className="six columns"),
+                # Energy source selector
+                html.Div(style=SECTION_STYLE, children=[
+                    html.Label("Select Energy Sources to Analyze:", style=LABEL_STYLE),
+                    dcc.Checklist(
+                        id='energy-source-checklist',
+                        options=[{'label': ' ' + SOURCE_LABELS[source], 'value': source}
+                                for source in ENERGY_SOURCES],
+                        value=DEFAULT_SOURCES,
+                        labelStyle={'display': 'inline-block', 'marginRight': '15px', 'marginBottom': '8px'},
+                        style={'marginTop': '10px'}
+                    ),
+                    html.P("These selections will filter data in the Pie Chart, Trend Chart, Heatmap, Stacked Area, Stream Graph, Sunburst, and Treemap.", 
+                          style={'fontSize': '12px', 'color': '#777', 'marginTop': '10px', 'fontStyle': 'italic'})
+                ]),
+
+                # Shareable link to the current view
+                html.Div(style=SECTION_STYLE, children=[
+                    html.Label("Share This View:", style=LABEL_STYLE),
+                    html.Div(style={'display': 'flex', 'gap': '8px', 'alignItems': 'center'}, children=[
+                        html.Button("🔗 Create Link", id='share-button', n_clicks=0, style={'marginBottom': '0'}),
+                        dcc.Input(id='share-link', type='text', readOnly=True, placeholder='Link to the current controls',
+                                  style={'flex': '1', 'marginBottom': '0'}),
+                        dcc.Clipboard(target_id='share-link', title='Copy link', style={'fontSize': '20px'})
+                    ]),
+                    html.P("The link restores the country, year range, sources and map settings; its charts are stored with it and open without being rebuilt.",
+                          style={'fontSize': '12px', 'color': '#777', 'marginTop': '10px', 'fontStyle': 'italic'})
+                ]),
+            ])        
+        ]),
+
+        # Visualization charts and graphs
+        html.Div(style={'maxWidth': '1200px', 'margin': '0 auto', 'padding': '0 20px'}, children=[
+        
+            # First row: Energy Mix (Pie Chart) and Total Primary Energy Consumption (Line Chart)
             html.Div([
-                html.Div(style={'backgroundColor': 'white', 'padding': '15px', 'borderRadius': '8px', 'boxShadow': '0 2px 8px rgba(0,0,0,0.1)', 'height': '100%'}, children=[
-                    html.H4("📈 Stacked Energy Composition (Area Chart)", style={'color': SECONDARY_COLOR, 'marginTop': '0'}),
-                    html.P("Illustrates the absolute contribution of each selected energy source to total consumption over time. The total height shows combined consumption, while each color represents a source.", 
-                          style={'fontSize': '13px', 'color': '#666', 'marginBottom': '15px'}),
-                    dcc.Loading(dcc.Graph(id='stacked-area-chart'))
-                ])
-            ], className="six columns"),
-        ], className="row", style={'marginBottom': '20px'}),
-
-        # Row 3: Stream Graph & Sunburst Chart
-        html.Div([
+                html.Div([
+                    html.Div(style={ 'backgroundColor': 'white', 'padding': '15px', 'borderRadius': '8px', 'boxShadow': '0 2px 8px rgba(0,0,0,0.1)', 'height': '100%'}, children=[
+                        html.H4("🥧 Energy Mix (Pie Chart)", style={'color': SECONDARY_COLOR, 'marginTop': '0'}),
+                        html.P("Displays the proportional distribution of selected energy sources for the latest year in the chosen range. Use this to understand which sources dominate the energy mix.", 
+                              style={'fontSize': '13px', 'color': '#666', 'marginBottom': '15px'}),
+                        dcc.Loading(dcc.Graph(id='energy-mix-pie-chart'))
+                    ])
+                ], className="six columns"),
+                html.Div([
+                    html.Div(style={'backgroundColor': 'white', 'padding': '15px', 'borderRadius': '8px', 'boxShadow': '0 2px 8px rgba(0,0,0,0.1)', 'height': '100%'}, children=[
+                        html.H4("📉 Total Primary Energy Consumption (Line Chart)", style={'color': SECONDARY_COLOR, 'marginTop': '0'}),
+                        html.P("Shows the overall trend of total primary energy consumption over the selected time period. Increasing trends indicate growing energy demand.", 
+                              style={'fontSize': '13px', 'color': '#666', 'marginBottom': '15px'}),
+                        dcc.Loading([dcc.Store(id='primary-energy-consumption-line-chart-series'), dcc.Graph(id='primary-energy-consumption-line-chart')])
+                    ])
+                ], className="six columns"),
+            ], className="row", style={'marginBottom': '20px'}),
+
+            # Row 2: Energy Source Trend Chart & Stacked Area Chart
             html.Div([
-                html.Div(style={'backgroundColor': 'white', 'padding': '15px', 'borderRadius': '8px', 'boxShadow': '0 2px 8px rgba(0,0,0,0.1)', 'height': '100%'}, children=[
-                    html.H4("🌊 Proportional Energy Mix Over Time (Stream Graph)", style={'color': SECONDARY_COLOR, 'marginTop': '0'}),
-                    html.P("Shows the relative share (percentage) of each selected energy source over time. All sources sum to 100%, revealing shifts in the energy portfolio composition.", 
-                          style={'fontSize': '13px', 'color': '#666', 'marginBottom': '15px'}),
-                    dcc.Loading(dcc.Graph(id='stream-graph'))
-                ])
-            ], className="six columns"),
+                html.Div([
+                    html.Div(style={'backgroundColor': 'white', 'padding': '15px', 'borderRadius': '8px', 'boxShadow': '0 2px 8px rgba(0,0,0,0.1)', 'height': '100%'}, children=[
+                        html.H4("📊 Energy Source Trends (Multi-Line Chart)", style={'color': SECONDARY_COLOR, 'marginTop': '0'}),
+                        html.P("Compares the absolute consumption trends of selected energy sources over time. Each line represents a different source, allowing for direct comparison of growth rates.", 
+                              style={'fontSize': '13px', 'color': '#666', 'marginBottom': '15px'}),
+                        dcc.Loading([dcc.Store(id='energy-source-trend-chart-series'), dcc.Graph(id='energy-source-trend-chart')])
+                    ])
+                ], className="six columns"),
+                html.Div([
+                    html.Div(style={'backgroundColor': 'white', 'padding': '15px', 'borderRadius': '8px', 'boxShadow': '0 2px 8px rgba(0,0,0,0.1)', 'height': '100%'}, children=[
+                        html.H4("📈 Stacked Energy Composition (Area Chart)", style={'color': SECONDARY_COLOR, 'marginTop': '0'}),
+                        html.P("Illustrates the absolute contribution of each selected energy source to total consumption over time. The total height shows combined consumption, while each color represents a source.", 
+                              style={'fontSize': '13px', 'color': '#666', 'marginBottom': '15px'}),
+                        dcc.Loading([dcc.Store(id='stacked-area-chart-series'), dcc.Graph(id='stacked-area-chart')])
+                    ])
+                ], className="six columns"),
+            ], className="row", style={'marginBottom': '20px'}),
+
+            # Row 3: Stream Graph & Sunburst Chart
             html.Div([
-                html.Div(style={'backgroundColor': 'white', 'padding': '15px', 'borderRadius': '8px', 'boxShadow': '0 2px 8px rgba(0,0,0,0.1)', 'height': '100%'}, children=[
-                    html.H4("☀️ Energy Mix Hierarchy (Sunburst Chart)", style={'color': SECONDARY_COLOR, 'marginTop': '0'}),
-                    html.P("A radial representation of the energy mix for the latest year. The interactive circular design provides an alternative part-to-whole view of selected sources.", 
-                          style={'fontSize': '13px', 'color': '#666', 'marginBottom': '15px'}),
-                    dcc.Loading(dcc.Graph(id='sunburst-chart'))
-                ])
-            ], className="six columns"),
-        ], className="row", style={'marginBottom': '20px'}),
-
-        # Row 4: Map
-        html.Div([
+                html.Div([
+                    html.Div(style={'backgroundColor': 'white', 'padding': '15px', 'borderRadius': '8px', 'boxShadow': '0 2px 8px rgba(0,0,0,0.1)', 'height': '100%'}, children=[
+                        html.H4("🌊 Proportional Energy Mix Over Time (Stream Graph)", style={'color': SECONDARY_COLOR, 'marginTop': '0'}),
+                        html.P("Shows the relative share (percentage) of each selected energy source over time. All sources sum to 100%, revealing shifts in the energy portfolio composition.", 
+                              style={'fontSize': '13px', 'color': '#666', 'marginBottom': '15px'}),
+                        dcc.Loading([dcc.Store(id='stream-graph-series'), dcc.Graph(id='stream-graph')])
+                    ])
+                ], className="six columns"),
+                html.Div([
+                    html.Div(style={'backgroundColor': 'white', 'padding': '15px', 'borderRadius': '8px', 'boxShadow': '0 2px 8px rgba(0,0,0,0.1)', 'height': '100%'}, children=[
+                        html.H4("☀️ Energy Mix Hierarchy (Sunburst Chart)", style={'color': SECONDARY_COLOR, 'marginTop': '0'}),
+                        html.P("A radial representation of the energy mix for the latest year. The interactive circular design provides an alternative part-to-whole view of selected sources.", 
+                              style={'fontSize': '13px', 'color': '#666', 'marginBottom': '15px'}),
+                        dcc.Loading(dcc.Graph(id='sunburst-chart'))
+                    ])
+                ], className="six columns"),
+            ], className="row", style={'marginBottom': '20px'}),
+
+            # Row 4: Map
             html.Div([
-                html.Div(style={'backgroundColor': 'white', 'padding': '15px', 'borderRadius': '8px', 'boxShadow': '0 2px 8px rgba(0,0,0,0.1)', 'height': '100%'}, children=[
-                    html.H4("🌍 Interactive Global Energy Map", style={'color': SECONDARY_COLOR, 'marginTop': '0'}),
-                    html.P("Geographic visualization of global primary energy consumption. Switch between different map projections to explore consumption patterns across countries.", 
-                          style={'fontSize': '13px', 'color': '#666', 'marginBottom': '15px'}),
+                html.Div([
+                    html.Div(style={'backgroundColor': 'white', 'padding': '15px', 'borderRadius': '8px', 'boxShadow': '0 2px 8px rgba(0,0,0,0.1)', 'height': '100%'}, children=[
+                        html.H4("🌍 Interactive Global Energy Map", style={'color': SECONDARY_COLOR, 'marginTop': '0'}),
+                        html.P("Geographic visualization of global primary energy consumption. Switch between different map projections to explore consumption patterns across countries.", 
+                              style={'fontSize': '13px', 'color': '#666', 'marginBottom': '15px'}),
+
+                        # All controls
+                        html.Div(style={'display': 'grid', 'gridTemplateColumns': '2fr 1.8fr 0.7fr 0.9fr', 'gap': '12px', 'alignItems': 'end', 'marginBottom': '15px'}, children=[
+                            html.Div(children=[
+                                html.Label("Select Energy Metric:", style={'fontWeight': '600', 'color': PRIMARY_COLOR, 'marginBottom': '8px', 'fontSize': '13px', 'display': 'block'}),
+                                dcc.Dropdown(
+                                    id='map-metric-dropdown',
+                                    options=[
+                                        {'label': '⚡ Total Primary Energy', 'value': 'primary_energy_consumption'},
+                                        {'label': '⛏️ Coal Consumption', 'value': 'coal_consumption'},
+                                        {'label': '🛢️ Oil Consumption', 'value': 'oil_consumption'},
+                                        {'label': '🔥 Gas Consumption', 'value': 'gas_consumption'},
+                                        {'label': '☢️ Nuclear Energy', 'value': 'nuclear_consumption'},
+                                        {'label': '💧 Hydro Power', 'value': 'hydro_consumption'},
+                                        {'label': '☀️ Solar Energy', 'value': 'solar_consumption'},
+                                        {'label': '💨 Wind Energy', 'value': 'wind_consumption'},
+                                        {'label': '🌱 Renewables (Total)', 'value': 'renewables_consumption'}
+                                    ],
+                                    value='primary_energy_consumption',
+                                    clearable=False
+                                )
+                            ]),
+                            html.Div(children=[
+                                html.Label("Select Map Projection:", style={'fontWeight': '600', 'color': PRIMARY_COLOR, 'marginBottom': '8px', 'fontSize': '13px', 'display': 'block'}),
+                                dcc.Dropdown(
+                                    id='map-projection-dropdown',
+                                    options=[
+                                        {'label': '🗺️  2D Natural Earth', 'value': 'natural earth'},
+                                        {'label': '🌐  3D Globe', 'value': 'orthographic'},
+                                        {'label': '📐  2D Equirectangular', 'value': 'equirectangular'},
+                                        {'label': '🌍  2D Robinson', 'value': 'robinson'},
+                                        {'label': '🧭  2D Mercator', 'value': 'mercator'}
+                                    ],
+                                    value='natural earth',
+                                    clearable=False,
+                                    style={'fontSize': '13px'}
+                                )
+                            ]),
+                            html.Div(children=[
+                                html.Label("Normalize:", style={'fontWeight': '600', 'color': PRIMARY_COLOR, 'marginBottom': '8px', 'fontSize': '13px', 'display': 'block'}),
+                                dcc.Checklist(
+                                    id='map-percapita-toggle',
+                                    options=[{'label': ' Per Capita', 'value': 'per_capita'}],
+                                    value=[],
+                                    inputStyle={'marginRight': '6px'},
+                                    style={'fontSize': '13px'}
+                                )
+                            ]),
+                            html.Div(children=[
+                                html.Label("Animation:", style={'fontWeight': '600', 'color': PRIMARY_COLOR, 'marginBottom': '8px', 'fontSize': '13px', 'display': 'block'}),
+                                dcc.Checklist(
+                                    id='map-animate-toggle',
+                                    options=[{'label': ' Enable', 'value': 'animate'}],
+                                    value=[],
+                                    inputStyle={'marginRight': '6px'},
+                                    style={'fontSize': '13px'}
+                                )
+                            ])
+                        ]),
                     
-                    # All controls
-                    html.Div(style={'display': 'grid', 'gridTemplateColumns': '2fr 1.8fr 0.7fr 0.9fr', 'gap': '12px', 'alignItems': 'end', 'marginBottom': '15px'}, children=[
-                        html.Div(children=[
-                            html.Label("Select Energy Metric:", style={'fontWeight': '600', 'color': PRIMARY_COLOR, 'marginBottom': '8px', 'fontSize': '13px', 'display': 'block'}),
-                            dcc.Dropdown(
-                                id='map-metric-dropdown',
-                                options=[
-                                    {'label': '⚡ Total Primary Energy', 'value': 'primary_energy_consumption'},
-                                    {'label': '⛏️ Coal Consumption', 'value': 'coal_consumption'},
-                                    {'label': '🛢️ Oil Consumption', 'value': 'oil_consumption'},
-                                    {'label': '🔥 Gas Consumption', 'value': 'gas_consumption'},
-                                    {'label': '☢️ Nuclear Energy', 'value': 'nuclear_consumption'},
-                                    {'label': '💧 Hydro Power', 'value': 'hydro_consumption'},
-                                    {'label': '☀️ Solar Energy', 'value': 'solar_consumption'},
-                                    {'label': '💨 Wind Energy', 'value': 'wind_consumption'},
-                                    {'label': '🌱 Renewables (Total)', 'value': 'renewables_consumption'}
-                                ],
-                                value='primary_energy_consumption',
-                                clearable=False
-                            )
+                        # Year slider
+                        html.Div(style={'marginBottom': '15px'}, children=[
+                            html.Label(["Select Year: ", html.Span(str(last_year), id='map-year-slider-readout')],
+                                       style={'fontWeight': '600', 'color': PRIMARY_COLOR, 'marginBottom': '8px', 'fontSize': '13px', 'display': 'block'}),
+                            dcc.Slider(
+                                id='map-year-slider',
+                                min=first_year,
+                                max=last_year,
+                                value=last_year,
+                                marks={year: {'label': str(year)} for year in meta['decades']},
+                                tooltip={'placement': 'bottom', 'always_visible': False},
+                                updatemode='mouseup'
+                            ),
+                            dcc.Store(id='map-year-slider-settled', data=last_year)
                         ]),
-                        html.Div(children=[
-                            html.Label("Select Map Projection:", style={'fontWeight': '600', 'color': PRIMARY_COLOR, 'marginBottom': '8px', 'fontSize': '13px', 'display': 'block'}),
+                    
+                        # The server fills map-figure-store for the projection family (globe / 2D);
+                        # the exact projection is applied in the browser (see clientside callbacks)
+                        dcc.Store(id='map-projection-family', data='natural earth'),
+                        # Progress of a background map build (hidden unless one is running)
+                        html.Progress(id='map-progress', value='0', max='3', style=PROGRESS_HIDDEN),
+                        dcc.Loading([dcc.Store(id='map-figure-store'), dcc.Graph(id='global-energy-map')])
+                    ])
+                ], style={'width': '100%'}),
+            ], className="row", style={'marginBottom': '20px'}),
+
+            # Row 5: GDP vs Energy Scatter & GHG Emissions Bar Chart
+            html.Div([
+                html.Div([
+                    html.Div(style={'backgroundColor': 'white', 'padding': '15px', 'borderRadius': '8px', 'boxShadow': '0 2px 8px rgba(0,0,0,0.1)', 'height': '100%'}, children=[
+                        html.H4("💰 GDP vs. Energy Consumption (Scatter Plot)", style={'color': SECONDARY_COLOR, 'marginTop': '0'}),
+                        html.P("Explores the relationship between economic output (GDP) and primary energy consumption. Each point represents a year, revealing the energy intensity of economic growth.", 
+                              style={'fontSize': '13px', 'color': '#666', 'marginBottom': '15px'}),
+                        dcc.Loading(dcc.Graph(id='gdp-vs-energy-scatter'))
+                    ])
+                ], className="six columns"),
+                html.Div([
+                    html.Div(style={'backgroundColor': 'white', 'padding': '15px', 'borderRadius': '8px', 'boxShadow': '0 2px 8px rgba(0,0,0,0.1)', 'height': '100%'}, children=[
+                        html.H4("🏭 Greenhouse Gas Emissions (Bar Chart)", style={'color': SECONDARY_COLOR, 'marginTop': '0'}),
+                        html.P("Displays annual greenhouse gas emissions trends. Rising bars indicate increasing environmental impact, while declining bars suggest improved efficiency or cleaner energy adoption.", 
+                              style={'fontSize': '13px', 'color': '#666', 'marginBottom': '15px'}),
+                        dcc.Loading([dcc.Store(id='ghg-emissions-bar-chart-series'), dcc.Graph(id='ghg-emissions-bar-chart')])
+                    ])
+                ], className="six columns"),
+            ], className="row", style={'marginBottom': '20px'}),
+
+            # Row 6: Correlation Heatmap & Energy Treemap
+            html.Div([
+                html.Div([
+                    html.Div(style={'backgroundColor': 'white', 'padding': '15px', 'borderRadius': '8px', 'boxShadow': '0 2px 8px rgba(0,0,0,0.1)', 'height': '100%'}, children=[
+                        html.H4("🔥 Energy Source Correlation (Heatmap)", style={'color': SECONDARY_COLOR, 'marginTop': '0'}),
+                        html.P("Shows statistical correlations between selected energy sources. Values near +1 indicate sources that grow together, while -1 indicates inverse relationships. The rolling view shows how each pair's correlation changes across sliding windows of years. Requires at least 2 sources.", 
+                              style={'fontSize': '13px', 'color': '#666', 'marginBottom': '15px'}),
+                        html.Div(style={'display': 'flex', 'gap': '20px', 'alignItems': 'center', 'marginBottom': '10px', 'fontSize': '13px'}, children=[
+                            dcc.RadioItems(
+                                id='correlation-view',
+                                options=[{'label': ' Matrix', 'value': 'matrix'}, {'label': ' Rolling window', 'value': 'rolling'}],
+                                value='matrix',
+                                inline=True,
+                                inputStyle={'marginRight': '6px'},
+                                labelStyle={'marginRight': '15px'}
+                            ),
                             dcc.Dropdown(
-                                id='map-projection-dropdown',
-                                options=[
-                                    {'label': '🗺️  2D Natural Earth', 'value': 'natural earth'},
-                                    {'label': '🌐  3D Globe', 'value': 'orthographic'},
-                                    {'label': '📐  2D Equirectangular', 'value': 'equirectangular'},
-                                    {'label': '🌍  2D Robinson', 'value': 'robinson'},
-                                    {'label': '🧭  2D Mercator', 'value': 'mercator'}
-                                ],
-                                value='natural earth',
+                                id='correlation-window',
+                                options=[{'label': f'{years}-year window', 'value': years} for years in CORRELATION_WINDOWS],
+                                value=10,
                                 clearable=False,
-                                style={'fontSize': '13px'}
+                                style={'width': '160px'}
                             )
                         ]),
-                        html.Div(children=[
-                            html.Label("Normalize:", style={'fontWeight': '600', 'color': PRIMARY_COLOR, 'marginBottom': '8px', 'fontSize': '13px', 'display': 'block'}),
-                            dcc.Checklist(
-                                id='map-percapita-toggle',
-                                options=[{'label': ' Per Capita', 'value': 'per_capita'}],
-                                value=[],
-                                inputStyle={'marginRight': '6px'},
-                                style={'fontSize': '13px'}
-                            )
+                        dcc.Loading(dcc.Graph(id='energy-correlation-heatmap'))
+                    ])
+                ], className="six columns"),
+                html.Div([
+                    html.Div(style={'backgroundColor': 'white', 'padding': '15px', 'borderRadius': '8px', 'boxShadow': '0 2px 8px rgba(0,0,0,0.1)', 'height': '100%'}, children=[
+                        html.H4("🌳 Energy Breakdown (Treemap)", style={'color': SECONDARY_COLOR, 'marginTop': '0'}),
+                        html.P("A hierarchical rectangle-based visualization showing the relative size of each selected energy source. Larger rectangles indicate greater consumption volumes.", 
+                              style={'fontSize': '13px', 'color': '#666', 'marginBottom': '15px'}),
+                        dcc.Loading(dcc.Graph(id='energy-treemap'))
+                    ])
+                ], className="six columns"),
+            ], className="row", style={'marginBottom': '20px'}),
+
+            # Row 7: Multi-country comparison (aggregate cube)
+            html.Div([
+                html.Div([
+                    html.Div(style={'backgroundColor': 'white', 'padding': '15px', 'borderRadius': '8px', 'boxShadow': '0 2px 8px rgba(0,0,0,0.1)', 'height': '100%'}, children=[
+                        html.H4("🌐 Multi-Country Comparison", style={'color': SECONDARY_COLOR, 'marginTop': '0'}),
+                        html.P("Compares the selected energy sources across several countries or regions over the selected year range, as absolute consumption, share of primary energy or per-capita use. The combined line treats the selection as one group.", 
+                              style={'fontSize': '13px', 'color': '#666', 'marginBottom': '15px'}),
+                        html.Div(style={'display': 'grid', 'gridTemplateColumns': '2.4fr 1.6fr 0.8fr', 'gap': '12px', 'alignItems': 'end', 'marginBottom': '15px'}, children=[
+                            html.Div(children=[
+                                html.Label("Countries / Regions:", style={'fontWeight': '600', 'color': PRIMARY_COLOR, 'marginBottom': '8px', 'fontSize': '13px', 'display': 'block'}),
+                                dcc.Dropdown(
+                                    id='comparison-countries',
+                                    options=[{'label': country.title(), 'value': country} for country in meta['countries']],
+                                    value=[c for c in COMPARISON_DEFAULTS if c in set(meta['countries'])] or ['World'],
+                                    multi=True,
+                                    style={'fontSize': '13px'}
+                                )
+                            ]),
+                            html.Div(children=[
+                                html.Label("Measure:", style={'fontWeight': '600', 'color': PRIMARY_COLOR, 'marginBottom': '8px', 'fontSize': '13px', 'display': 'block'}),
+                                dcc.RadioItems(
+                                    id='comparison-measure',
+                                    options=[{'label': ' ' + label, 'value': measure} for measure, label in MEASURE_LABELS.items()],
+                                    value='consumption',
+                                    inputStyle={'marginRight': '6px'},
+                                    labelStyle={'display': 'block'},
+                                    style={'fontSize': '13px'}
+                                )
+                            ]),
+                            html.Div(children=[
+                                dcc.Checklist(
+                                    id='comparison-rollup',
+                                    options=[{'label': ' Combined', 'value': 'rollup'}],
+                                    value=[],
+                                    inputStyle={'marginRight': '6px'},
+                                    style={'fontSize': '13px'}
+                                )
+                            ]),
                         ]),
-                        html.Div(children=[
-                            html.Label("Animation:", style={'fontWeight': '600', 'color': PRIMARY_COLOR, 'marginBottom': '8px', 'fontSize': '13px', 'display': 'block'}),
-                            dcc.Checklist(
-                                id='map-animate-toggle',
-                                options=[{'label': ' Enable', 'value': 'animate'}],
-                                value=[],
-                                inputStyle={'marginRight': '6px'},
-                                style={'fontSize': '13px'}
-                            )
-                        ])
-                    ]),
+                        dcc.Loading(dcc.Graph(id='country-comparison-chart'))
+                    ])
+                ], style={'width': '100%'}),
+            ], className="row", style={'marginBottom': '20px'}),
+        ]),
                     
-                    # Year slider
-                    html.Div(style={'marginBottom': '15px'}, children=[
-                        html.Label("Select Year:", style={'fontWeight': '600', 'color': PRIMARY_COLOR, 'marginBottom': '8px', 'fontSize': '13px', 'display': 'block'}),
-                        dcc.Slider(
-                            id='map-year-slider',
-                            min=int(df['year'].min()),
-                            max=int(df['year'].max()),
-                            value=int(df['year'].max()),
-                            marks={int(y): {'label': str(int(y))} for y in sorted(df['year'].unique()) if int(y) % 10 == 0},
-                            tooltip={'placement': 'bottom', 'always_visible': False}
-                        )
-                    ]),
+        # Footer
+        html.Div(style={'backgroundColor': PRIMARY_COLOR, 'color': 'white', 'padding': '20px', 'marginTop': '40px', 'textAlign': 'center'}, children=[
+            html.P("© 2025 World Energy Consumption Dashboard | Data Visualization Project", 
+                  style={'margin': '0', 'fontSize': '14px'}) 
+        ])
+    ])
                     
-                    dcc.Loading(dcc.Graph(id='global-energy-map'))
-                ])
-            ], style={'width': '100%'}),
-        ], className="row", style={'marginBottom': '20px'}),
 
-        # Row 5: GDP vs Energy Scatter & GHG Emissions Bar Chart
-        html.Div([
-            html.Div([
-                html.Div(style={'backgroundColor': 'white', 'padding': '15px', 'borderRadius': '8px', 'boxShadow': '0 2px 8px rgba(0,0,0,0.1)', 'height': '100%'}, children=[
-                    html.H4("💰 GDP vs. Energy Consumption (Scatter Plot)", style={'color': SECONDARY_COLOR, 'marginTop': '0'}),
-                    html.P("Explores the relationship between economic output (GDP) and primary energy consumption. Each point represents a year, revealing the energy intensity of economic growth.", 
-                          style={'fontSize': '13px', 'color': '#666', 'marginBottom': '15px'}),
-                    dcc.Loading(dcc.Graph(id='gdp-vs-energy-scatter'))
-                ])
-            ], className="six columns"),
-            html.Div([
-                html.Div(style={'backgroundColor': 'white', 'padding': '15px', 'borderRadius': '8px', 'boxShadow': '0 2px 8px rgba(0,0,0,0.1)', 'height': '100%'}, children=[
-                    html.H4("🏭 Greenhouse Gas Emissions (Bar Chart)", style={'color': SECONDARY_COLOR, 'marginTop': '0'}),
-                    html.P("Displays annual greenhouse gas emissions trends. Rising bars indicate increasing environmental impact, while declining bars suggest improved efficiency or cleaner energy adoption.", 
-                          style={'fontSize': '13px', 'color': '#666', 'marginBottom': '15px'}),
-                    dcc.Loading(dcc.Graph(id='ghg-emissions-bar-chart'))
-                ])
-            ], className="six columns"),
-        ], className="row", style={'marginBottom': '20px'}),
-
-        # Row 6: Correlation Heatmap & Energy Treemap
-        html.Div([
-            html.Div([
-                html.Div(style={'backgroundColor': 'white', 'padding': '15px', 'borderRadius': '8px', 'boxShadow': '0 2px 8px rgba(0,0,0,0.1)', 'height': '100%'}, children=[
-                    html.H4("🔥 Energy Source Correlation (Heatmap)", style={'color': SECONDARY_COLOR, 'marginTop': '0'}),
-                    html.P("Shows statistical correlations between selected energy sources. Values near +1 indicate sources that grow together, while -1 indicates inverse relationships. Requires at least 2 sources.", 
-                          style={'fontSize': '13px', 'color': '#666', 'marginBottom': '15px'}),
-                    dcc.Loading(dcc.Graph(id='energy-correlation-heatmap'))
-                ])
-            ], className="six columns"),
-            html.Div([
-                html.Div(style={'backgroundColor': 'white', 'padding': '15px', 'borderRadius': '8px', 'boxShadow': '0 2px 8px rgba(0,0,0,0.1)', 'height': '100%'}, children=[
-                    html.H4("🌳 Energy Breakdown (Treemap)", style={'color': SECONDARY_COLOR, 'marginTop': '0'}),
-                    html.P("A hierarchical rectangle-based visualization showing the relative size of each selected energy source. Larger rectangles indicate greater consumption volumes.", 
-                          style={'fontSize': '13px', 'color': '#666', 'marginBottom': '15px'}),
-                    dcc.Loading(dcc.Graph(id='energy-treemap'))
-                ])
-            ], className="six columns"),
-        ], className="row", style={'marginBottom': '20px'}),
-    ]),
-
-    # Footer
-    html.Div(style={'backgroundColor': PRIMARY_COLOR, 'color': 'white', 'padding': '20px', 'marginTop': '40px', 'textAlign': 'center'}, children=[
-        html.P("© 2025 World Energy Consumption Dashboard | Data Visualization Project", 
-              style={'margin': '0', 'fontSize': '14px'}) 
-    ])
-])
+app.layout = serve_layout
 
-# Callback for updating the graphs
-@app.callback(
-    [Output('energy-mix-pie-chart', 'figure'),
-     Output('primary-energy-consumption-line-chart', 'figure'),
-     Output('energy-correlation-heatmap', 'figure'),
-     Output('global-energy-map', 'figure'),
-     Output('energy-source-trend-chart', 'figure'),
-     Output('stacked-area-chart', 'figure'),
-     Output('stream-graph', 'figure'),
-     Output('sunburst-chart', 'figure'),
-     Output('gdp-vs-energy-scatter', 'figure'),
-     Output('ghg-emissions-bar-chart', 'figure'),
-     Output('energy-treemap', 'figure')],
-    [Input('country-dropdown', 'value'),
-     Input('year-slider', 'value'),
-     Input('energy-source-checklist', 'value'),
-     Input('map-projection-dropdown', 'value'),
-     Input('map-metric-dropdown', 'value'),
-     Input('map-percapita-toggle', 'value'),
-     Input('map-year-slider', 'value'),
-     Input('map-animate-toggle', 'value')]
-)
-def update_graphs(selected_country, selected_year, selected_energy_sources, map_projection, map_metric, percapita_toggle, map_year_value, map_animate_toggle):
-    figures = [] 
-    filtered_df = df[(df['country'] == selected_country) & 
-                     (df['year'] >= selected_year[0]) & 
-                     (df['year'] <= selected_year[1])]
+# ═══════════════════════════════════════
+# Figure builders
+# ═══════════════════════════════════════
+# Each chart is built by its own function so that every graph can be served by
+# a callback that only subscribes to the inputs that chart actually uses.
+
+def filter_country_years(selected_country, selected_year):
+    with metrics.stage('filter'):
+        return get_country_index().select(selected_country, selected_year)
+
+
+# Shared input of the source-driven charts, computed once per
+# (country, years, sources) and reused by every chart callback:
+#   filtered - the country/year rows
+#   long     - year / Energy Source / Consumption rows with a value (source-major,
+#              like DataFrame.melt), labels mapped through SOURCE_LABELS
+#   latest_year, latest - last year in range and its per-source values
+#   years, values - the rows' years and values[source, year] (NaN where missing)
+SourceData = namedtuple('SourceData', ['filtered', 'long', 'latest_year', 'latest', 'years', 'values'])
+
+
+def build_source_data(filtered_df, selected_energy_sources):
+    sources = list(selected_energy_sources or [])
+    years = filtered_df['year'].to_numpy()
+    wide = filtered_df[sources].to_numpy(dtype='float32').T
+    values = wide.ravel()
+    source_codes = np.repeat(np.arange(len(sources)), len(years))
+    has_value = ~np.isnan(values)
+    labels = np.array([SOURCE_LABELS[source] for source in sources], dtype=object)
+    long_df = pd.DataFrame({
+        'year': np.tile(years, len(sources))[has_value],
+        'Energy Source': labels[source_codes[has_value]],
+        'Consumption': values[has_value],
+    })
+    if len(years):
+        latest_year = int(years.max())
+        latest = filtered_df[sources].to_numpy(dtype='float32')[years == latest_year][0]
+    else:
+        latest_year, latest = None, None
+    return SourceData(filtered_df, long_df, latest_year, latest, years, wide)
+
+
+def source_series(source_data, selected_energy_sources):
+    """(label, years, values) of each source with data: the groups px.line(color=...) drew from ``long``."""
+    series = []
+    for source, values in zip(selected_energy_sources, source_data.values):
+        has_value = ~np.isnan(values)
+        if has_value.any():
+            series.append((SOURCE_LABELS[source], source_data.years[has_value], values[has_value]))
+    return series
+
+
+# Horizontal legend above the plot area, shared by the multi-series charts
+TOP_LEGEND = dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
 
-    # ═══ Energy Mix Pie Chart ═══
+
+@lru_cache(maxsize=64)
+def _cached_source_data(selected_country, year_range, sources, data_version):
+    filtered_df = filter_country_years(selected_country, year_range)
+    with metrics.stage('transform'):
+        return build_source_data(filtered_df, list(sources))
+
+
+def get_source_data(selected_country, year_range, sources):
+    return _cached_source_data(selected_country, tuple(year_range), tuple(sources),
+                               get_snapshot().country_versions.get(selected_country))
+
+
+# ═══ Energy Mix Pie Chart ═══
+def build_pie_chart(source_data, selected_country, selected_energy_sources):
     try:
         if not selected_energy_sources:
-            pie_chart_figure = px.pie(
-                values=[1], 
-                names=['No Data'],
-                title='Please Select At Least One Energy Source',
-                template=CHART_TEMPLATE
-            )
-            pie_chart_figure.update_layout(showlegend=False)
+            pie_chart_figure = figure_dicts.pie([1], ['No Data'], 'Please Select At Least One Energy Source')
+            pie_chart_figure['layout']['showlegend'] = False
         else:
-            latest_year_df = filtered_df[filtered_df['year'] == filtered_df['year'].max()]
-            
-            if not latest_year_df.empty:
-                energy_values = latest_year_df[selected_energy_sources].iloc[0].values
-                energy_labels = [source.replace('_consumption', '').replace('_', ' ').title() for source in selected_energy_sources]
-
-                pie_chart_figure = px.pie(
-                    values=energy_values,
-                    names=energy_labels,
-                    title=f'Energy Mix for {selected_country} ({int(filtered_df["year"].max())})',
-                    template=CHART_TEMPLATE,
-                    color_discrete_sequence=px.colors.qualitative.Bold
-                )
-                pie_chart_figure.update_traces(
+            if source_data.latest_year is not None:
+                pie_chart_figure = figure_dicts.pie(
+                    source_data.latest,
+                    [SOURCE_LABELS[source] for source in selected_energy_sources],
+                    f'Energy Mix for {selected_country} ({source_data.latest_year})',
+                    hovertemplate='<b>%{label}</b><br>Value: %{value:.2f} TWh<br>Percent: %{percent}<extra></extra>',
+                    colorway=figure_dicts.BOLD,
                     textposition='inside', 
-                    textinfo='percent+label',
-                    hovertemplate='<b>%{label}</b><br>Value: %{value:.2f} TWh<br>Percent: %{percent}<extra></extra>'
+                    textinfo='percent+label'
                 )
             else:
-                pie_chart_figure = px.pie(values=[1], names=['No Data'], title='No Data Available', template=CHART_TEMPLATE)
-                pie_chart_figure.update_layout(showlegend=False)
+                pie_chart_figure = figure_dicts.pie([1], ['No Data'], 'No Data Available')
+                pie_chart_figure['layout']['showlegend'] = False
     except Exception as e:
-        pie_chart_figure = px.pie(values=[1], names=['Error'], title=f'Error: {str(e)}', template=CHART_TEMPLATE)
-    figures.append(pie_chart_figure)
+        pie_chart_figure = figure_dicts.pie([1], ['Error'], f'Error: {str(e)}')
+    return pie_chart_figure
+
 
-    # ═══ Primary Energy Consumption Line Chart ═══
+# ═══ Primary Energy Consumption Line Chart ═══
+def build_primary_energy_line_chart(filtered_df, selected_country):
     try: 
-        energy_data = filtered_df[['year', 'primary_energy_consumption']].dropna()
+        years = filtered_df['year'].to_numpy()
+        energy = filtered_df['primary_energy_consumption'].to_numpy()
+        has_value = ~np.isnan(energy)
         
-        if energy_data.empty:
-            line_chart_figure = px.line(
-                title=f'Total Primary Energy Consumption - {selected_country} (No data available)',
-                template=CHART_TEMPLATE
-            )
-            line_chart_figure.add_annotation(
-                text="No primary energy consumption data available for selected period",
-                xref="paper", yref="paper",
-                x=0.5, y=0.5, showarrow=False,
-                font=dict(size=14, color='gray')
-            )
+        if not has_value.any():
+            line_chart_figure = {
+                'data': [figure_dicts.xy_trace('scatter', **figure_dicts.line_props(figure_dicts.default_color()))],
+                'layout': figure_dicts.xy_layout(
+                    f'Total Primary Energy Consumption - {selected_country} (No data available)',
+                    annotations=[figure_dicts.no_data_annotation("No primary energy consumption data available for selected period")]
+                )
+            }
         else:
-            line_chart_figure = px.line(
-                energy_data,
-                x='year',
-                y='primary_energy_consumption',
-                title=f'Total Primary Energy Consumption - {selected_country}',
-                labels={'year': 'Year', 'primary_energy_consumption': 'Energy Consumption (TWh)'},
-                template=CHART_TEMPLATE
-            )
-            line_chart_figure.update_traces(line_color=SECONDARY_COLOR, line_width=3)
-            line_chart_figure.update_layout(hovermode='x unified', yaxis=dict(rangemode='tozero'))
+            line_chart_figure = {
+                'data': [figure_dicts.xy_trace(
+                    'scatter', years[has_value], energy[has_value],
+                    hovertemplate='Year=%{x}<br>Energy Consumption (TWh)=%{y}<extra></extra>',
+                    **figure_dicts.line_props(SECONDARY_COLOR, width=3)
+                )],
+                'layout': figure_dicts.xy_layout(
+                    f'Total Primary Energy Consumption - {selected_country}', 'Year', 'Energy Consumption (TWh)',
+                    yaxis=dict(rangemode='tozero'),
+                    hovermode='x unified'
+                )
+            }
     except Exception as e:
         line_chart_figure = {'layout': {'title': f'Error: {str(e)}', 'template': CHART_TEMPLATE}}
-    figures.append(line_chart_figure)
+    return line_chart_figure
 
-    # ═══ Energy Source Correlation Heatmap ═══
+
+# ═══ Energy Source Correlation Heatmap ═══
+# Correlations come from per-country prefix sums (correlation_engine.py), so
+# any year range and every window of the rolling view cost O(k²) each.
+def build_correlation_heatmap(correlation, selected_country, selected_energy_sources):
     try:
         if not selected_energy_sources or len(selected_energy_sources) < 2:
             heatmap_figure = {'layout': {'title': 'Select At Least Two Energy Sources', 'template': CHART_TEMPLATE}}
+        elif correlation is None or (correlation[1] < 2).all():
+            heatmap_figure = {'layout': {'title': 'Insufficient data for correlation analysis', 'template': CHART_TEMPLATE}}
         else: 
-            correlation_data = filtered_df[selected_energy_sources].dropna()
-            
-            if len(correlation_data) < 2:
-                heatmap_figure = {'layout': {'title': 'Insufficient data for correlation analysis', 'template': CHART_TEMPLATE}}
-            else:
-                correlation_df = correlation_data.corr()
-                clean_labels = [label.replace('_consumption', '').replace('_', ' ').title() for label in selected_energy_sources]
-                heatmap_figure = px.imshow(
-                    correlation_df,
-                    labels=dict(color="Correlation"),
-                    x=clean_labels,
-                    y=clean_labels,
-                    title=f'Energy Source Correlation Matrix - {selected_country}',
-                    template=CHART_TEMPLATE,
-                    color_continuous_scale='RdBu_r',
-                    aspect='auto'
-                )
-                heatmap_figure.update_layout(xaxis_title='Energy Source', yaxis_title='Energy Source')
+            correlation_df = pd.DataFrame(correlation[0], index=selected_energy_sources, columns=selected_energy_sources)
+            clean_labels = [SOURCE_LABELS[source] for source in selected_energy_sources]
+            heatmap_figure = px.imshow(
+                correlation_df,
+                labels=dict(color="Correlation"),
+                x=clean_labels,
+                y=clean_labels,
+                title=f'Energy Source Correlation Matrix - {selected_country}',
+                template=CHART_TEMPLATE,
+                color_continuous_scale='RdBu_r',
+                aspect='auto'
+            )
+            heatmap_figure.update_layout(xaxis_title='Energy Source', yaxis_title='Energy Source')
     except Exception as e:
         heatmap_figure = {'layout': {'title': f'Error: {str(e)}', 'template': CHART_TEMPLATE}}
-    figures.append(heatmap_figure)
+    return heatmap_figure
+
 
-    # ═══ Interactive Global Energy Map ═══
+def build_rolling_correlation_heatmap(rolling, selected_country, selected_energy_sources, window):
+    try:
+        if not selected_energy_sources or len(selected_energy_sources) < 2:
+            heatmap_figure = {'layout': {'title': 'Select At Least Two Energy Sources', 'template': CHART_TEMPLATE}}
+        elif rolling is None or not len(rolling[0]) or np.isnan(rolling[1]).all():
+            heatmap_figure = {'layout': {'title': f'Insufficient data for {window}-year rolling correlations', 'template': CHART_TEMPLATE}}
+        else:
+            end_years, correlations = rolling
+            # One row per source pair, one column per window (labelled by its last year)
+            first, second = np.triu_indices(len(selected_energy_sources), k=1)
+            pair_labels = [f'{SOURCE_LABELS[selected_energy_sources[i]]} / {SOURCE_LABELS[selected_energy_sources[j]]}'
+                           for i, j in zip(first, second)]
+            heatmap_figure = px.imshow(
+                correlations[:, first, second].T,
+                labels=dict(x='Window End Year', y='Source Pair', color="Correlation"),
+                x=end_years,
+                y=pair_labels,
+                title=f'{window}-Year Rolling Source Correlation - {selected_country}',
+                template=CHART_TEMPLATE,
+                color_continuous_scale='RdBu_r',
+                zmin=-1,
+                zmax=1,
+                aspect='auto'
+            )
+    except Exception as e:
+        heatmap_figure = {'layout': {'title': f'Error: {str(e)}', 'template': CHART_TEMPLATE}}
+    return heatmap_figure
+
+
+# ═══ Interactive Global Energy Map ═══
+# Single-year maps are assembled as plain figure dicts from the precomputed
+# per-year arrays (map_frames.py), with the template resolved once
+# (figure_dicts.template_json), because resolving it through go.Figure costs
+# more than the rest of the figure.
+MAP_MARGIN = dict(l=0, r=0, t=50, b=0)
+
+
+def build_single_year_map(year_frame, map_projection, metric_label, title, geo):
+    # Same traces px.scatter_geo / px.choropleth produce for one year
+    if map_projection == 'orthographic':
+        sizes = year_frame['value']
+        trace = dict(
+            type='scattergeo',
+            locations=year_frame['iso_code'],
+            hovertext=year_frame['country'],
+            customdata=np.column_stack([year_frame['gdp'], year_frame['population']]),
+            hovertemplate=f'<b>%{{hovertext}}</b><br><br>{metric_label}=%{{marker.color:.2f}}<br>GDP=%{{customdata[0]:,.0f}}<br>Population=%{{customdata[1]:,.0f}}<extra></extra>',
+            marker=dict(color=sizes, coloraxis='coloraxis', size=sizes, sizemode='area',
+                        sizeref=float(sizes.max()) / 20 ** 2 if len(sizes) else 1, symbol='circle'),
+            mode='markers', name='', legendgroup='', showlegend=False, geo='geo'
+        )
+        colorscale = px.colors.sequential.Plasma
+        legend = dict(tracegroupgap=0, itemsizing='constant')
+    else:
+        trace = dict(
+            type='choropleth',
+            locations=year_frame['iso_code'],
+            z=year_frame['value'],
+            hovertext=year_frame['country'],
+            hovertemplate=f'<b>%{{hovertext}}</b><br><br>{metric_label}=%{{z:.2f}}<extra></extra>',
+            coloraxis='coloraxis', name='', geo='geo'
+        )
+        colorscale = px.colors.sequential.YlOrRd
+        legend = dict(tracegroupgap=0)
+
+    steps = len(colorscale) - 1
+    return {
+        'data': [trace],
+        'layout': dict(
+            template=figure_dicts.template_json(),
+            title=dict(text=title),
+            geo=dict(domain=dict(x=[0.0, 1.0], y=[0.0, 1.0]), **geo),
+            coloraxis=dict(colorbar=dict(title=dict(text=metric_label)),
+                           colorscale=[[i / steps, color] for i, color in enumerate(colorscale)],
+                           autocolorscale=False),
+            legend=legend,
+            height=400,
+            margin=MAP_MARGIN
+        )
+    }
+
+
+def build_animated_map(map_data, map_projection, metric_col, metric_label):
+    # One px animation frame per year in map_data
+    if map_projection == 'orthographic':
+        return px.scatter_geo(
+            map_data,
+            size=metric_col,
+            animation_frame='year',
+            locations='iso_code',
+            color=metric_col,
+            hover_name='country',
+            hover_data={'gdp': ':,.0f', 'population': ':,.0f', 'iso_code': False, metric_col: ':.2f'},
+            projection='orthographic',
+            color_continuous_scale='Plasma',
+            template=CHART_TEMPLATE,
+            labels={
+                metric_col: metric_label,
+                'gdp': 'GDP',
+                'population': 'Population',
+                'country': 'Country'
+            }
+        )
+    else:
+        return px.choropleth(
+            map_data,
+            animation_frame='year',
+            locations='iso_code',
+            color=metric_col,
+            hover_name='country',
+            hover_data={'iso_code': False, metric_col: ':.2f'},
+            color_continuous_scale='YlOrRd',
+            projection=map_projection,
+            template=CHART_TEMPLATE,
+            labels={
+                metric_col: metric_label,
+                'country': 'Country'
+            }
+        )
+
+
+def build_global_energy_map(map_projection, map_metric, percapita_toggle, map_year_value, map_animate_toggle):
     try:
         # Configure selected energy metric and per-capita normalization
         metric_col = map_metric if map_metric else 'primary_energy_consumption'
         display_metric = metric_col.replace('_consumption', '').replace('_', ' ').title()
         normalize_per_capita = 'per_capita' in (percapita_toggle or [])
-
-        # Prepare dataset based on animation mode (all years vs. single year)
+        metric_label = f'{display_metric} (TWh)' if not normalize_per_capita else f"{display_metric} {derived_metrics.metric_label('per_capita')}"
         animate = 'animate' in (map_animate_toggle or [])
-        if animate:
-            map_data = df.copy()
-            # Apply per-capita normalization  if enabled
-            if normalize_per_capita and 'population' in map_data.columns:
-                map_data = map_data[map_data['population'].notna()]
-                map_data[metric_col] = (map_data[metric_col] / map_data['population']).replace([float('inf'), -float('inf')], float('nan'))
-
-            map_data = map_data.dropna(subset=[metric_col])
-        else:
-            map_year = int(map_year_value) if map_year_value is not None else int(df['year'].max())
-            map_data = df[df['year'] == map_year].copy()
-            if normalize_per_capita and 'population' in map_data.columns:
-                map_data = map_data[map_data['population'].notna()]
-                map_data[metric_col] = (map_data[metric_col] / map_data['population']).replace([float('inf'), -float('inf')], float('nan'))
-            map_data = map_data.dropna(subset=[metric_col])
-
-        # Map visualization
+
+        # Title and geo styling per projection
+        title_metric = f"{display_metric}{' Per Capita' if normalize_per_capita else ''}"
+        title_year = '' if animate else f" ({int(map_year_value)})"
+        title_template = None
         if map_projection == 'orthographic':
             # 3D globe visualization
-            common_args = dict(
-                locations='iso_code',
-                color=metric_col,
-                hover_name='country',
-                hover_data={'gdp': ':,.0f', 'population': ':,.0f', 'iso_code': False, metric_col: ':.2f'},
-                projection='orthographic',
-                color_continuous_scale='Plasma',
-                template=CHART_TEMPLATE,
-                labels={
-                    metric_col: f'{display_metric} (TWh)' if not normalize_per_capita else f'{display_metric} Per Capita',
-                    'gdp': 'GDP',
-                    'population': 'Population',
-                    'country': 'Country'
-                }
-            )
-            if animate:
-                global_map_figure = px.scatter_geo(map_data, size=metric_col, animation_frame='year', **common_args)
-            else:
-                global_map_figure = px.scatter_geo(map_data, size=metric_col, **common_args)
-            global_map_figure.update_layout(
-                title=f"🌐 Global {display_metric}{' Per Capita' if normalize_per_capita else ''} - 3D Interactive Globe" + ('' if animate else f" ({int(map_year_value)})"),
-                geo=dict(showland=True, showcountries=True, showocean=True, oceancolor='LightBlue', landcolor='rgb(243, 243, 243)', coastlinecolor='rgb(204, 204, 204)'),
-                height=400, margin=dict(l=0, r=0, t=50, b=0)
-            )
+            title = f"🌐 Global {title_metric} - 3D Interactive Globe{title_year}"
+            geo = dict(projection=dict(type='orthographic'), showland=True, showcountries=True, showocean=True,
+                       oceancolor='LightBlue', landcolor='rgb(243, 243, 243)', coastlinecolor='rgb(204, 204, 204)')
         else:
             #  2D choropleth map with country boundaries
-            common_args2d = dict(
-                locations='iso_code',
-                color=metric_col,
-                hover_name='country',
-                hover_data={'iso_code': False, metric_col: ':.2f'},
-                color_continuous_scale='YlOrRd',
-                projection=map_projection,
-                template=CHART_TEMPLATE,
-                labels={
-                    metric_col: f'{display_metric} (TWh)' if not normalize_per_capita else f'{display_metric} Per Capita',
-                    'country': 'Country'
-                }
-            )
-            if animate:
-                global_map_figure = px.choropleth(map_data, animation_frame='year', **common_args2d)
-            else:
-                global_map_figure = px.choropleth(map_data, **common_args2d)
             title_proj = map_projection.title() if isinstance(map_projection, str) else '2D'
-            title_year = '' if animate else f" ({int(map_year_value)})"
-            global_map_figure.update_layout(
-                title=f"🗺️ Global {display_metric}{' Per Capita' if normalize_per_capita else ''} - {title_proj} Projection{title_year}",
-                geo=dict(showframe=False, showcoastlines=True, projection_type=map_projection),
-                height=400, margin=dict(l=0, r=0, t=50, b=0)
-            )
+            title_template = f"🗺️ Global {title_metric} - {{projection}} Projection{title_year}"
+            title = title_template.format(projection=title_proj)
+            geo = dict(projection=dict(type=map_projection), showframe=False, showcoastlines=True)
+
+        if not animate:
+            # Single year: slice the precomputed per-year arrays
+            map_year = int(map_year_value) if map_year_value is not None else int(get_df()['year'].max())
+            with metrics.stage('filter'):
+                year_frame = get_map_frames().get(metric_col, normalize_per_capita).year(map_year)
+            with metrics.stage('build'):
+                global_map_figure = build_single_year_map(year_frame, map_projection, metric_label, title, geo)
+            if title_template:
+                global_map_figure['layout']['meta'] = dict(title_template=title_template)
+            return global_map_figure
+
+        # Animation: bounded table (year stride, countries only, rounded values)
+        with metrics.stage('transform'):
+            map_data = get_map_frames().animation(metric_col, normalize_per_capita)
+        with metrics.stage('build'):
+            global_map_figure = build_animated_map(map_data, map_projection, metric_col, metric_label)
+            global_map_figure.update_layout(title=title, geo=geo, height=400, margin=MAP_MARGIN)
+        if title_template:
+            global_map_figure.update_layout(meta=dict(title_template=title_template))
     except Exception as e:
         global_map_figure = {'layout': {'title': f'Error: {str(e)}', 'template': CHART_TEMPLATE}}
-    figures.append(global_map_figure)
+    return global_map_figure
 
-    # ═══ Energy Source Trends ═══
+
+# ═══ Energy Source Trends ═══
+def build_trend_chart(source_data, selected_country, selected_energy_sources):
     try:
         if not selected_energy_sources:
             trend_chart_figure = {'layout': {'title': 'Select Energy Sources', 'template': CHART_TEMPLATE}}
         else: 
-            trend_data = filtered_df[['year'] + selected_energy_sources].dropna(subset=selected_energy_sources, how='all')
+            series = source_series(source_data, selected_energy_sources)
             
-            if trend_data.empty:
+            if not series:
                 trend_chart_figure = {'layout': {'title': 'No data available for selected sources', 'template': CHART_TEMPLATE}}
             else:
-                trend_df = trend_data.melt(id_vars=['year'], value_vars=selected_energy_sources, 
-                                            var_name='Energy Source', value_name='Consumption')
-  
-                trend_df = trend_df.dropna(subset=['Consumption'])
-                trend_df['Energy Source'] = trend_df['Energy Source'].str.replace('_consumption', '').str.replace('_', ' ').str.title()
-                
-                trend_chart_figure = px.line(
-                    trend_df,
-                    x='year',
-                    y='Consumption',
-                    color='Energy Source',
-                    title=f'Energy Source Consumption Trends - {selected_country}',
-                    labels={'year': 'Year', 'Consumption': 'Consumption (TWh)', 'Energy Source': 'Energy Source'},
-                    template=CHART_TEMPLATE,
-                    color_discrete_sequence=px.colors.qualitative.Bold
-                )
-                trend_chart_figure.update_traces(line_width=2.5)
-                trend_chart_figure.update_layout(hovermode='x unified', legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1), yaxis=dict(rangemode='tozero'))
+                trend_chart_figure = {
+                    'data': figure_dicts.grouped_traces(series, 'Year', 'Consumption (TWh)', 'Energy Source', width=2.5),
+                    'layout': figure_dicts.xy_layout(
+                        f'Energy Source Consumption Trends - {selected_country}', 'Year', 'Consumption (TWh)',
+                        yaxis=dict(rangemode='tozero'),
+                        legend=dict(title=dict(text='Energy Source'), **TOP_LEGEND),
+                        hovermode='x unified'
+                    )
+                }
     except Exception as e:
         trend_chart_figure = {'layout': {'title': f'Error: {str(e)}', 'template': CHART_TEMPLATE}}
-    figures.append(trend_chart_figure)
+    return trend_chart_figure
+
 
-    # ═══ Stacked Energy Composition ═══
+# ═══ Stacked Energy Composition ═══
+def build_stacked_area_chart(source_data, selected_country, selected_energy_sources):
     try:
         if not selected_energy_sources:
             stacked_area_fig = {'layout': {'title': 'Select Energy Sources', 'template': CHART_TEMPLATE}}
         else: 
-            stacked_data = filtered_df[['year'] + selected_energy_sources].dropna(subset=selected_energy_sources, how='all')
+            series = source_series(source_data, selected_energy_sources)
             
-            if stacked_data.empty:
+            if not series:
                 stacked_area_fig = {'layout': {'title': 'No data available for selected sources', 'template': CHART_TEMPLATE}}
             else:
-                stacked_area_df = stacked_data.melt(id_vars='year', var_name='Energy Source', value_name='Consumption')
-
-                stacked_area_df = stacked_area_df.dropna(subset=['Consumption'])
-                stacked_area_df['Energy Source'] = stacked_area_df['Energy Source'].str.replace('_consumption', '').str.replace('_', ' ').str.title()
-                stacked_area_fig = px.area(
-                    stacked_area_df,
-                    x='year',
-                    y='Consumption',
-                    color='Energy Source',
-                    title=f'Stacked Energy Consumption - {selected_country}',
-                    labels={'year': 'Year', 'Consumption': 'Consumption (TWh)', 'Energy Source': 'Energy Source'},
-                    template=CHART_TEMPLATE,
-                    color_discrete_sequence=px.colors.qualitative.Bold
-                )
-                stacked_area_fig.update_layout(hovermode='x unified', legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1), yaxis=dict(rangemode='tozero'))
+                stacked_area_fig = {
+                    'data': figure_dicts.grouped_traces(series, 'Year', 'Consumption (TWh)', 'Energy Source', stack=True),
+                    'layout': figure_dicts.xy_layout(
+                        f'Stacked Energy Consumption - {selected_country}', 'Year', 'Consumption (TWh)',
+                        yaxis=dict(rangemode='tozero'),
+                        legend=dict(title=dict(text='Energy Source'), **TOP_LEGEND),
+                        hovermode='x unified'
+                    )
+                }
     except Exception as e:
         stacked_area_fig = {'layout': {'title': f'Error: {str(e)}', 'template': CHART_TEMPLATE}}
-    figures.append(stacked_area_fig)
+    return stacked_area_fig
+
 
-    # ═══ Proportional Energy Mix Stream Graph ═══
+# ═══ Proportional Energy Mix Stream Graph ═══
+def build_stream_graph(source_data, selected_country, selected_energy_sources):
     try:
         if not selected_energy_sources:
             stream_fig = {'layout': {'title': 'Select Energy Sources', 'template': CHART_TEMPLATE}}
         else: 
-            stream_data = filtered_df[['year'] + selected_energy_sources].dropna(subset=selected_energy_sources, how='all')
+            series = source_series(source_data, selected_energy_sources)
             
-            if stream_data.empty:
+            if not series:
                 stream_fig = {'layout': {'title': 'No data available for selected sources', 'template': CHART_TEMPLATE}}
             else:
-                stream_df = stream_data.melt(id_vars='year', var_name='Energy Source', value_name='Consumption')
-
-                stream_df = stream_df.dropna(subset=['Consumption'])
-                stream_df['Energy Source'] = stream_df['Energy Source'].str.replace('_consumption', '').str.replace('_', ' ').str.title()
-                stream_fig = px.area(
-                    stream_df,
-                    x='year',
-                    y='Consumption',
-                    color='Energy Source',
-                    groupnorm='fraction',
-                    title=f'Proportional Energy Mix Over Time - {selected_country}',
-                    labels={'year': 'Year', 'Consumption': 'Proportion', 'Energy Source': 'Energy Source'},
-                    template=CHART_TEMPLATE,
-                    color_discrete_sequence=px.colors.qualitative.Bold
-                )
-                stream_fig.update_layout(hovermode='x unified', yaxis_tickformat='.0%', legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1))
+                stream_fig = {
+                    'data': figure_dicts.grouped_traces(series, 'Year', 'Proportion', 'Energy Source',
+                                                        stack=True, groupnorm='fraction'),
+                    'layout': figure_dicts.xy_layout(
+                        f'Proportional Energy Mix Over Time - {selected_country}', 'Year', 'Proportion',
+                        yaxis=dict(tickformat='.0%'),
+                        legend=dict(title=dict(text='Energy Source'), **TOP_LEGEND),
+                        hovermode='x unified'
+                    )
+                }
     except Exception as e:
         stream_fig = {'layout': {'title': f'Error: {str(e)}', 'template': CHART_TEMPLATE}}
-    figures.append(stream_fig)
+    return stream_fig
 
-    # ═══ Energy Mix Hierarchy (Sunburst) ═══
+
+# ═══ Energy Mix Hierarchy (Sunburst) ═══
+def build_sunburst_chart(source_data, selected_country, selected_energy_sources):
     try:
         if not selected_energy_sources:
             sunburst_fig = {'layout': {'title': 'Select Energy Sources', 'template': CHART_TEMPLATE}}
         else:
-            sb_latest = filtered_df[filtered_df['year'] == filtered_df['year'].max()]
-            if sb_latest.empty:
+            if source_data.latest_year is None:
                 sunburst_fig = {'layout': {'title': 'No Data Available', 'template': CHART_TEMPLATE}}
             else:
-                sb_melt = sb_latest[selected_energy_sources]
-                sb_series = sb_melt.iloc[0]
-                sb_df = sb_series.reset_index()
-                sb_df.columns = ['Energy Source', 'Consumption']
-                sb_df['Energy Source'] = sb_df['Energy Source'].str.replace('_consumption', '').str.replace('_', ' ').str.title()
-                sb_df['All'] = 'Total Energy'
+                sb_df = pd.DataFrame({
+                    'Energy Source': [SOURCE_LABELS[source] for source in selected_energy_sources],
+                    'Consumption': source_data.latest,
+                    'All': 'Total Energy',
+                })
                 sunburst_fig = px.sunburst(
                     sb_df,
                     path=['All', 'Energy Source'],
                     values='Consumption',
-                    title=f'Energy Mix Sunburst - {selected_country} ({int(filtered_df["year"].max())})',
+                    title=f'Energy Mix Sunburst - {selected_country} ({source_data.latest_year})',
                     labels={'Consumption': 'Consumption (TWh)', 'Energy Source': 'Energy Source'},
                     template=CHART_TEMPLATE,
                     color_discrete_sequence=px.colors.qualitative.Bold
@@ -668,101 +913,102 @@ def update_graphs(selected_country, selected_year, selected_energy_sources, map_
                 )
     except Exception as e:
         sunburst_fig = {'layout': {'title': f'Error: {str(e)}', 'template': CHART_TEMPLATE}}
-    figures.append(sunburst_fig)
+    return sunburst_fig
+
 
-    # ═══ GDP vs Energy Consumption (Scatter) ═══
+# ═══ GDP vs Energy Consumption (Scatter) ═══
+def build_gdp_vs_energy_scatter(filtered_df, selected_country):
     try: 
-        scatter_data = filtered_df[['year', 'gdp', 'primary_energy_consumption']].dropna().copy()
+        gdp = filtered_df['gdp'].to_numpy()
+        energy = filtered_df['primary_energy_consumption'].to_numpy()
+        has_value = ~np.isnan(gdp) & ~np.isnan(energy)
         
-        if scatter_data.empty:
-            scatter_fig = px.scatter(
-                title=f"GDP vs. Energy Consumption - {selected_country} ",
-                template=CHART_TEMPLATE
-            )
-            scatter_fig.add_annotation(
-                text="No GDP or energy data available for selected period",
-                xref="paper", yref="paper",
-                x=0.5, y=0.5, showarrow=False,
-                font=dict(size=14, color='gray')
-            )
+        if not has_value.any():
+            scatter_fig = {
+                'data': [figure_dicts.xy_trace('scatter', mode='markers',
+                                               marker=dict(color=figure_dicts.default_color(), symbol='circle'))],
+                'layout': figure_dicts.xy_layout(
+                    f"GDP vs. Energy Consumption - {selected_country} ",
+                    annotations=[figure_dicts.no_data_annotation("No GDP or energy data available for selected period")]
+                )
+            }
         else: 
-            scatter_data['year_label'] = scatter_data['year'].astype(int).astype(str)
+            years = filtered_df['year'].to_numpy()[has_value].tolist()
+            year_labels = [str(year) for year in years]
             
-            scatter_fig = px.scatter(
-                scatter_data,
-                x="gdp",
-                y="primary_energy_consumption",
-                hover_data={'year': True, 'gdp': ':,.0f', 'primary_energy_consumption': ':.2f', 'year_label': False},
-                title=f"GDP vs. Energy Consumption - {selected_country} ({len(scatter_data)} data points)",
-                labels={
-                    'gdp': 'GDP ($)', 
-                    'primary_energy_consumption': 'Energy Consumption (TWh)', 
-                    'year': 'Year'
-                },
-                template=CHART_TEMPLATE
-            )
-            scatter_fig.update_traces(
-                marker=dict(size=20, color=SECONDARY_COLOR, line=dict(width=2, color='white'), opacity=0.8),
-                mode='markers+text',
-                text=scatter_data['year_label'],
-                textposition='top center',
-                textfont=dict(size=11, color='#2C3E50')
-            )
-            scatter_fig.update_layout(
-                showlegend=False,
-                hovermode='closest',
-                xaxis=dict(rangemode='tozero'),
-                yaxis=dict(rangemode='tozero')
-            )
+            scatter_fig = {
+                'data': [figure_dicts.xy_trace(
+                    'scatter', gdp[has_value], energy[has_value],
+                    customdata=[[year, label] for year, label in zip(years, year_labels)],
+                    hovertemplate='GDP ($)=%{x:,.0f}<br>Energy Consumption (TWh)=%{y:.2f}<br>Year=%{customdata[0]}<extra></extra>',
+                    marker=dict(size=20, color=SECONDARY_COLOR, line=dict(width=2, color='white'), opacity=0.8, symbol='circle'),
+                    mode='markers+text',
+                    text=year_labels,
+                    textposition='top center',
+                    textfont=dict(size=11, color='#2C3E50')
+                )],
+                'layout': figure_dicts.xy_layout(
+                    f"GDP vs. Energy Consumption - {selected_country} ({len(years)} data points)",
+                    'GDP ($)', 'Energy Consumption (TWh)',
+                    xaxis=dict(rangemode='tozero'),
+                    yaxis=dict(rangemode='tozero'),
+                    showlegend=False,
+                    hovermode='closest'
+                )
+            }
     except Exception as e:
         scatter_fig = {'layout': {'title': f'Error: {str(e)}', 'template': CHART_TEMPLATE}}
-    figures.append(scatter_fig)
+    return scatter_fig
+
 
-    # ═══ Greenhouse Gas Emissions ═══
+# ═══ Greenhouse Gas Emissions ═══
+def build_ghg_emissions_chart(filtered_df, selected_country):
     try: 
-        ghg_data = filtered_df[['year', 'greenhouse_gas_emissions']].dropna()
+        years = filtered_df['year'].to_numpy()
+        emissions = filtered_df['greenhouse_gas_emissions'].to_numpy()
+        has_value = ~np.isnan(emissions)
         
-        if ghg_data.empty:
-            ghg_fig = px.bar(
-                title=f"Greenhouse Gas Emissions - {selected_country} (No data available)",
-                template=CHART_TEMPLATE
-            )
-            ghg_fig.add_annotation(
-                text="No greenhouse gas emissions data available for selected period",
-                xref="paper", yref="paper",
-                x=0.5, y=0.5, showarrow=False,
-                font=dict(size=14, color='gray')
-            )
+        if not has_value.any():
+            ghg_fig = {
+                'data': [figure_dicts.xy_trace('bar', marker=dict(color=figure_dicts.default_color(), pattern=dict(shape='')),
+                                               textposition='auto')],
+                'layout': figure_dicts.xy_layout(
+                    f"Greenhouse Gas Emissions - {selected_country} (No data available)",
+                    barmode='relative',
+                    annotations=[figure_dicts.no_data_annotation("No greenhouse gas emissions data available for selected period")]
+                )
+            }
         else:
-            ghg_fig = px.bar(
-                ghg_data,
-                x="year",
-                y="greenhouse_gas_emissions",
-                title=f"Greenhouse Gas Emissions - {selected_country}",
-                labels={'year': 'Year', 'greenhouse_gas_emissions': 'GHG Emissions (Million Tonnes CO₂)'},
-                template=CHART_TEMPLATE
-            )
-            ghg_fig.update_traces(marker_color=ACCENT_COLOR)
-            ghg_fig.update_layout(yaxis=dict(rangemode='tozero'))
+            ghg_fig = {
+                'data': [figure_dicts.xy_trace(
+                    'bar', years[has_value], emissions[has_value],
+                    hovertemplate='Year=%{x}<br>GHG Emissions (Million Tonnes CO₂)=%{y}<extra></extra>',
+                    marker=dict(color=ACCENT_COLOR, pattern=dict(shape='')),
+                    textposition='auto'
+                )],
+                'layout': figure_dicts.xy_layout(
+                    f"Greenhouse Gas Emissions - {selected_country}", 'Year', 'GHG Emissions (Million Tonnes CO₂)',
+                    yaxis=dict(rangemode='tozero'),
+                    barmode='relative'
+                )
+            }
     except Exception as e:
         ghg_fig = {'layout': {'title': f'Error: {str(e)}', 'template': CHART_TEMPLATE}}
-    figures.append(ghg_fig)
+    return ghg_fig
 
-    # ═══ Energy Breakdown (Treemap) ═══
+
+# ═══ Energy Breakdown (Treemap) ═══
+def build_treemap(source_data, selected_country, selected_energy_sources):
     try:
         if not selected_energy_sources:
             treemap_fig = {'layout': {'title': 'Select Energy Sources', 'template': CHART_TEMPLATE}}
         else: 
-            treemap_df = filtered_df.melt(id_vars=['country'], value_vars=selected_energy_sources, 
-                                          var_name='Energy Source', value_name='Consumption')
-            treemap_df = treemap_df.dropna(subset=['Consumption'])
+            treemap_df = source_data.long
             treemap_df = treemap_df[treemap_df['Consumption'] > 0]
             
             if treemap_df.empty:
                 treemap_fig = {'layout': {'title': 'No data available for selected sources', 'template': CHART_TEMPLATE}}
             else:
-                treemap_df['Energy Source'] = treemap_df['Energy Source'].str.replace('_consumption', '').str.replace('_', ' ').str.title()
-                
                 treemap_fig = px.treemap(
                     treemap_df,
                     path=[px.Constant(selected_country), 'Energy Source'],
@@ -779,9 +1025,808 @@ def update_graphs(selected_country, selected_year, selected_energy_sources, map_
                 )
     except Exception as e:
         treemap_fig = {'layout': {'title': f'Error: {str(e)}', 'template': CHART_TEMPLATE}}
-    figures.append(treemap_fig)
+    return treemap_fig
+
+
+# ═══ Multi-Country Comparison ═══
+# (entities, years, values[entity, year]) for the selected sources, plus the
+# 'Combined' series when the rollup is on
+def compare_countries(selected_countries, selected_energy_sources, year_range, measure, rollup):
+    cube = get_aggregate_cube()
+    entities, years, values = cube.select(selected_countries, selected_energy_sources, year_range, measure)
+    if rollup and len(entities) > 1:
+        _, combined = cube.rollup(entities, selected_energy_sources, year_range, measure)
+        entities, values = entities + ['Combined'], np.vstack([values, combined])
+    return entities, years, values
+
+
+def build_comparison_chart(comparison, selected_energy_sources, measure):
+    try:
+        if comparison is None:
+            comparison_fig = {'layout': {'title': 'Select Countries and Energy Sources', 'template': CHART_TEMPLATE}}
+        else:
+            entities, years, values = comparison
+            series = []
+            for entity, entity_values in zip(entities, values):
+                has_value = ~np.isnan(entity_values)
+                if has_value.any():
+                    series.append((entity, years[has_value], entity_values[has_value]))
+
+            if not series:
+                comparison_fig = {'layout': {'title': 'No data available for selected countries', 'template': CHART_TEMPLATE}}
+            else:
+                sources_label = ', '.join(SOURCE_LABELS[source] for source in selected_energy_sources)
+                traces = figure_dicts.grouped_traces(series, 'Year', MEASURE_LABELS[measure], 'Country / Region', width=2.5)
+                for trace in traces:
+                    if trace['name'] == 'Combined':
+                        trace['line'].update(dash='dash', color=PRIMARY_COLOR)
+                comparison_fig = {
+                    'data': traces,
+                    'layout': figure_dicts.xy_layout(
+                        f'{MEASURE_LABELS[measure]} - {sources_label}', 'Year', MEASURE_LABELS[measure],
+                        yaxis=dict(rangemode='tozero'),
+                        legend=dict(title=dict(text='Country / Region'), **TOP_LEGEND),
+                        hovermode='x unified'
+                    )
+                }
+    except Exception as e:
+        comparison_fig = {'layout': {'title': f'Error: {str(e)}', 'template': CHART_TEMPLATE}}
+    return comparison_fig
+
+
+# ═══════════════════════════════════════
+# Callbacks
+# ═══════════════════════════════════════
+# Charts driven by country + year range (+ energy sources), keyed by graph id.
+# Order matches the dashboard's output order in FIGURE_IDS.
+SOURCE_CHART_BUILDERS = {
+    'energy-mix-pie-chart': build_pie_chart,
+    'energy-source-trend-chart': build_trend_chart,
+    'stacked-area-chart': build_stacked_area_chart,
+    'stream-graph': build_stream_graph,
+    'sunburst-chart': build_sunburst_chart,
+    'energy-treemap': build_treemap,
+}
+
+COUNTRY_CHART_BUILDERS = {
+    'primary-energy-consumption-line-chart': build_primary_energy_line_chart,
+    'gdp-vs-energy-scatter': build_gdp_vs_energy_scatter,
+    'ghg-emissions-bar-chart': build_ghg_emissions_chart,
+}
+
+FIGURE_IDS = [
+    'energy-mix-pie-chart',
+    'primary-energy-consumption-line-chart',
+    'energy-correlation-heatmap',
+    'global-energy-map',
+    'energy-source-trend-chart',
+    'stacked-area-chart',
+    'stream-graph',
+    'sunburst-chart',
+    'gdp-vs-energy-scatter',
+    'ghg-emissions-bar-chart',
+    'energy-treemap',
+]
+
+
+# ═══ Figure cache ═══
+# Figures are memoized per chart on the normalized inputs that chart uses;
+# hit/miss counters are served at /_cache/stats. FAST_JSON=1 switches
+# responses to orjson and caches figures pre-serialized (fast_json.py).
+fast_json.configure(fast_json.fast_json_from_env())
+figure_cache = cache_from_env()
+# Views pre-rendered by `python prerender.py` are served from the first request
+prerender.warm_cache(figure_cache)
+
+
+@server.route('/_cache/stats')
+def figure_cache_stats():
+    return jsonify(figure_cache.stats())
+
+
+def figure_cache_metrics():
+    charts = figure_cache.stats()['charts']
+    return metrics.counter_lines(
+        'dashboard_figure_cache_total', 'Figure cache lookups per chart and outcome.', ('chart', 'outcome'),
+        {(chart, outcome): counters[outcome] for chart, counters in charts.items() for outcome in ('hits', 'misses')})
+
+
+# Per-chart stage timings, payload sizes and trigger counts at /metrics;
+# PROFILE_REQUESTS=1 enables ?profile=1 request profiles (metrics.py)
+metrics.init_app(server, extra_metrics=figure_cache_metrics,
+                 output_aliases={'map-figure-store': 'global-energy-map'})
+
+
+# Sources in checklist order, so equivalent selections share a cache entry
+def normalize_sources(selected_energy_sources):
+    selected = set(selected_energy_sources or [])
+    return [source for source in ENERGY_SOURCES if source in selected]
+
+
+def normalize_years(selected_year):
+    return [int(selected_year[0]), int(selected_year[1])]
+
+
+def get_source_chart(graph_id, selected_country, selected_year, selected_energy_sources):
+    sources = normalize_sources(selected_energy_sources)
+    year_range = normalize_years(selected_year)
+
+    def build():
+        source_data = get_source_data(selected_country, year_range, sources)
+        request_guard.check(graph_id)
+        with metrics.stage('build'):
+            return SOURCE_CHART_BUILDERS[graph_id](source_data, selected_country, sources)
+
+    with metrics.chart(graph_id):
+        return figure_cache.get_or_build(graph_id, [selected_country, year_range, sources,
+                                                    get_snapshot().data_version([selected_country])], build)
+
+
+def get_country_chart(graph_id, selected_country, selected_year):
+    year_range = normalize_years(selected_year)
+
+    def build():
+        filtered_df = filter_country_years(selected_country, year_range)
+        request_guard.check(graph_id)
+        with metrics.stage('build'):
+            return COUNTRY_CHART_BUILDERS[graph_id](filtered_df, selected_country)
+
+    with metrics.chart(graph_id):
+        return figure_cache.get_or_build(graph_id, [selected_country, year_range,
+                                                    get_snapshot().data_version([selected_country])], build)
+
+
+def get_global_energy_map(map_projection, map_metric, percapita_toggle, map_year_value, map_animate_toggle):
+    metric = map_metric or 'primary_energy_consumption'
+    per_capita = ['per_capita'] if 'per_capita' in (percapita_toggle or []) else []
+    animate = ['animate'] if 'animate' in (map_animate_toggle or []) else []
+    snapshot = get_snapshot()
+    # The year only matters for single-year maps
+    if animate:
+        map_year = None
+    elif map_year_value is not None:
+        map_year = int(map_year_value)
+    else:
+        map_year = max(snapshot.year_versions)
+    # An animation shows every year, a single-year map only its year
+    data_version = snapshot.version if animate else snapshot.data_version(years=[map_year])
+    with metrics.chart('global-energy-map'):
+        return figure_cache.get_or_build(
+            'global-energy-map', [map_projection, metric, bool(per_capita), map_year, bool(animate), data_version],
+            lambda: build_global_energy_map(map_projection, metric, per_capita, map_year, animate)
+        )
+
+
+def get_correlation_heatmap(selected_country, selected_year, selected_energy_sources, view=None, window=None):
+    graph_id = 'energy-correlation-heatmap'
+    sources = normalize_sources(selected_energy_sources)
+    year_range = normalize_years(selected_year)
+    rolling = view == 'rolling'
+    window = int(window or 10) if rolling else None
+
+    def build():
+        correlation = None
+        if len(sources) >= 2:
+            with metrics.stage('transform'):
+                engine = get_correlation_engine()
+                if rolling:
+                    correlation = engine.rolling(selected_country, sources, year_range, window)
+                else:
+                    correlation = engine.matrix(selected_country, sources, year_range)
+        request_guard.check(graph_id)
+        with metrics.stage('build'):
+            if rolling:
+                return build_rolling_correlation_heatmap(correlation, selected_country, sources, window)
+            return build_correlation_heatmap(correlation, selected_country, sources)
+
+    with metrics.chart(graph_id):
+        return figure_cache.get_or_build(graph_id, [selected_country, year_range, sources, window,
+                                                    get_snapshot().data_version([selected_country])], build)
+
+
+def get_comparison_chart(selected_countries, selected_year, selected_energy_sources, measure, rollup_toggle):
+    countries = list(dict.fromkeys(selected_countries or []))
+    sources = normalize_sources(selected_energy_sources)
+    year_range = normalize_years(selected_year)
+    measure = measure or 'consumption'
+    rollup = 'rollup' in (rollup_toggle or [])
+
+    def build():
+        comparison = None
+        if countries and sources:
+            with metrics.stage('filter'):
+                comparison = compare_countries(countries, sources, year_range, measure, rollup)
+        with metrics.stage('build'):
+            return build_comparison_chart(comparison, sources, measure)
+
+    with metrics.chart('country-comparison-chart'):
+        return figure_cache.get_or_build('country-comparison-chart', [countries, year_range, sources, measure, rollup,
+                                                                      get_snapshot().data_version(countries)], build)
+
+
+# ═══ Slider events ═══
+# The sliders commit their value on release (updatemode='mouseup'); while a
+# handle is dragged, drag_value only updates the readout in the label. Server
+# callbacks listen to '<slider id>-settled' instead of the slider: a clientside
+# callback copies the value there once it has been stable for
+# SLIDER_SETTLE_MS, so clicks along the track or held arrow keys collapse into
+# one request per chart. request_guard then skips requests that are already
+# stale when they reach the server.
+SLIDER_SETTLE_MS = int(os.environ.get('SLIDER_SETTLE_MS', 150))
+
+SETTLE_JS = """
+function(value) {
+    var pending = window.dashboardSettle = window.dashboardSettle || {};
+    var key = 'SLIDER_ID';
+    var seq = (pending[key] || 0) + 1;
+    pending[key] = seq;
+    return new Promise(function(resolve) {
+        setTimeout(function() {
+            resolve(pending[key] === seq ? value : window.dash_clientside.no_update);
+        }, DELAY);
+    });
+}
+"""
+
+YEAR_RANGE_READOUT_JS = """
+function(range) {
+    return range ? range[0] + ' – ' + range[1] : window.dash_clientside.no_update;
+}
+"""
+
+YEAR_READOUT_JS = """
+function(year) {
+    return year !== null && year !== undefined ? String(year) : window.dash_clientside.no_update;
+}
+"""
+
+for slider_id in ('year-slider', 'map-year-slider'):
+    app.clientside_callback(SETTLE_JS.replace('SLIDER_ID', slider_id).replace('DELAY', str(SLIDER_SETTLE_MS)),
+                            Output(f'{slider_id}-settled', 'data'), Input(slider_id, 'value'),
+                            prevent_initial_call=True)
+
+app.clientside_callback(YEAR_RANGE_READOUT_JS, Output('year-slider-readout', 'children'),
+                        Input('year-slider', 'drag_value'), prevent_initial_call=True)
+app.clientside_callback(YEAR_READOUT_JS, Output('map-year-slider-readout', 'children'),
+                        Input('map-year-slider', 'drag_value'), prevent_initial_call=True)
+
+
+# ═══ Background callbacks ═══
+# Charts listed in BACKGROUND_CHARTS run as Dash background jobs in a separate
+# process (background_jobs.py); superseded jobs are killed when inputs change.
+background_manager = background_jobs.manager_from_env()
+BACKGROUND_CHARTS = background_jobs.charts_from_env() if background_manager is not None else set()
+
+
+def background_options(graph_id):
+    if graph_id not in BACKGROUND_CHARTS:
+        return {}
+    return {'background': True, 'manager': background_manager, 'interval': background_jobs.POLL_INTERVAL_MS}
+
+
+def job_result(graph_id, figure):
+    # Job results are pickled into the queue; pre-serialized figures are not picklable
+    return fast_json.to_python(figure) if graph_id in BACKGROUND_CHARTS else figure
+
+
+# ═══ Incremental year range ═══
+# The time-series charts are built over every year of the selected series and
+# the year slider only moves the axis window. When just the slider changed and
+# the browser already shows the series for this country and sources, the
+# callback returns a Patch of the axis ranges instead of the figure. Each
+# figure carries its series key in layout.meta; a clientside callback mirrors
+# it into '<graph id>-series', so a patch never lands on another series (e.g.
+# when a country change was superseded by a slider drag before it returned).
+# INCREMENTAL_YEARS=0 restores per-range figures.
+INCREMENTAL_YEARS = os.environ.get('INCREMENTAL_YEARS', '1').lower() not in ('0', 'false', 'no', 'off')
+
+
+def all_years():
+    years = get_snapshot().year_versions
+    return [min(years), max(years)]
+
+
+def value_extent(frame, column):
+    values = frame[['year', column]].dropna()
+    return values['year'].to_numpy(), values[column].to_numpy()
+
+
+def long_extent(long_df, how):
+    per_year = long_df.groupby('year', sort=True)['Consumption'].agg(how)
+    return per_year.index.to_numpy(), per_year.to_numpy()
+
+
+# graph id -> (series -> (years with data, peak plotted value per year or None))
+YEAR_WINDOW_EXTENTS = {
+    'primary-energy-consumption-line-chart': lambda filtered_df: value_extent(filtered_df, 'primary_energy_consumption'),
+    'energy-source-trend-chart': lambda source_data: long_extent(source_data.long, 'max'),
+    'stacked-area-chart': lambda source_data: long_extent(source_data.long, 'sum'),
+    'stream-graph': lambda source_data: (source_data.long['year'].unique(), None),  # shares, always 0-1
+    'ghg-emissions-bar-chart': lambda filtered_df: value_extent(filtered_df, 'greenhouse_gas_emissions'),
+}
+YEAR_WINDOW_CHARTS = [graph_id for graph_id in YEAR_WINDOW_EXTENTS if graph_id not in BACKGROUND_CHARTS] if INCREMENTAL_YEARS else []
+BAR_CHARTS = {'ghg-emissions-bar-chart'}
+
+
+# Includes the country's data version, so a refresh of its rows sends a new figure
+def series_key(selected_country, sources):
+    return f"{selected_country}|{'+'.join(sources)}|{get_snapshot().country_versions.get(selected_country)}"
+
+
+def get_series(graph_id, selected_country, sources):
+    if graph_id in SOURCE_CHART_BUILDERS:
+        return get_source_data(selected_country, all_years(), sources)
+    return filter_country_years(selected_country, all_years())
+
+
+@lru_cache(maxsize=256)
+def year_extent(graph_id, selected_country, sources, data_version):
+    series = get_series(graph_id, selected_country, list(sources))
+    with metrics.stage('transform'):
+        return YEAR_WINDOW_EXTENTS[graph_id](series)
+
+
+def window_axes(graph_id, extent, year_range):
+    """Axis ranges showing ``year_range`` of a full-series figure, as autorange would."""
+    years, peaks = extent
+    in_window = (years >= year_range[0]) & (years <= year_range[1])
+    if not in_window.any():
+        return {'xaxis': {'range': list(year_range), 'autorange': False}, 'yaxis': {'autorange': True}}
+    pad = 0.5 if graph_id in BAR_CHARTS else 0
+    axes = {'xaxis': {'range': [float(years[in_window].min()) - pad, float(years[in_window].max()) + pad],
+                      'autorange': False},
+            'yaxis': {'autorange': True}}
+    if peaks is not None:
+        axes['yaxis'] = {'range': [0, float(np.nanmax(peaks[in_window])) * 1.05], 'autorange': False}
+    return axes
+
+
+def get_year_window_chart(graph_id, selected_country, selected_year, selected_energy_sources, shown_series):
+    sources = normalize_sources(selected_energy_sources) if graph_id in SOURCE_CHART_BUILDERS else []
+    year_range = normalize_years(selected_year)
+    key = series_key(selected_country, sources)
+
+    def axes():
+        return window_axes(graph_id, year_extent(graph_id, selected_country, tuple(sources), key), year_range)
+
+    def build():
+        series = get_series(graph_id, selected_country, sources)
+        layout = dict(meta={'series': key}, **axes())
+        request_guard.check(graph_id)
+        with metrics.stage('build'):
+            if graph_id in SOURCE_CHART_BUILDERS:
+                figure = SOURCE_CHART_BUILDERS[graph_id](series, selected_country, sources)
+            else:
+                figure = COUNTRY_CHART_BUILDERS[graph_id](series, selected_country)
+            if isinstance(figure, dict):
+                # Merged like update_layout, keeping the axis titles
+                for name, value in layout.items():
+                    figure['layout'][name] = {**figure['layout'].get(name, {}), **value}
+            else:
+                figure.update_layout(layout)
+            return figure
+
+    # The cached figure already carries this range's axes, so a hit does no data work
+    with metrics.chart(graph_id):
+        if shown_series == key:
+            window = axes()
+            patch = Patch()
+            patch['layout']['xaxis'].update(window['xaxis'])
+            patch['layout']['yaxis'].update(window['yaxis'])
+            return patch
+        return figure_cache.get_or_build(graph_id, [selected_country, year_range, sources, 'series', key], build)
+
+
+def register_source_chart(graph_id):
+    if graph_id in YEAR_WINDOW_CHARTS:
+        @app.callback(
+            Output(graph_id, 'figure'),
+            [Input('country-dropdown', 'value'),
+             Input('year-slider-settled', 'data'),
+             Input('energy-source-checklist', 'value')],
+            State(f'{graph_id}-series', 'data')
+        )
+        @request_guard.skip_superseded(graph_id)
+        def update_source_chart(selected_country, selected_year, selected_energy_sources, shown_series):
+            return get_year_window_chart(graph_id, selected_country, selected_year, selected_energy_sources, shown_series)
+        return update_source_chart
+
+    @app.callback(
+        Output(graph_id, 'figure'),
+        [Input('country-dropdown', 'value'),
+         Input('year-slider-settled', 'data'),
+         Input('energy-source-checklist', 'value')],
+        **background_options(graph_id)
+    )
+    @request_guard.skip_superseded(graph_id)
+    def update_source_chart(selected_country, selected_year, selected_energy_sources):
+        return job_result(graph_id, get_source_chart(graph_id, selected_country, selected_year, selected_energy_sources))
+    return update_source_chart
+
+
+def register_country_chart(graph_id):
+    if graph_id in YEAR_WINDOW_CHARTS:
+        @app.callback(
+            Output(graph_id, 'figure'),
+            [Input('country-dropdown', 'value'),
+             Input('year-slider-settled', 'data')],
+            State(f'{graph_id}-series', 'data')
+        )
+        @request_guard.skip_superseded(graph_id)
+        def update_country_chart(selected_country, selected_year, shown_series):
+            return get_year_window_chart(graph_id, selected_country, selected_year, None, shown_series)
+        return update_country_chart
+
+    @app.callback(
+        Output(graph_id, 'figure'),
+        [Input('country-dropdown', 'value'),
+         Input('year-slider-settled', 'data')],
+        **background_options(graph_id)
+    )
+    @request_guard.skip_superseded(graph_id)
+    def update_country_chart(selected_country, selected_year):
+        return job_result(graph_id, get_country_chart(graph_id, selected_country, selected_year))
+    return update_country_chart
+
+
+for graph_id in SOURCE_CHART_BUILDERS:
+    register_source_chart(graph_id)
+
+for graph_id in COUNTRY_CHART_BUILDERS:
+    register_country_chart(graph_id)
+
+SERIES_KEY_JS = """
+function(figure) {
+    var meta = figure && figure.layout && figure.layout.meta;
+    return meta && meta.series !== undefined ? meta.series : null;
+}
+"""
+
+for graph_id in YEAR_WINDOW_CHARTS:
+    app.clientside_callback(SERIES_KEY_JS, Output(f'{graph_id}-series', 'data'), Input(graph_id, 'figure'))
+
+
+# ═══ Correlation heatmap ═══
+@app.callback(
+    Output('energy-correlation-heatmap', 'figure'),
+    [Input('country-dropdown', 'value'),
+     Input('year-slider-settled', 'data'),
+     Input('energy-source-checklist', 'value'),
+     Input('correlation-view', 'value'),
+     Input('correlation-window', 'value')],
+    **background_options('energy-correlation-heatmap')
+)
+@request_guard.skip_superseded('energy-correlation-heatmap')
+def update_correlation_heatmap(selected_country, selected_year, selected_energy_sources, view, window):
+    return job_result('energy-correlation-heatmap',
+                      get_correlation_heatmap(selected_country, selected_year, selected_energy_sources, view, window))
+
+
+# ═══ Multi-country comparison ═══
+# Every selected country is a row lookup in the aggregate cube (aggregate_cube.py)
+@app.callback(
+    Output('country-comparison-chart', 'figure'),
+    [Input('comparison-countries', 'value'),
+     Input('year-slider-settled', 'data'),
+     Input('energy-source-checklist', 'value'),
+     Input('comparison-measure', 'value'),
+     Input('comparison-rollup', 'value')]
+)
+@request_guard.skip_superseded('country-comparison-chart')
+def update_comparison_chart(selected_countries, selected_year, selected_energy_sources, measure, rollup_toggle):
+    return get_comparison_chart(selected_countries, selected_year, selected_energy_sources, measure, rollup_toggle)
+
+
+# ═══ Map projection (clientside) ═══
+# Switching between 2D projections only changes layout.geo.projection.type and
+# the title, so it never reaches the server. The server figure depends on the
+# projection family instead: 'orthographic' (bubble globe) or 'natural earth'
+# (choropleth), which differ in trace type.
+MAP_PROJECTION_FAMILY_JS = """
+function(projection, family) {
+    var next = projection === 'orthographic' ? 'orthographic' : 'natural earth';
+    return next === family ? window.dash_clientside.no_update : next;
+}
+"""
+
+MAP_PROJECTION_JS = """
+function(figure, projection) {
+    if (!figure || !figure.layout) {
+        return window.dash_clientside.no_update;
+    }
+    var layout = Object.assign({}, figure.layout);
+    var geo = Object.assign({}, layout.geo);
+    geo.projection = Object.assign({}, geo.projection, {type: projection});
+    layout.geo = geo;
+    if (layout.meta && layout.meta.title_template) {
+        var label = projection.replace(/\\b\\w/g, function(c) { return c.toUpperCase(); });
+        layout.title = Object.assign({}, layout.title, {text: layout.meta.title_template.replace('{projection}', label)});
+    }
+    return Object.assign({}, figure, {layout: layout});
+}
+"""
+
+app.clientside_callback(
+    MAP_PROJECTION_FAMILY_JS,
+    Output('map-projection-family', 'data'),
+    Input('map-projection-dropdown', 'value'),
+    State('map-projection-family', 'data')
+)
+
+app.clientside_callback(
+    MAP_PROJECTION_JS,
+    Output('global-energy-map', 'figure'),
+    [Input('map-figure-store', 'data'),
+     Input('map-projection-dropdown', 'value')]
+)
+
+
+MAP_INPUTS = [Input('map-projection-family', 'data'),
+              Input('map-metric-dropdown', 'value'),
+              Input('map-percapita-toggle', 'value'),
+              Input('map-year-slider-settled', 'data'),
+              Input('map-animate-toggle', 'value')]
+
+if 'global-energy-map' in BACKGROUND_CHARTS:
+    @app.callback(
+        Output('map-figure-store', 'data'),
+        MAP_INPUTS,
+        progress=[Output('map-progress', 'value'), Output('map-progress', 'max')],
+        running=[(Output('map-progress', 'style'), PROGRESS_SHOWN, PROGRESS_HIDDEN)],
+        **background_options('global-energy-map')
+    )
+    def update_global_energy_map(set_progress, map_projection_family, map_metric, percapita_toggle, map_year_value, map_animate_toggle):
+        set_progress(('0', '3'))
+        get_map_frames()
+        set_progress(('1', '3'))
+        figure = get_global_energy_map(map_projection_family, map_metric, percapita_toggle, map_year_value, map_animate_toggle)
+        set_progress(('2', '3'))
+        return job_result('global-energy-map', figure)
+else:
+    @app.callback(Output('map-figure-store', 'data'), MAP_INPUTS)
+    @request_guard.skip_superseded('global-energy-map')
+    def update_global_energy_map(map_projection_family, map_metric, percapita_toggle, map_year_value, map_animate_toggle):
+        return get_global_energy_map(map_projection_family, map_metric, percapita_toggle, map_year_value, map_animate_toggle)
+
+
+# ═══ Full figure set ═══
+# A whole view's figures: stored by the Share button (store_shared_view),
+# pre-rendered by prerender.py, and built by update_graphs in FIGURE_IDS order
+# for the benchmarks. The figures are independent, so they are built
+# concurrently (figure_pool.py); in update_graphs one that fails or times out
+# becomes the usual error placeholder.
+figure_pool = pool_from_env()
+
+
+def error_figure(error):
+    return {'layout': {'title': f'Error: {str(error)}', 'template': CHART_TEMPLATE}}
+
+
+def raise_error(error):
+    raise error
+
+
+def recorded_build(getter, args):
+    """Run one getter in a pool worker; returns the ``(key, figure)`` pairs its cache lookups recorded."""
+    with figure_cache.recording() as entries:
+        getter(*args)
+    if figure_pool.kind == 'process':
+        # Sent back pickled, which pre-serialized figures are not
+        return [(key, fast_json.to_python(figure)) for key, figure in entries]
+    return entries
+
+
+def build_view(specs):
+    """Build ``(graph id, getter, args)`` specs on the figure pool; the recorded entries per spec, in order.
+
+    A figure that fails or times out raises instead of becoming a placeholder.
+    """
+    # Pins the request's snapshot before the figures fan out
+    version = get_snapshot().version
+    return figure_pool.build_all([(recorded_build, (getter, args)) for _, getter, args in specs], raise_error,
+                                 generation=version)
+
+
+def figure_specs(selected_country, selected_year, selected_energy_sources, map_projection, map_metric, percapita_toggle, map_year_value, map_animate_toggle):
+    specs = []
+    for graph_id in FIGURE_IDS:
+        if graph_id == 'global-energy-map':
+            specs.append((get_global_energy_map, (map_projection, map_metric, percapita_toggle, map_year_value, map_animate_toggle)))
+        elif graph_id == 'energy-correlation-heatmap':
+            specs.append((get_correlation_heatmap, (selected_country, selected_year, selected_energy_sources)))
+        elif graph_id in SOURCE_CHART_BUILDERS:
+            specs.append((get_source_chart, (graph_id, selected_country, selected_year, selected_energy_sources)))
+        else:
+            specs.append((get_country_chart, (graph_id, selected_country, selected_year)))
+    return specs
+
+
+def update_graphs(selected_country, selected_year, selected_energy_sources, map_projection, map_metric, percapita_toggle, map_year_value, map_animate_toggle):
+    specs = figure_specs(selected_country, selected_year, selected_energy_sources, map_projection, map_metric,
+                         percapita_toggle, map_year_value, map_animate_toggle)
+    return figure_pool.build_all(specs, error_figure, generation=get_snapshot().version)
+
+
+# ═══ Default views ═══
+# The figures a first visit with the default controls requests, through the
+# same getters, and so under the same cache keys, as the chart callbacks.
+# prerender.py builds them ahead of time for the most visited countries.
+def view_specs(selected_country, year_range, sources):
+    """(graph id, getter, args) of every country-driven chart of a view, as a page load requests them."""
+    specs = []
+    for graph_id in FIGURE_IDS:
+        if graph_id == 'global-energy-map':
+            continue
+        elif graph_id == 'energy-correlation-heatmap':
+            specs.append((graph_id, get_correlation_heatmap, (selected_country, year_range, sources, 'matrix', 10)))
+        elif graph_id in YEAR_WINDOW_CHARTS:
+            chart_sources = sources if graph_id in SOURCE_CHART_BUILDERS else None
+            specs.append((graph_id, get_year_window_chart, (graph_id, selected_country, year_range, chart_sources, None)))
+        elif graph_id in SOURCE_CHART_BUILDERS:
+            specs.append((graph_id, get_source_chart, (graph_id, selected_country, year_range, sources)))
+        else:
+            specs.append((graph_id, get_country_chart, (graph_id, selected_country, year_range)))
+    return specs
+
+
+def map_view_spec(map_projection, map_metric, percapita_toggle, map_year_value, map_animate_toggle):
+    """(graph id, getter, args) of the map; the server figure depends on the projection family only."""
+    family = 'orthographic' if map_projection == 'orthographic' else 'natural earth'
+    return ('global-energy-map', get_global_energy_map, (family, map_metric, percapita_toggle, map_year_value, map_animate_toggle))
+
+
+def default_view_specs(selected_country):
+    """(graph id, getter, args) of every country-driven chart of ``selected_country``'s default view."""
+    return view_specs(selected_country, all_years(), DEFAULT_SOURCES)
+
+
+def shared_view_specs():
+    """(graph id, getter, args) of the default view's charts that do not depend on the country."""
+    year_range = all_years()
+    countries = get_country_index().blocks
+    comparison = [country for country in COMPARISON_DEFAULTS if country in countries] or ['World']
+    return [map_view_spec('natural earth', 'primary_energy_consumption', [], year_range[1], []),
+            ('country-comparison-chart', get_comparison_chart,
+             (comparison, year_range, DEFAULT_SOURCES, 'consumption', []))]
+
+
+# ═══ Shareable views ═══
+# The Share button writes the controls into the URL with the view's content
+# hash and stores the view's 11 figures as one compressed bundle under it
+# (shared_views.py). A page opened on such a link sets its controls from the
+# query; before that, a bundle built from the current data is loaded into the
+# figure cache, so the chart callbacks the new control values fire are cache
+# hits. Without one the charts build as on any visit: only Share stores
+# bundles. The restore is a server request only for a URL with a view hash,
+# so a plain visit does not wait for it.
+shared_view_store = shared_views.store_from_env()
+
+
+def default_view_state(meta):
+    first_year, last_year = meta['years']
+    return shared_views.ViewState('World', (first_year, last_year), tuple(DEFAULT_SOURCES), 'natural earth',
+                                  'primary_energy_consumption', False, last_year, False)
+
+
+def state_view_specs(state):
+    """(graph id, getter, args) of a view's 11 figures, as the page requests them once its controls are set."""
+    return view_specs(state.country, list(state.years), list(state.sources)) + [
+        map_view_spec(state.projection, state.metric, ['per_capita'] if state.per_capita else [],
+                      state.map_year, ['animate'] if state.animate else [])]
+
+
+def store_shared_view(state):
+    """Record the view's figures (cache hits for a view on screen) and store them as its bundle."""
+    version = get_snapshot().version
+    entries = [entry for recorded in build_view(state_view_specs(state)) for entry in recorded]
+    shared_view_store.put(state, version, shared_views.encode_bundle(entries))
+    return len(entries)
+
+
+def load_shared_view(state):
+    """Load the view's stored bundle into the figure cache when it was built from the current data."""
+    if shared_view_store is None or figure_cache.backend is None:
+        return 0
+    try:
+        stored = shared_view_store.get(shared_views.view_hash(state))
+        if stored is None or stored[1] != get_snapshot().version:
+            return 0
+        return figure_cache.warm(shared_views.decode_bundle(stored[2]))
+    except Exception:
+        # The controls are restored regardless; the charts then build as on any visit
+        server.logger.exception('Could not load the shared view %s', shared_views.view_hash(state))
+        return 0
+
+
+SHARED_VIEW_QUERY_JS = """
+function(pathname, search) {
+    return new URLSearchParams(search || '').has('view') ? search : window.dash_clientside.no_update;
+}
+"""
+
+app.clientside_callback(
+    SHARED_VIEW_QUERY_JS,
+    Output('shared-view-query', 'data'),
+    Input('url', 'pathname'),
+    State('url', 'search')
+)
+
+
+@app.callback(
+    [Output('country-dropdown', 'value'),
+     Output('year-slider', 'value'),
+     Output('year-slider-readout', 'children', allow_duplicate=True),
+     Output('energy-source-checklist', 'value'),
+     Output('map-metric-dropdown', 'value'),
+     Output('map-projection-dropdown', 'value'),
+     Output('map-percapita-toggle', 'value'),
+     Output('map-year-slider', 'value'),
+     Output('map-year-slider-readout', 'children', allow_duplicate=True),
+     Output('map-animate-toggle', 'value')],
+    Input('shared-view-query', 'data'),
+    prevent_initial_call=True
+)
+def restore_shared_view(search):
+    # Only runs on page load: the Share button changes the query, never the path
+    meta = layout_metadata()
+    default = default_view_state(meta)
+    state = shared_views.from_query(search, default, set(meta['countries']), shared_view_store)
+    if state is None or state == default:
+        raise PreventUpdate
+    load_shared_view(state)
+    return (state.country, list(state.years), f'{state.years[0]} – {state.years[1]}', list(state.sources),
+            state.metric, state.projection, ['per_capita'] if state.per_capita else [], state.map_year,
+            str(state.map_year), ['animate'] if state.animate else [])
+
+
+@app.callback(
+    [Output('url', 'search'),
+     Output('share-link', 'value')],
+    Input('share-button', 'n_clicks'),
+    [State('country-dropdown', 'value'),
+     State('year-slider-settled', 'data'),
+     State('energy-source-checklist', 'value'),
+     State('map-projection-dropdown', 'value'),
+     State('map-metric-dropdown', 'value'),
+     State('map-percapita-toggle', 'value'),
+     State('map-year-slider-settled', 'data'),
+     State('map-animate-toggle', 'value'),
+     State('url', 'href')],
+    prevent_initial_call=True
+)
+def share_view(n_clicks, selected_country, selected_year, selected_energy_sources, map_projection, map_metric,
+               percapita_toggle, map_year_value, map_animate_toggle, href):
+    state = shared_views.view_state(selected_country, selected_year, selected_energy_sources, map_projection,
+                                    map_metric, percapita_toggle, map_year_value, map_animate_toggle)
+    if shared_view_store is not None and figure_cache.backend is not None:
+        store_shared_view(state)
+    query = shared_views.to_query(state)
+    return query, urlsplit(href or '')._replace(query=query[1:], fragment='').geturl()
+
+
+@server.route('/_view/<digest>')
+def shared_view_bundle(digest):
+    """A stored view's ``[key, figure]`` pairs, sent as the stored gzip body when the client accepts it."""
+    stored = shared_view_store.get(digest) if shared_view_store is not None else None
+    if stored is None:
+        abort(404)
+    bundle = stored[2]
+    if http_responses.accepted_encoding(request.headers.get('Accept-Encoding'), has_brotli=False) == 'gzip':
+        return Response(bundle, mimetype='application/json',
+                        headers={'Content-Encoding': 'gzip', 'Vary': 'Accept-Encoding'})
+    return Response(gzip.decompress(bundle), mimetype='application/json')
+
+
+# ═══ Preloading ═══
+# STARTUP_PRELOAD=1 (with gunicorn --preload): load the data, the heavy modules
+# and the precomputations in the master so the forked workers share them.
+if startup.preload_from_env():
+    startup.preload(modules=[np, pd, px], warm=[figure_dicts.template_json,
+                                                get_aggregate_cube,
+                                                derived_metrics.get_metric_table,
+                                                get_map_frames])
+
 
-    return figures
 # ═══════════════════════════════════════
 # Launch Dash application server
 # ═══════════════════════════════════════
@@ -0,0 +1,47 @@
+"""Background callback manager for the heavy charts.
+
+The animated map (and, if configured, other full-history charts) can take
+seconds to build. Registered as Dash background callbacks, those builds run
+in a separate process fed through a local diskcache queue: the gunicorn worker
+answers the callback request immediately and the page polls for the result,
+so light charts keep being served meanwhile. When a chart's inputs change
+while its job is still running, the page sends the old job id with the new
+request and Dash kills the stale process instead of letting it finish.
+
+Environment::
+
+    BACKGROUND_CALLBACKS=auto|diskcache|none   (auto: diskcache if dash[diskcache] is installed)
+    BACKGROUND_CACHE_DIR=Data/background_cache
+    BACKGROUND_CHARTS=global-energy-map        comma-separated chart ids to run in the background
+    BACKGROUND_RESULT_TTL=600                  seconds job results are kept
+    BACKGROUND_POLL_MS=500                     how often the page polls a running job
+"""
+import os
+import warnings
+
+DEFAULT_CHARTS = 'global-energy-map'
+POLL_INTERVAL_MS = int(os.environ.get('BACKGROUND_POLL_MS', 500))
+
+
+def manager_from_env(environ=os.environ):
+    """A ``DiskcacheManager``, or None when background callbacks are off."""
+    kind = environ.get('BACKGROUND_CALLBACKS', 'auto').lower()
+    if kind == 'none':
+        return None
+    if kind not in ('auto', 'diskcache'):
+        raise ValueError(f'Unknown BACKGROUND_CALLBACKS {kind!r} (expected auto, diskcache or none)')
+    try:
+        import diskcache
+        from dash import DiskcacheManager
+        cache = diskcache.Cache(environ.get('BACKGROUND_CACHE_DIR', os.path.join('Data', 'background_cache')))
+        return DiskcacheManager(cache, expire=float(environ.get('BACKGROUND_RESULT_TTL', 600)))
+    except ImportError:
+        if kind == 'auto':
+            warnings.warn('Background callbacks need dash[diskcache] (pip install "dash[diskcache]"); '
+                          'running every chart in the foreground')
+            return None
+        raise
+
+
+def charts_from_env(environ=os.environ):
+    return {chart.strip() for chart in environ.get('BACKGROUND_CHARTS', DEFAULT_CHARTS).split(',') if chart.strip()}
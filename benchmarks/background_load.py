@@ -0,0 +1,134 @@
+"""Load test: light-chart latency while animated maps are being built.
+
+Emulates one synchronous gunicorn worker (``--workers`` slots; each request
+holds a slot for its whole duration) and drives it through the Flask test
+client with two kinds of clients for ``--seconds``:
+
+* heavy clients keep requesting the animated map for changing metrics, and
+  poll the job like the page does when it runs as a background callback;
+* light clients keep requesting the pie chart and record their latency,
+  including the time spent waiting for a free worker.
+
+It runs once with the map built inline (BACKGROUND_CALLBACKS=none) and once as
+a background job, each in a fresh process, plus an idle run with no heavy
+clients, and prints light-chart latency percentiles and completed heavy
+builds. Background jobs need spare cores to pay off fully: on a single core
+the job process still competes with the worker for CPU.
+
+    python benchmarks/background_load.py [--seconds 10] [--heavy 2] [--light 4]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_METRICS = ['primary_energy_consumption', 'coal_consumption', 'oil_consumption', 'gas_consumption']
+
+
+def update_body(output, inputs):
+    component_id, prop = output.rsplit('.', 1)
+    return {'output': output, 'outputs': {'id': component_id, 'property': prop},
+            'inputs': [{'id': i, 'property': p, 'value': v} for i, p, v in inputs],
+            'changedPropIds': [], 'state': []}
+
+
+def run(args):
+    sys.path.insert(0, ROOT)
+    import app
+
+    client = app.server.test_client()
+    workers = threading.Semaphore(args.workers)
+    stop = threading.Event()
+    light_latencies = []
+    heavy_done = []
+
+    def request(body, query=''):
+        with workers:
+            response = client.post('/_dash-update-component' + query, json=body)
+        assert response.status_code in (200, 204), response.status_code
+        return json.loads(response.data) if response.data else {}
+
+    def heavy(n):
+        i = n
+        while not stop.is_set():
+            metric = HEAVY_METRICS[i % len(HEAVY_METRICS)]
+            i += 1
+            body = update_body('map-figure-store.data', [
+                ('map-projection-family', 'data', 'natural earth'), ('map-metric-dropdown', 'value', metric),
+                ('map-percapita-toggle', 'value', ['per_capita'] if i % 2 else []),
+                ('map-year-slider-settled', 'data', None), ('map-animate-toggle', 'value', ['animate'])])
+            start = time.perf_counter()
+            out = request(body)
+            while 'cacheKey' in out and 'response' not in out and not stop.is_set():
+                time.sleep(app.background_jobs.POLL_INTERVAL_MS / 1000)
+                out = request(body, f"?cacheKey={out.get('cacheKey')}&job={out.get('job')}") or out
+            if 'response' in out:
+                heavy_done.append(time.perf_counter() - start)
+
+    def light(n):
+        countries = list(app.get_country_index().blocks)
+        i = n
+        while not stop.is_set():
+            body = update_body('energy-mix-pie-chart.figure', [
+                ('country-dropdown', 'value', countries[i % len(countries)]),
+                ('year-slider-settled', 'data', [1990, 2000 + i % 20]),
+                ('energy-source-checklist', 'value', ['coal_consumption', 'oil_consumption', 'gas_consumption'])])
+            i += 7
+            start = time.perf_counter()
+            request(body)
+            light_latencies.append(time.perf_counter() - start)
+            time.sleep(0.02)
+
+    threads = ([threading.Thread(target=heavy, args=(n,)) for n in range(args.heavy)] +
+               [threading.Thread(target=light, args=(n,)) for n in range(args.light)])
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    ms = np.array(light_latencies) * 1000
+    print(json.dumps({
+        'light_requests': len(ms),
+        'p50': float(np.percentile(ms, 50)), 'p95': float(np.percentile(ms, 95)),
+        'p99': float(np.percentile(ms, 99)), 'max': float(ms.max()),
+        'heavy_builds': len(heavy_done),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--heavy', type=int, default=2)
+    parser.add_argument('--light', type=int, default=4)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run(args)
+        return
+
+    print(f"{'mode':<12}{'light reqs':>11}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'heavy builds':>14}")
+    # idle: light clients only, the floor for this host
+    for label, mode, heavy in (('idle', 'none', 0), ('inline', 'none', args.heavy), ('background', 'diskcache', args.heavy)):
+        env = dict(os.environ, BACKGROUND_CALLBACKS=mode, FIGURE_CACHE_BACKEND='none')
+        out = subprocess.run([sys.executable, __file__, '--child', '--heavy', str(heavy), '--light', str(args.light),
+                              '--seconds', str(args.seconds), '--workers', str(args.workers)],
+                             env=env, capture_output=True, text=True)
+        if out.returncode:
+            print(f"{label:<12}failed: {out.stderr.strip().splitlines()[-1]}")
+            continue
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        print(f"{label:<12}{r['light_requests']:>11}{r['p50']:>9.1f}{r['p95']:>9.1f}{r['p99']:>9.1f}"
+              f"{r['max']:>9.1f}{r['heavy_builds']:>14}")
+
+
+if __name__ == '__main__':
+    main()
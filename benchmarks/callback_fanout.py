@@ -0,0 +1,129 @@
+"""Count figure builds (and time them) per dashboard interaction.
+
+Before: the single ``update_graphs`` callback listened to all 8 controls and
+rebuilt all 11 figures on every change; it is timed from a frozen copy of the
+baseline callback (baseline_update_graphs.py), not today's ``update_graphs``,
+which shares the current cached, pooled builders. After: each chart has its
+own callback subscribed only to the controls it uses, so an interaction only
+updates the figures whose callbacks list that control as an input. When only
+the year range moved, the time-series charts answer with a ``Patch`` of their
+axis ranges (app.py, ``YEAR_WINDOW_CHARTS``); those are counted and timed as
+patches, not builds.
+
+Run from the project root (the app loads ``Data/World Energy Consumption.csv``):
+
+    python benchmarks/callback_fanout.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Measure raw build cost, not figure-cache hits
+os.environ.setdefault('FIGURE_CACHE_BACKEND', 'none')
+
+import app  # noqa: E402
+import baseline_update_graphs  # noqa: E402
+
+DEFAULT_STATE = {
+    'country-dropdown': 'World',
+    'year-slider': [int(app.get_df()['year'].min()), int(app.get_df()['year'].max())],
+    'energy-source-checklist': ['coal_consumption', 'oil_consumption', 'gas_consumption'],
+    'map-projection-dropdown': 'natural earth',
+    'map-metric-dropdown': 'primary_energy_consumption',
+    'map-percapita-toggle': [],
+    'map-year-slider': int(app.get_df()['year'].max()),
+    'map-animate-toggle': [],
+}
+
+# One representative change per control
+INTERACTIONS = {
+    'country-dropdown': next(c for c in app.get_df()['country'].unique() if c != 'World'),
+    'year-slider': [1990, 2010],
+    'energy-source-checklist': ['coal_consumption', 'oil_consumption', 'gas_consumption', 'solar_consumption'],
+    'map-projection-dropdown': 'robinson',
+    'map-metric-dropdown': 'coal_consumption',
+    'map-percapita-toggle': ['per_capita'],
+    'map-year-slider': 2000,
+    'map-animate-toggle': ['animate'],
+}
+
+
+def triggered_outputs(control_id):
+    # Server callbacks only; clientside callbacks (map projection) run in the browser.
+    # Sliders reach the server through their '<id>-settled' store.
+    sources = (control_id, f'{control_id}-settled')
+    outputs = []
+    for spec in app.app._callback_list:
+        if spec.get('clientside_function') is not None:
+            continue
+        output_key = spec['output']
+        if any(dep['id'] in sources for dep in spec['inputs']):
+            outputs += [out.rsplit('.', 1)[0] for out in output_key.strip('.').split('...')]
+    return outputs
+
+
+def build_figure(graph_id, state):
+    if graph_id == 'map-figure-store':
+        return app.build_global_energy_map(
+            state['map-projection-dropdown'], state['map-metric-dropdown'], state['map-percapita-toggle'],
+            state['map-year-slider'], state['map-animate-toggle'])
+    if graph_id == 'energy-correlation-heatmap':
+        correlation = app.get_correlation_engine().matrix(state['country-dropdown'], state['energy-source-checklist'],
+                                                          state['year-slider'])
+        return app.build_correlation_heatmap(correlation, state['country-dropdown'], state['energy-source-checklist'])
+    if graph_id == 'country-comparison-chart':
+        # Not part of update_graphs; uses the comparison's default countries and measure
+        comparison = app.compare_countries(app.COMPARISON_DEFAULTS, state['energy-source-checklist'],
+                                           state['year-slider'], 'consumption', False)
+        return app.build_comparison_chart(comparison, state['energy-source-checklist'], 'consumption')
+    filtered_df = app.filter_country_years(state['country-dropdown'], state['year-slider'])
+    if graph_id in app.SOURCE_CHART_BUILDERS:
+        source_data = app.build_source_data(filtered_df, state['energy-source-checklist'])
+        return app.SOURCE_CHART_BUILDERS[graph_id](source_data, state['country-dropdown'], state['energy-source-checklist'])
+    return app.COUNTRY_CHART_BUILDERS[graph_id](filtered_df, state['country-dropdown'])
+
+
+def is_patch(graph_id, control_id):
+    # The browser already holds the series from DEFAULT_STATE, so only a year-range change patches it
+    return control_id == 'year-slider' and graph_id in app.YEAR_WINDOW_CHARTS
+
+
+def patch_figure(graph_id, state):
+    sources = app.normalize_sources(state['energy-source-checklist']) if graph_id in app.SOURCE_CHART_BUILDERS else []
+    shown_series = app.series_key(state['country-dropdown'], sources)
+    return app.get_year_window_chart(graph_id, state['country-dropdown'], state['year-slider'],
+                                     state['energy-source-checklist'], shown_series)
+
+
+def main():
+    print(f"{'interaction':<26}{'builds before':>14}{'builds after':>14}{'patches after':>15}"
+          f"{'ms before':>12}{'ms after':>12}")
+    total_before = total_builds = total_patches = 0
+    for control_id, new_value in INTERACTIONS.items():
+        state = {**DEFAULT_STATE, control_id: new_value}
+        outputs = triggered_outputs(control_id)
+        patches = [graph_id for graph_id in outputs if is_patch(graph_id, control_id)]
+        builds = [graph_id for graph_id in outputs if graph_id not in patches]
+
+        start = time.perf_counter()
+        baseline_update_graphs.update_graphs(*state.values())
+        ms_before = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        for graph_id in builds:
+            build_figure(graph_id, state)
+        for graph_id in patches:
+            patch_figure(graph_id, state)
+        ms_after = (time.perf_counter() - start) * 1000
+
+        total_before += len(app.FIGURE_IDS)
+        total_builds += len(builds)
+        total_patches += len(patches)
+        print(f"{control_id:<26}{len(app.FIGURE_IDS):>14}{len(builds):>14}{len(patches):>15}"
+              f"{ms_before:>12.1f}{ms_after:>12.1f}")
+    print(f"{'total':<26}{total_before:>14}{total_builds:>14}{total_patches:>15}")
+
+
+if __name__ == '__main__':
+    main()
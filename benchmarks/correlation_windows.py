@@ -0,0 +1,74 @@
+"""Source correlations: DataFrame.corr() per query vs prefix-sum lookups.
+
+"matrix" is one heatmap callback: ``corr()`` over the selected rows vs
+``CorrelationEngine.matrix``. "rolling" is every window of the rolling view:
+one ``corr()`` per window vs one ``CorrelationEngine.rolling`` call. Both
+sides use pairwise-complete years (the heatmap used to ``dropna()`` first,
+which only differs where sources are missing in different years). Prefix
+tables are built once per entity and timed separately; the script also
+reports the largest difference from pandas.
+
+    python benchmarks/correlation_windows.py [--country World] [--window 10]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+from correlation_engine import prefix_sums  # noqa: E402
+from data_store import ENERGY_SOURCES  # noqa: E402
+
+SOURCE_SETS = {'3 sources': ENERGY_SOURCES[:3], '9 sources': ENERGY_SOURCES}
+YEARS = [1965, 2022]
+
+
+def timed(fn, repeat=20):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+
+def pandas_rolling(rows, sources, window):
+    years = rows['year'].to_numpy()
+    ends = range(YEARS[0] + window - 1, YEARS[1] + 1)
+    return np.stack([rows[(years > end - window) & (years <= end)][sources].corr().to_numpy() for end in ends])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--country', default='World')
+    parser.add_argument('--window', type=int, default=10)
+    args = parser.parse_args()
+
+    engine = app.get_correlation_engine()
+    cube = engine.cube
+    prefix_ms, _ = timed(lambda: prefix_sums(cube.values[0][cube.entity_index[args.country]]))
+    print(f"prefix tables for {args.country}: {prefix_ms:.2f} ms, "
+          f"{sum(table.nbytes for table in engine.prefix(args.country)) / 1e3:.0f} KB")
+    rows = app.filter_country_years(args.country, YEARS)
+
+    print(f"{'query':<26}{'corr() ms':>11}{'prefix ms':>11}{'speedup':>9}{'max diff':>10}")
+    for name, sources in SOURCE_SETS.items():
+        before_ms, before = timed(lambda: rows[sources].corr().to_numpy())
+        after_ms, (after, _) = timed(lambda: engine.matrix(args.country, sources, YEARS))
+        rolling_before_ms, rolling_before = timed(lambda: pandas_rolling(rows, sources, args.window), 5)
+        rolling_after_ms, (_, rolling_after) = timed(lambda: engine.rolling(args.country, sources, YEARS, args.window))
+        for query, b_ms, a_ms, b, a in (('matrix', before_ms, after_ms, before, after),
+                                        (f'rolling {args.window}y', rolling_before_ms, rolling_after_ms,
+                                         rolling_before, rolling_after)):
+            both = ~np.isnan(b) & ~np.isnan(a)
+            diff = float(np.abs(b[both] - a[both]).max()) if both.any() else float('nan')
+            print(f"{query + ', ' + name:<26}{b_ms:>11.2f}{a_ms:>11.3f}{b_ms / a_ms:>8.0f}x{diff:>10.1e}")
+
+
+if __name__ == '__main__':
+    main()
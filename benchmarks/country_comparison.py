@@ -0,0 +1,72 @@
+"""Multi-country comparison: N filter-and-melt passes vs aggregate cube lookups.
+
+"before" computes each country's series the way the single-country charts
+prepare data: ``filter_country_years`` + ``build_source_data`` (melt), then a
+per-year sum of the selected sources divided by primary energy (share).
+"after" is ``compare_countries``, one slice of the ``AggregateCube``. Both
+produce the same values; the script checks that, and reports the cube's build
+time and size.
+
+    python benchmarks/country_comparison.py [--repeat 20]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+from aggregate_cube import AggregateCube  # noqa: E402
+
+SOURCES = ['coal_consumption', 'oil_consumption', 'gas_consumption', 'solar_consumption', 'wind_consumption']
+YEARS = [1965, 2022]
+
+
+def melt_share(countries):
+    series = []
+    for country in countries:
+        source_data = app.build_source_data(app.filter_country_years(country, YEARS), SOURCES)
+        total = source_data.long.groupby('year')['Consumption'].sum()
+        primary = source_data.filtered.set_index('year')['primary_energy_consumption']
+        series.append((total / primary.reindex(total.index) * 100).reindex(range(YEARS[0], YEARS[1] + 1)))
+    return np.vstack([s.to_numpy() for s in series])
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    cube = AggregateCube(app.get_df())
+    print(f"cube {cube.values.shape} built in {(time.perf_counter() - start) * 1000:.0f} ms, "
+          f"{cube.nbytes / 1e6:.1f} MB")
+    app.get_aggregate_cube()
+
+    countries = list(app.get_country_index().blocks)
+    print(f"{'countries':>10}{'melt ms':>10}{'cube ms':>10}{'speedup':>9}{'max diff':>10}")
+    for n in (2, 5, 10, 20, 50):
+        selection = countries[:n]
+        before_ms, before = timed(lambda: melt_share(selection), args.repeat)
+        after_ms, (_, _, after) = timed(lambda: app.compare_countries(selection, SOURCES, YEARS, 'share', False),
+                                        args.repeat)
+        both = ~np.isnan(before) & ~np.isnan(after)
+        diff = float(np.max(np.abs(before[both] - after[both]) / np.maximum(np.abs(before[both]), 1e-9)))
+        print(f"{n:>10}{before_ms:>10.2f}{after_ms:>10.3f}{before_ms / after_ms:>8.0f}x{diff:>10.1e}")
+
+
+if __name__ == '__main__':
+    main()
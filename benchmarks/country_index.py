@@ -0,0 +1,58 @@
+"""Microbenchmark: country + year-range selection, boolean mask vs CountryIndex.
+
+The mask is what ``update_graphs`` used to do on every callback: three
+full-table comparisons. ``CountryIndex.select`` does two binary searches over
+the country's year-sorted block and returns a slice.
+
+    python benchmarks/country_index.py [--repeat 2000]
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_store import CountryIndex, get_df  # noqa: E402
+
+
+def mask_select(df, country, year_range):
+    return df[(df['country'] == country) &
+              (df['year'] >= year_range[0]) &
+              (df['year'] <= year_range[1])]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    df = get_df()
+    start = timeit.default_timer()
+    index = CountryIndex(df)
+    build_ms = (timeit.default_timer() - start) * 1000
+
+    rng = random.Random(0)
+    countries = list(index.blocks)
+    year_min, year_max = int(df['year'].min()), int(df['year'].max())
+    queries = []
+    for _ in range(args.repeat):
+        lo = rng.randint(year_min, year_max)
+        queries.append((rng.choice(countries), [lo, rng.randint(lo, year_max)]))
+
+    for country, year_range in queries[:50]:
+        expected = mask_select(df, country, year_range)
+        actual = index.select(country, year_range)
+        assert expected.index.equals(actual.index), (country, year_range)
+
+    mask_s = timeit.timeit(lambda: [mask_select(df, c, y) for c, y in queries], number=1)
+    index_s = timeit.timeit(lambda: [index.select(c, y) for c, y in queries], number=1)
+
+    print(f"rows={len(df)} countries={len(countries)} queries={len(queries)} index build={build_ms:.1f} ms")
+    print(f"boolean mask : {mask_s / len(queries) * 1e6:9.1f} us/query")
+    print(f"CountryIndex : {index_s / len(queries) * 1e6:9.1f} us/query  ({mask_s / index_s:.1f}x faster)")
+
+
+if __name__ == '__main__':
+    main()
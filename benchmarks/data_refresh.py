@@ -0,0 +1,93 @@
+"""Hot data refresh: swap time, incremental precomputation and cache retention.
+
+Copies the dataset into a temporary directory, serves the app from there
+(``DATA_REFRESH_INTERVAL=0``, the refresh is triggered directly), warms the
+figure cache with the pie and line charts of ``--warm`` countries plus one
+map, then rewrites the CSV with the coal values of 1, 10 and all countries
+changed for 2000-2005 and refreshes. Reported per edit: countries / years
+changed, the time to load the new file and to diff it and update the
+aggregate cube, correlation prefix tables, derived metrics and map frames
+incrementally, the time a full rebuild of those precomputations takes
+instead, and the share of the warmed figures still served from the cache
+afterwards.
+
+    python benchmarks/data_refresh.py [--warm 20]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ['DATA_REFRESH_INTERVAL'] = '0'
+
+SOURCES = ['coal_consumption', 'oil_consumption', 'gas_consumption']
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--warm', type=int, default=20)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    shutil.copytree('Data', os.path.join(workdir, 'Data'), ignore=shutil.ignore_patterns('store', 'profiles', '*cache*'))
+    os.chdir(workdir)
+    try:
+        import pandas as pd
+
+        import app
+        import data_refresh
+        import data_store
+        from aggregate_cube import AggregateCube
+        from correlation_engine import prefix_sums
+        from derived_metrics import MetricTable
+        from map_frames import MapFrames
+
+        refresher = data_refresh.DataRefresher(interval=0)
+        refresher.check()
+        raw = pd.read_csv(data_store.DATA_CSV)
+        countries = sorted(data_store.current_snapshot().country_index.blocks)
+        warm = countries[:args.warm]
+
+        def warm_up():
+            for country in warm:
+                app.get_source_chart('energy-mix-pie-chart', country, [1965, 2022], SOURCES)
+                app.get_country_chart('gdp-vs-energy-scatter', country, [1965, 2022])
+                app.get_correlation_heatmap(country, [1965, 2022], SOURCES)
+            app.get_global_energy_map('natural earth', 'coal_consumption', [], 1990, [])
+
+        print(f"{'edit':<14}{'countries':>10}{'years':>7}{'load ms':>9}{'diff+update ms':>16}{'full rebuild ms':>17}"
+              f"{'cache kept':>12}")
+        for label, edited in (('1 country', countries[-1:]), ('10 countries', countries[-10:]), ('all', countries)):
+            warm_up()
+            app.figure_cache.clear()
+            warm_up()
+            edit = raw.country.isin(edited) & raw.year.between(2000, 2005)
+            raw.loc[edit, 'coal_consumption'] = raw.loc[edit, 'coal_consumption'].fillna(0) + 1
+            raw.to_csv(data_store.DATA_CSV + '.tmp', index=False)
+            os.replace(data_store.DATA_CSV + '.tmp', data_store.DATA_CSV)
+
+            refresher.check()
+            snapshot = data_store.current_snapshot()
+            start = time.perf_counter()
+            cube = AggregateCube(snapshot.df)
+            MapFrames(snapshot.df, MetricTable(snapshot.df))
+            for country in warm:
+                prefix_sums(cube.values[0][cube.entity_index[country]])
+            full_ms = (time.perf_counter() - start) * 1000
+
+            before = app.figure_cache.stats()['hits']
+            warm_up()
+            kept = (app.figure_cache.stats()['hits'] - before) / (3 * len(warm) + 1)
+            last = refresher.last_refresh
+            print(f"{label:<14}{last['changed_countries']:>10}{last['changed_years']:>7}"
+                  f"{last['load_seconds'] * 1000:>9.0f}{last['update_seconds'] * 1000:>16.0f}{full_ms:>17.0f}{kept:>12.0%}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Derived metric table: build cost, size, correctness and per-request time.
+
+Builds the ``MetricTable`` (derived_metrics.py) for the loaded data and
+reports its build time and size. Every metric of every derived column is
+then compared with the same metric computed in pandas (a column
+division); the script lists mismatches
+beyond float32 rounding and exits non-zero, so it is also the correctness
+check for the table. Last, per-request time to get one metric for one
+country and year range, computed from the filtered rows (as the map's
+per-capita branch used to) vs sliced from the table.
+
+    python benchmarks/derived_metrics.py [--countries 50]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import derived_metrics  # noqa: E402
+from aggregate_cube import TWH_TO_KWH  # noqa: E402
+from data_store import current_snapshot  # noqa: E402
+
+
+def reference(df, column, metric):
+    """``metric`` of ``column`` computed in pandas, float64."""
+    values = df[column].astype('float64')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if metric == 'per_capita':
+            result = (values / df['population'] * TWH_TO_KWH).to_numpy()
+        else:
+            raise ValueError(f'no pandas reference for {metric!r}')
+    return np.where(np.isfinite(result), result, np.nan)
+
+
+def timed(fn, queries):
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        fn(*query)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--countries', type=int, default=50)
+    args = parser.parse_args()
+
+    snapshot = current_snapshot()
+    df = snapshot.df
+    start = time.perf_counter()
+    table = derived_metrics.MetricTable(df)
+    print(f"MetricTable: {len(derived_metrics.METRICS)} metrics x {len(table.columns)} columns x {len(df)} rows, "
+          f"built in {(time.perf_counter() - start) * 1000:.0f} ms, {table.nbytes / 2 ** 20:.1f} MB")
+
+    mismatches = 0
+    for metric in derived_metrics.METRICS:
+        for column in table.columns:
+            expected = reference(df, column, metric)
+            actual = table.values(metric, column)
+            bad = ~np.isclose(actual, expected, rtol=1e-4, atol=1e-3, equal_nan=True)
+            if bad.any():
+                mismatches += 1
+                i = np.flatnonzero(bad)[0]
+                print(f'  {metric} {column}: {bad.sum()} rows differ, e.g. row {i}: {actual[i]} != {expected[i]}')
+
+    countries = sorted(snapshot.country_index.blocks)[:args.countries]
+    queries = [(country, column, [1965, 2022]) for country in countries for column in table.columns]
+
+    def from_rows(country, column, year_range):
+        rows = snapshot.country_index.select(country, year_range)
+        return (rows[column] / rows['population'] * TWH_TO_KWH).replace([np.inf, -np.inf], np.nan)
+
+    def from_table(country, column, year_range):
+        lo, hi = snapshot.country_index.bounds(country, year_range)
+        return table.values('per_capita', column)[lo:hi]
+
+    rows_ms, table_ms = timed(from_rows, queries), timed(from_table, queries)
+    print(f"per-capita series per request: divided {rows_ms:.3f} ms, sliced {table_ms:.4f} ms "
+          f"({rows_ms / table_ms:.0f}x)")
+    if mismatches:
+        sys.exit(f'{mismatches} metric columns differ from the pandas reference')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Per-figure build time: the previous plotly.express builders vs the plain-dict builders.
+
+"px" is the app's builder before the hot charts moved to plain dicts, kept as
+the reference in tests/test_figure_dicts.py (which checks that both produce
+the same figure JSON); "dict" is the app's builder (figure_dicts.py). Each
+chart is built for ``--countries`` countries and several year ranges and
+source sets, including ranges without data, and the comparison chart for a
+few country sets with and without the rollup. Reported per chart: median
+build time of each, and the same including JSON serialization.
+
+    python benchmarks/figure_builders.py [--countries 3] [--repeat 3]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'tests')]
+os.environ.setdefault('FIGURE_CACHE_BACKEND', 'none')
+
+import plotly.io as pio  # noqa: E402
+
+import app  # noqa: E402
+from data_store import ENERGY_SOURCES  # noqa: E402
+from test_figure_dicts import COUNTRY_CHARTS, SOURCE_CHARTS, px_comparison_chart  # noqa: E402
+
+YEAR_RANGES = [[1965, 2022], [2000, 2010], [1900, 1901]]
+SOURCE_SETS = [ENERGY_SOURCES[:3], ENERGY_SOURCES, ENERGY_SOURCES[4:5], []]
+COMPARISON_SETS = [['World'], ['Africa', 'Asia', 'Europe', 'North America', 'South America']]
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--countries', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    countries = ['World'] + sorted(app.get_country_index().blocks)[:args.countries - 1]
+    builders = {**SOURCE_CHARTS, **COUNTRY_CHARTS, 'comparison': (px_comparison_chart, app.build_comparison_chart)}
+    queries = {name: [] for name in builders}
+    for country in countries:
+        for years in YEAR_RANGES:
+            filtered_df = app.filter_country_years(country, years)
+            for sources in SOURCE_SETS:
+                source_data = app.build_source_data(filtered_df, sources)
+                for name in SOURCE_CHARTS:
+                    queries[name].append((source_data, country, sources))
+            for name in COUNTRY_CHARTS:
+                queries[name].append((filtered_df, country))
+    for entities in COMPARISON_SETS:
+        for measure in app.MEASURE_LABELS:
+            for rollup in (False, True):
+                comparison = app.compare_countries(entities, SOURCE_SETS[0], YEAR_RANGES[0], measure, rollup)
+                queries['comparison'].append((comparison, SOURCE_SETS[0], measure))
+
+    print(f"{'chart':<14}{'queries':>8}{'px ms':>8}{'dict ms':>9}{'speedup':>9}{'px+json ms':>12}{'dict+json ms':>14}")
+    for name, (px_build, dict_build) in builders.items():
+        def run(build, serialize=False):
+            for query in queries[name]:
+                figure = build(*query)
+                if serialize:
+                    pio.json.to_json_plotly(figure)
+
+        px_ms = timed(lambda: run(px_build), args.repeat) / len(queries[name])
+        dict_ms = timed(lambda: run(dict_build), args.repeat) / len(queries[name])
+        px_json_ms = timed(lambda: run(px_build, True), args.repeat) / len(queries[name])
+        dict_json_ms = timed(lambda: run(dict_build, True), args.repeat) / len(queries[name])
+        print(f"{name:<14}{len(queries[name]):>8}{px_ms:>8.2f}{dict_ms:>9.3f}{px_ms / dict_ms:>8.0f}x"
+              f"{px_json_ms:>12.2f}{dict_json_ms:>14.3f}")
+
+
+if __name__ == '__main__':
+    main()
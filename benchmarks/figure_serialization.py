@@ -0,0 +1,70 @@
+"""Callback response encoding throughput: default encoder vs the FAST_JSON path.
+
+Wraps the single-year map, the globe and the animated map in a Dash
+``_dash-update-component`` response and encodes it the way Dash does
+(``plotly.io.json.to_json_plotly``) with:
+
+* json       - the default ``PlotlyJSONEncoder`` (used unless ``FAST_JSON=1``)
+* orjson     - plotly's orjson engine, what ``FAST_JSON=1`` pins
+* cache hit  - a figure pre-serialized by the figure cache, embedded as an
+               ``orjson.Fragment`` so only the envelope is encoded
+
+and reports payload bytes, encode time and MB/s. Requires orjson>=3.9.15.
+
+    python benchmarks/figure_serialization.py [--repeat 20]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('FIGURE_CACHE_BACKEND', 'none')
+
+import plotly.io as pio  # noqa: E402
+
+import app  # noqa: E402
+import fast_json  # noqa: E402
+
+FIGURES = [
+    # label, projection, animate
+    ('map (natural earth)', 'natural earth', []),
+    ('map (orthographic)', 'orthographic', []),
+    ('animated map', 'natural earth', ['animate']),
+]
+
+
+def response(figure):
+    return {'multi': True, 'response': {'map-figure-store': {'data': figure}}}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--metric', default='primary_energy_consumption')
+    args = parser.parse_args()
+    if not fast_json.HAS_FRAGMENT:
+        sys.exit('orjson>=3.9.15 is required for this benchmark')
+
+    year = int(app.get_df()['year'].max())
+    print(f"{'figure':<22}{'encoder':<11}{'bytes':>12}{'ms':>9}{'MB/s':>9}")
+    for label, projection, animate in FIGURES:
+        figure = app.build_global_energy_map(projection, args.metric, [], year, animate)
+        encoders = {
+            'json': lambda: pio.json.to_json_plotly(response(figure), engine='json'),
+            'orjson': lambda: pio.json.to_json_plotly(response(figure), engine='orjson'),
+        }
+        serialized = fast_json.serialize(figure)
+        encoders['cache hit'] = lambda: pio.json.to_json_plotly(response(serialized), engine='orjson')
+
+        baseline = None
+        for name, encode in encoders.items():
+            size = len(encode().encode('utf-8'))
+            ms = timeit.timeit(encode, number=args.repeat) / args.repeat * 1000
+            baseline = baseline or ms
+            print(f"{label:<22}{name:<11}{size:>12,}{ms:>9.2f}{size / ms / 1e3:>9.1f}"
+                  f"{'' if name == 'json' else f'  ({baseline / ms:.1f}x)'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""Animated map payload size and serialization time per frame budget.
+
+Builds the animated choropleth (or globe, with --projection orthographic) from
+MapFrames.animation() at several frame budgets, with and without the region
+trim and significant-digit rounding, and reports frames, JSON bytes and
+pio.to_json time. "all years, raw" is the old full-history payload.
+
+    python benchmarks/map_animation_payload.py [--metric coal_consumption]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('FIGURE_CACHE_BACKEND', 'none')
+
+import plotly.io as pio  # noqa: E402
+
+import app  # noqa: E402
+from map_frames import get_map_frames  # noqa: E402
+
+SETTINGS = [
+    # label, max_frames, digits, countries_only
+    ('all years, raw', 0, 0, False),
+    ('all years, trimmed', 0, 4, True),
+    ('60 frames', 60, 4, True),
+    ('30 frames (default)', 30, 4, True),
+    ('15 frames', 15, 4, True),
+    ('15 frames, 3 digits', 15, 3, True),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--metric', default='primary_energy_consumption')
+    parser.add_argument('--projection', default='natural earth')
+    parser.add_argument('--per-capita', action='store_true')
+    args = parser.parse_args()
+
+    frames = get_map_frames()
+    print(f"{'setting':<22}{'frames':>8}{'rows':>8}{'bytes':>12}{'build ms':>10}{'json ms':>10}")
+    for label, max_frames, digits, countries_only in SETTINGS:
+        start = time.perf_counter()
+        map_data = frames.animation(args.metric, args.per_capita, stride=0, max_frames=max_frames,
+                                    digits=digits, countries_only=countries_only)
+        figure = app.build_animated_map(map_data, args.projection, args.metric, args.metric)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        payload = pio.to_json(figure, validate=False)
+        json_ms = (time.perf_counter() - start) * 1000
+        print(f"{label:<22}{len(figure.frames):>8}{len(map_data):>8}{len(payload):>12,}{build_ms:>10.1f}{json_ms:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Server time per map year-slider step: px on the filtered table vs MapFrames.
+
+"before" reproduces the old single-year path (filter by year, per-capita
+division, dropna, plotly.express); "after" is ``build_global_energy_map``,
+which slices precomputed per-year arrays. Both include JSON serialization.
+
+    python benchmarks/map_year_scrub.py [--metric coal_consumption] [--per-capita]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('FIGURE_CACHE_BACKEND', 'none')
+
+import plotly.express as px  # noqa: E402
+import plotly.io as pio  # noqa: E402
+
+import app  # noqa: E402
+from map_frames import get_map_frames  # noqa: E402
+
+
+def px_single_year_map(projection, metric, per_capita, year):
+    df = app.get_df()
+    map_data = df[df['year'] == year].copy()
+    if per_capita:
+        map_data = map_data[map_data['population'].notna()]
+        map_data[metric] = (map_data[metric] / map_data['population']).replace([float('inf'), -float('inf')], float('nan'))
+    map_data = map_data.dropna(subset=[metric])
+    return px.choropleth(map_data, locations='iso_code', color=metric, hover_name='country',
+                         hover_data={'iso_code': False, metric: ':.2f'}, color_continuous_scale='YlOrRd',
+                         projection=projection, template=app.CHART_TEMPLATE)
+
+
+def timed(build, years):
+    samples = []
+    for year in years:
+        start = time.perf_counter()
+        pio.to_json(build(year), validate=False)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--metric', default='primary_energy_consumption')
+    parser.add_argument('--projection', default='natural earth')
+    parser.add_argument('--per-capita', action='store_true')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    get_map_frames()
+    print(f"MapFrames precompute: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    df = app.get_df()
+    years = list(range(int(df['year'].min()), int(df['year'].max()) + 1))
+    toggle = ['per_capita'] if args.per_capita else []
+
+    before = timed(lambda y: px_single_year_map(args.projection, args.metric, args.per_capita, y), years)
+    after = timed(lambda y: app.build_global_energy_map(args.projection, args.metric, toggle, y, []), years)
+    print(f"{'':<22}{'p50 ms':>10}{'p95 ms':>10}")
+    print(f"{'px on filtered table':<22}{before[0]:>10.1f}{before[1]:>10.1f}")
+    print(f"{'precomputed frames':<22}{after[0]:>10.1f}{after[1]:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
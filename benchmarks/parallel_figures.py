@@ -0,0 +1,64 @@
+"""Wall-clock time of the full figure set: sequential vs thread pool vs process pool.
+
+Builds all 11 figures with ``update_graphs`` (figure cache off) for a few
+dashboard states, with ``FigurePool`` set to each kind, and compares the wall
+time with the sum of the per-chart build times and with the slowest single
+chart, the floor a parallel build can approach. With ``--timeout`` set, it
+also counts figures replaced by the error placeholder.
+
+    python benchmarks/parallel_figures.py [--workers 4] [--timeout 0.5]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('FIGURE_CACHE_BACKEND', 'none')
+
+import app  # noqa: E402
+from figure_pool import FigurePool  # noqa: E402
+
+STATES = [
+    ('World', [1965, 2022], ['coal_consumption', 'oil_consumption', 'gas_consumption'],
+     'natural earth', 'primary_energy_consumption', [], 2020, []),
+    ('World', [1900, 2022], app.ENERGY_SOURCES, 'orthographic', 'coal_consumption', ['per_capita'], 2000, []),
+    ('World', [1900, 2022], app.ENERGY_SOURCES, 'natural earth', 'oil_consumption', [], 2010, ['animate']),
+]
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--timeout', type=float, default=None)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"cpus={os.cpu_count()}")
+    print(f"{'state':<8}{'pool':<10}{'wall ms':>10}{'sum ms':>10}{'slowest ms':>12}{'placeholders':>14}")
+    for n, state in enumerate(STATES):
+        specs = app.figure_specs(*state)
+        chart_ms = [min(timed(fn, *spec_args) for _ in range(args.repeat)) * 1000 for fn, spec_args in specs]
+        for kind in ('none', 'thread', 'process'):
+            pool = FigurePool(kind, workers=args.workers, timeout=args.timeout)
+            pool.build_all(specs, app.error_figure)  # start workers
+            wall = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                figures = pool.build_all(specs, app.error_figure)
+                wall.append(time.perf_counter() - start)
+            pool.shutdown()
+            placeholders = sum(1 for f in figures
+                               if isinstance(f, dict) and 'data' not in f
+                               and str(f.get('layout', {}).get('title', '')).startswith('Error:'))
+            print(f"{n:<8}{kind:<10}{min(wall) * 1000:>10.1f}{sum(chart_ms):>10.1f}{max(chart_ms):>12.1f}{placeholders:>14}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Warm start from pre-rendered views: server time of a first visit, cold vs pre-rendered.
+
+Copies the dataset into a temporary directory and runs
+``prerender.py --top N --images none`` there. Then, each mode in a fresh
+interpreter, imports ``app`` and requests through the Flask test client the
+callbacks a first visit fires for one country, for every pre-rendered
+country and one that was not pre-rendered:
+
+* ``cold`` - no pre-rendered directory, every figure is built
+* ``warm`` - the app loaded the directory into its figure cache at import
+
+Reported per mode: import time (including loading the figures), mean and
+max server time of a first visit to a pre-rendered country, the same for
+the other country, and the figure cache hits / misses.
+
+    python benchmarks/prerender_warm_start.py [--top 10]
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASE_ENV = {'BACKGROUND_CALLBACKS': 'none', 'DATA_REFRESH_INTERVAL': '0', 'FIGURE_CACHE_BACKEND': 'memory'}
+
+
+def first_visit(client, country):
+    from startup_time import callback_bodies, initial_props
+
+    props = initial_props(client.get('/_dash-layout').get_json())
+    props['country-dropdown']['value'] = country
+    bodies = callback_bodies(client.get('/_dash-dependencies').get_json(), props)
+    start = time.perf_counter()
+    for body in bodies:
+        response = client.post('/_dash-update-component', json=body)
+        assert response.status_code in (200, 204), (body['output'], response.status_code)
+    return time.perf_counter() - start
+
+
+def child(countries, other):
+    start = time.perf_counter()
+    import app
+    imported = time.perf_counter() - start
+    client = app.server.test_client()
+    seconds = [first_visit(client, country) for country in countries]
+    other_seconds = first_visit(client, other)
+    stats = app.figure_cache.stats()
+    print(json.dumps({'import_s': imported, 'seconds': seconds, 'other_s': other_seconds,
+                      'hits': stats['hits'], 'misses': stats['misses']}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--child', nargs='+', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        sys.path.insert(0, ROOT)
+        return child(args.child[:-1], args.child[-1])
+
+    workdir = tempfile.mkdtemp()
+    shutil.copytree('Data', os.path.join(workdir, 'Data'), ignore=shutil.ignore_patterns('store', 'profiles', '*cache*', 'prerendered*'))
+    try:
+        env = {**os.environ, **BASE_ENV}
+        start = time.perf_counter()
+        subprocess.run([sys.executable, os.path.join(ROOT, 'prerender.py'), '--top', str(args.top), '--images', 'none'],
+                       cwd=workdir, env=env, check=True, capture_output=True)
+        print(f"prerender.py --top {args.top}: {time.perf_counter() - start:.1f} s")
+        with open(os.path.join(workdir, 'Data', 'prerendered', 'manifest.json')) as f:
+            manifest = json.load(f)
+        countries = manifest['countries']
+        with open(os.path.join(workdir, 'Data', 'layout_meta.json')) as f:
+            other = next(country for country in json.load(f)['countries'] if country not in countries)
+
+        print(f"{'mode':<6}{'import s':>9}{'pre-rendered visit ms (mean / max)':>36}{'other visit ms':>16}{'hits':>6}{'misses':>8}")
+        for mode, prerender_dir in (('cold', 'Data/none'), ('warm', 'Data/prerendered')):
+            out = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', *countries, other],
+                                 cwd=workdir, env={**env, 'PRERENDER_DIR': prerender_dir},
+                                 capture_output=True, text=True, check=True).stdout
+            report = json.loads(out.strip().splitlines()[-1])
+            seconds = report['seconds']
+            visits = f"{sum(seconds) / len(seconds) * 1000:.0f} / {max(seconds) * 1000:.0f}"
+            print(f"{mode:<6}{report['import_s']:>9.2f}{visits:>36}{report['other_s'] * 1000:>16.0f}"
+                  f"{report['hits']:>6}{report['misses']:>8}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Which server callbacks each dashboard control can trigger.
+
+Walks the registered callback graph from every control. Clientside callbacks
+run in the browser, so they are followed (their outputs may trigger further
+callbacks) but not counted as requests. A server callback reached only
+through a clientside callback is listed as conditional, since the clientside
+function may return no_update (e.g. the map projection family only changes
+when switching between the globe and the 2D projections).
+
+Exits non-zero if a control listed in CLIENTSIDE_ONLY reaches a server
+callback directly.
+
+    python benchmarks/server_requests_per_control.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+
+CONTROLS = [
+    'country-dropdown', 'year-slider', 'energy-source-checklist', 'map-projection-dropdown',
+    'map-metric-dropdown', 'map-percapita-toggle', 'map-year-slider', 'map-animate-toggle',
+]
+CLIENTSIDE_ONLY = ['map-projection-dropdown']
+
+
+def callback_graph():
+    callbacks = []
+    for spec in app.app._callback_list:
+        outputs = [out.rsplit('.', 1)[0] for out in spec['output'].strip('.').split('...')]
+        callbacks.append({
+            'outputs': outputs,
+            'inputs': [dep['id'] for dep in spec['inputs']],
+            'clientside': spec.get('clientside_function') is not None,
+        })
+    return callbacks
+
+
+def reachable(control_id, callbacks):
+    direct, conditional = [], []
+    queue, seen = [(control_id, False)], set()
+    while queue:
+        component_id, via_clientside = queue.pop()
+        for callback in callbacks:
+            if component_id not in callback['inputs'] or id(callback) in seen:
+                continue
+            seen.add(id(callback))
+            if not callback['clientside']:
+                (conditional if via_clientside else direct).extend(callback['outputs'])
+            queue += [(out, via_clientside or callback['clientside']) for out in callback['outputs']]
+    return direct, conditional
+
+
+def main():
+    callbacks = callback_graph()
+    failed = False
+    print(f"{'control':<26}{'server':>8}{'conditional':>13}  outputs")
+    for control_id in CONTROLS:
+        direct, conditional = reachable(control_id, callbacks)
+        print(f"{control_id:<26}{len(direct):>8}{len(conditional):>13}  {', '.join(direct + [o + '*' for o in conditional])}")
+        if control_id in CLIENTSIDE_ONLY and direct:
+            failed = True
+    print('* only when the clientside callback changes its output')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
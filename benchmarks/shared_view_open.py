@@ -0,0 +1,155 @@
+"""Opening a shared link: server time with the view's figures rebuilt vs loaded from its stored bundle.
+
+Copies the dataset into a temporary directory. A first interpreter presses
+Share on ``--views`` views (random country, year range, sources and map
+settings) through the Flask test client, which stores their bundles
+(shared_views.py), and prints the links. Then, each mode in a fresh
+interpreter, imports ``app`` and opens every link: the restore callback the
+page fires on load for a link with a view hash, then the chart callbacks with
+the restored control values.
+
+* ``rebuilt`` - ``SHARED_VIEWS=0``: the controls are restored, every figure
+  is built
+* ``bundle``  - the restore loads the stored bundle into the figure cache
+
+Reported per mode: mean and max server time of opening a link and the
+figure cache hits / misses, and the stored bundles' mean compressed and
+JSON size. The multi-country comparison is not part of a view, so it is one
+miss per link in both modes.
+
+    python benchmarks/shared_view_open.py [--views 10]
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASE_ENV = {'BACKGROUND_CALLBACKS': 'none', 'DATA_REFRESH_INTERVAL': '0', 'FIGURE_CACHE_BACKEND': 'memory',
+            'PRERENDER_DIR': os.path.join('Data', 'none')}
+
+
+def dependency(deps, input_id):
+    return next(dep for dep in deps if dep['inputs'] and dep['inputs'][0]['id'] == input_id)
+
+
+def call(client, dep, inputs, state):
+    outputs = [dict(zip(('id', 'property'), output.split('@')[0].rsplit('.', 1)))
+               for output in dep['output'].strip('.').split('...')]
+    response = client.post('/_dash-update-component', json={'output': dep['output'], 'outputs': outputs,
+                                                            'inputs': inputs, 'state': state, 'changedPropIds': []})
+    assert response.status_code in (200, 204), (dep['output'], response.status_code)
+    return response.get_json()['response'] if response.status_code == 200 else {}
+
+
+def prop(component_id, name, value):
+    return {'id': component_id, 'property': name, 'value': value}
+
+
+def share(count, seed):
+    """Press Share on ``count`` random views; prints their links' queries."""
+    import app
+    from data_store import ENERGY_SOURCES, MAP_METRICS, layout_metadata
+
+    client = app.server.test_client()
+    deps = client.get('/_dash-dependencies').get_json()
+    meta = layout_metadata()
+    first_year, last_year = meta['years']
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        years = sorted(rng.sample(range(first_year, last_year + 1), 2))
+        response = call(client, dependency(deps, 'share-button'), [prop('share-button', 'n_clicks', 1)], [
+            prop('country-dropdown', 'value', rng.choice(meta['countries'])),
+            prop('year-slider-settled', 'data', years),
+            prop('energy-source-checklist', 'value', rng.sample(ENERGY_SOURCES, rng.randint(2, 5))),
+            prop('map-projection-dropdown', 'value', rng.choice(['natural earth', 'orthographic', 'robinson'])),
+            prop('map-metric-dropdown', 'value', rng.choice(MAP_METRICS)),
+            prop('map-percapita-toggle', 'value', rng.choice([[], ['per_capita']])),
+            prop('map-year-slider-settled', 'data', rng.randint(first_year, last_year)),
+            prop('map-animate-toggle', 'value', []),
+            prop('url', 'href', 'http://localhost/'),
+        ])
+        queries.append(response['url']['search'])
+    print(json.dumps(queries))
+
+
+def open_link(client, deps, props, search):
+    from startup_time import callback_bodies
+
+    start = time.perf_counter()
+    restored = call(client, dependency(deps, 'shared-view-query'), [prop('shared-view-query', 'data', search)], [])
+    props = {component_id: dict(values) for component_id, values in props.items()}
+    for component_id, values in restored.items():
+        props[component_id].update(values)
+    props['year-slider-settled']['data'] = props['year-slider']['value']
+    props['map-year-slider-settled']['data'] = props['map-year-slider']['value']
+    projection = props['map-projection-dropdown']['value']
+    props['map-projection-family']['data'] = 'orthographic' if projection == 'orthographic' else 'natural earth'
+    for body in callback_bodies(deps, props):
+        if body['inputs'] and body['inputs'][0]['id'] in ('shared-view-query', 'share-button'):
+            continue
+        response = client.post('/_dash-update-component', json=body)
+        assert response.status_code in (200, 204), (body['output'], response.status_code)
+    return time.perf_counter() - start
+
+
+def child(queries):
+    from startup_time import initial_props
+
+    import app
+    client = app.server.test_client()
+    deps = client.get('/_dash-dependencies').get_json()
+    props = initial_props(client.get('/_dash-layout').get_json())
+    seconds = [open_link(client, deps, props, search) for search in queries]
+    stats = app.figure_cache.stats()
+    print(json.dumps({'seconds': seconds, 'hits': stats['hits'], 'misses': stats['misses']}))
+
+
+def run(args, env, workdir):
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), *args], cwd=workdir, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--views', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--share', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--open', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.share or args.open:
+        sys.path.insert(0, ROOT)
+        return share(args.share, args.seed) if args.share else child(json.loads(args.open))
+
+    workdir = tempfile.mkdtemp()
+    shutil.copytree('Data', os.path.join(workdir, 'Data'),
+                    ignore=shutil.ignore_patterns('store', 'profiles', '*cache*', 'prerendered*', 'shared_views*'))
+    try:
+        env = {**os.environ, **BASE_ENV}
+        queries = run(['--share', str(args.views), '--seed', str(args.seed)], env, workdir)
+        with sqlite3.connect(os.path.join(workdir, 'Data', 'shared_views.sqlite')) as conn:
+            bundles = [bytes(row[0]) for row in conn.execute('SELECT bundle FROM views')]
+        print(f"{len(bundles)} bundles: {sum(map(len, bundles)) / len(bundles) / 1024:.0f} KB compressed, "
+              f"{sum(len(gzip.decompress(b)) for b in bundles) / len(bundles) / 1024:.0f} KB JSON per view")
+
+        print(f"{'mode':<9}{'open link ms (mean / max)':>27}{'hits':>6}{'misses':>8}")
+        for mode, shared in (('rebuilt', '0'), ('bundle', '1')):
+            report = run(['--open', json.dumps(queries)], {**env, 'SHARED_VIEWS': shared}, workdir)
+            seconds = report['seconds']
+            opened = f"{sum(seconds) / len(seconds) * 1000:.0f} / {max(seconds) * 1000:.0f}"
+            print(f"{mode:<9}{opened:>27}{report['hits']:>6}{report['misses']:>8}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+"""Callbacks executed per slider gesture, with and without event coalescing.
+
+Serves the app on a local threaded server (separate process, figure cache
+off) and replays slider gestures the way the browser sends them: each
+committed value requests every server callback the slider reaches, without
+waiting for earlier responses, over at most ``--connections`` connections.
+6 is the browser's HTTP/1.1 per-host limit, so newer requests queue in the
+browser; behind an HTTP/2 proxy (try 64) they all reach the server at once,
+which is where the server-side guard helps. Gestures:
+
+* ``keys``  - an arrow key held on the year slider (30 steps, 33 ms apart)
+* ``clicks`` - 6 clicks along the year slider track, 120 ms apart
+* ``drag``  - a year-slider handle dragged over 50 years in one second with
+              ``updatemode='drag'``; the dashboard uses ``'mouseup'`` (Dash's
+              default), which commits a drag once, so this is the worst case
+* ``map``   - an arrow key held on the map year slider (20 steps, 33 ms apart)
+
+Each gesture runs with nothing, the client-side settle delay
+(``SLIDER_SETTLE_MS``, applied to the event times here as the clientside
+callback does), the server-side ``request_guard`` and both. Reported: value
+commits sent, callback requests, callbacks completed (not stopped as
+superseded by ``request_guard``, from ``/metrics``) and the time from the last
+input event to the last response.
+
+    python benchmarks/slider_coalescing.py [--settle-ms 150] [--connections 6]
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, wait
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCES = ['coal_consumption', 'oil_consumption', 'gas_consumption']
+INITIAL = {
+    'country-dropdown': 'World', 'year-slider-settled': [1965, 2022], 'energy-source-checklist': SOURCES,
+    'map-projection-family': 'natural earth', 'map-metric-dropdown': 'primary_energy_consumption',
+    'map-percapita-toggle': [], 'map-year-slider-settled': 2022, 'map-animate-toggle': [],
+}
+SERVE = """
+import logging, sys
+from werkzeug.serving import make_server
+sys.path.insert(0, {root!r})
+import app
+logging.getLogger('werkzeug').setLevel(logging.ERROR)
+server = make_server('127.0.0.1', 0, app.server, threaded=True)
+print(server.server_port, flush=True)
+server.serve_forever()
+"""
+
+
+def gestures():
+    """name -> (slider id, [(seconds from start, value), ...])"""
+    return {
+        'keys': ('year-slider', [(i * 0.033, [1965, 2022 - i]) for i in range(30)]),
+        'clicks': ('year-slider', [(i * 0.12, [1965 + 5 * i, 2022]) for i in range(6)]),
+        'drag': ('year-slider', [(i * 0.02, [1965, 1972 + i]) for i in range(50)]),
+        'map': ('map-year-slider', [(i * 0.033, 2020 - i) for i in range(20)]),
+    }
+
+
+def settle(events, delay):
+    """Commits left after the clientside settle delay: values stable for ``delay`` seconds."""
+    if not delay:
+        return events
+    return [(t + delay, value) for (t, value), following in zip(events, events[1:] + [None])
+            if following is None or following[0] - t >= delay]
+
+
+def post(url, body):
+    request = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request) as response:
+        return response.read()
+
+
+def get(url):
+    with urllib.request.urlopen(url) as response:
+        return response.read().decode()
+
+
+class Page:
+    """The server callbacks as the browser sees them, after the initial page load."""
+
+    def __init__(self, base):
+        self.base = base
+        self.url = base + '/_dash-update-component'
+        self.callbacks = [spec for spec in json.loads(get(base + '/_dash-dependencies'))
+                          if not spec.get('clientside_function')]
+        self.values = dict(INITIAL)
+        # Load the initial figures to learn the series keys the page would hold
+        for spec in self.callbacks:
+            if any(dep['id'].endswith('-series') for dep in spec['state']):
+                component_id = spec['output'].rsplit('.', 1)[0]
+                figure = json.loads(post(self.url, self.body(spec, None)))['response'][component_id]['figure']
+                self.values[f'{component_id}-series'] = figure['layout']['meta']['series']
+
+    def body(self, spec, page, changed=None):
+        component_id, prop = spec['output'].rsplit('.', 1)
+        body = {'output': spec['output'], 'outputs': {'id': component_id, 'property': prop},
+                'inputs': [dict(dep, value=self.values.get(dep['id'])) for dep in spec['inputs']],
+                'state': [dict(dep, value=self.values.get(dep['id'])) for dep in spec['state']],
+                'changedPropIds': [changed] if changed else []}
+        if page is not None:
+            body['page'] = page
+        return json.dumps(body).encode()
+
+    def commit(self, slider_id, value, page):
+        """Request bodies for every server callback listening to the slider's settled store."""
+        store = f'{slider_id}-settled'
+        self.values[store] = value
+        return [self.body(spec, page, f'{store}.data') for spec in self.callbacks
+                if any(dep['id'] == store for dep in spec['inputs'])]
+
+    def counters(self):
+        text = get(self.base + '/metrics')
+        return [sum(float(v) for v in re.findall(rf'^{name}{{[^}}]*}} (\S+)$', text, re.M))
+                for name in ('dashboard_callbacks_total', 'dashboard_superseded_callbacks_total')]
+
+
+def replay(page, slider_id, events, settle_s, page_id, connections):
+    commits = settle(events, settle_s)
+    requests_before, skipped_before = page.counters()
+    futures = []
+    with ThreadPoolExecutor(connections) as browser:
+        start = time.perf_counter()
+        for t, value in commits:
+            time.sleep(max(0.0, start + t - time.perf_counter()))
+            futures += [browser.submit(post, page.url, body) for body in page.commit(slider_id, value, page_id)]
+        wait(futures)
+        done = time.perf_counter()
+    requests_after, skipped_after = page.counters()
+    page.commit(slider_id, INITIAL[f'{slider_id}-settled'], None)
+    requests = int(requests_after - requests_before)
+    return len(commits), requests, requests - int(skipped_after - skipped_before), (done - start - events[-1][0]) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--settle-ms', type=float, default=float(os.environ.get('SLIDER_SETTLE_MS', 150)))
+    parser.add_argument('--connections', type=int, default=6)
+    args = parser.parse_args()
+
+    env = dict(os.environ, FIGURE_CACHE_BACKEND='none', BACKGROUND_CALLBACKS='none')
+    server = subprocess.Popen([sys.executable, '-c', SERVE.format(root=ROOT)], env=env, stdout=subprocess.PIPE, text=True)
+    try:
+        page = Page(f'http://127.0.0.1:{server.stdout.readline().strip()}')
+        modes = [('none', 0, False), ('settle', args.settle_ms / 1000, False),
+                 ('guard', 0, True), ('settle+guard', args.settle_ms / 1000, True)]
+        print(f"cpus={os.cpu_count()} settle={args.settle_ms:g} ms connections={args.connections}")
+        print(f"{'gesture':<9}{'mode':<14}{'events':>7}{'commits':>8}{'requests':>9}{'completed':>10}{'last->done ms':>15}")
+        run = 0
+        for name, (slider_id, events) in gestures().items():
+            for mode, settle_s, guard in modes:
+                run += 1
+                page_id = f'bench-{run}' if guard else None
+                commits, requests, completed, tail_ms = replay(page, slider_id, events, settle_s, page_id,
+                                                               args.connections)
+                print(f"{name:<9}{mode:<14}{len(events):>7}{commits:>8}{requests:>9}{completed:>10}{tail_ms:>15.0f}")
+    finally:
+        server.terminate()
+
+
+if __name__ == '__main__':
+    main()
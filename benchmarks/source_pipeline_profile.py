@@ -0,0 +1,114 @@
+"""Profile: per-chart data preparation before vs after the shared source pipeline.
+
+The trend, stacked area, stream, sunburst and treemap callbacks each used to
+run their own dropna / melt / ``str.replace`` chain over the country's rows.
+They now read one ``SourceData`` (``build_source_data``: a NumPy melt with
+labels mapped from ``SOURCE_LABELS``) that is computed once per
+(country, years, sources) and shared by every callback.
+
+For each chart this prints the old per-callback preparation time next to the
+new one (the shared stage's cost split across the charts that use it, since
+one interaction fans out to all of them), and the end-to-end callback time.
+
+    python benchmarks/source_pipeline_profile.py [--repeat 200]
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+
+
+def _label(series):
+    return series.str.replace('_consumption', '').str.replace('_', ' ').str.title()
+
+
+# The transforms the builders ran before the shared pipeline
+def old_trend(filtered_df, sources):
+    data = filtered_df[['year'] + sources].dropna(subset=sources, how='all')
+    long_df = data.melt(id_vars=['year'], value_vars=sources, var_name='Energy Source', value_name='Consumption')
+    long_df = long_df.dropna(subset=['Consumption'])
+    long_df['Energy Source'] = _label(long_df['Energy Source'])
+    return long_df
+
+
+def old_stacked(filtered_df, sources):
+    data = filtered_df[['year'] + sources].dropna(subset=sources, how='all')
+    long_df = data.melt(id_vars='year', var_name='Energy Source', value_name='Consumption')
+    long_df = long_df.dropna(subset=['Consumption'])
+    long_df['Energy Source'] = _label(long_df['Energy Source'])
+    return long_df
+
+
+def old_sunburst(filtered_df, sources):
+    latest = filtered_df[filtered_df['year'] == filtered_df['year'].max()]
+    sb_df = latest[sources].iloc[0].reset_index()
+    sb_df.columns = ['Energy Source', 'Consumption']
+    sb_df['Energy Source'] = _label(sb_df['Energy Source'])
+    sb_df['All'] = 'Total Energy'
+    return sb_df
+
+
+def old_treemap(filtered_df, sources):
+    long_df = filtered_df.melt(id_vars=['country'], value_vars=sources, var_name='Energy Source', value_name='Consumption')
+    long_df = long_df.dropna(subset=['Consumption'])
+    long_df = long_df[long_df['Consumption'] > 0]
+    long_df['Energy Source'] = _label(long_df['Energy Source'])
+    return long_df
+
+
+OLD_TRANSFORMS = {
+    'energy-source-trend-chart': old_trend,
+    'stacked-area-chart': old_stacked,
+    'stream-graph': old_stacked,
+    'sunburst-chart': old_sunburst,
+    'energy-treemap': old_treemap,
+}
+
+
+def per_query_ms(fn, queries):
+    return timeit.timeit(lambda: [fn(*q) for q in queries], number=1) / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    index = app.get_country_index()
+    df = app.get_df()
+    rng = random.Random(0)
+    countries = list(index.blocks)
+    year_min, year_max = int(df['year'].min()), int(df['year'].max())
+    queries = []
+    for _ in range(args.repeat):
+        lo = rng.randint(year_min, year_max - 1)
+        sources = sorted(rng.sample(app.ENERGY_SOURCES, rng.randint(1, len(app.ENERGY_SOURCES))),
+                         key=app.ENERGY_SOURCES.index)
+        filtered_df = index.select(rng.choice(countries), [lo, rng.randint(lo + 1, year_max)])
+        if len(filtered_df):
+            queries.append((filtered_df, sources))
+
+    shared_ms = per_query_ms(app.build_source_data, queries)
+    shared_per_chart_ms = shared_ms / len(OLD_TRANSFORMS)
+    prepared = [(app.build_source_data(f, s), 'Country', s) for f, s in queries]
+
+    print(f"queries={len(queries)}  shared build_source_data={shared_ms:.2f} ms/interaction")
+    print(f"{'chart':<28}{'old prep ms':>12}{'new prep ms':>12}{'saved ms':>10}{'callback ms':>13}")
+    total_old = 0.0
+    for graph_id, transform in OLD_TRANSFORMS.items():
+        old_ms = per_query_ms(transform, queries)
+        builder = app.SOURCE_CHART_BUILDERS[graph_id]
+        callback_ms = per_query_ms(builder, prepared[:50]) + shared_per_chart_ms
+        total_old += old_ms
+        print(f"{graph_id:<28}{old_ms:>12.2f}{shared_per_chart_ms:>12.2f}"
+              f"{old_ms - shared_per_chart_ms:>10.2f}{callback_ms:>13.2f}")
+    print(f"{'total per interaction':<28}{total_old:>12.2f}{shared_ms:>12.2f}{total_old - shared_ms:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
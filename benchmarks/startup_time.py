@@ -0,0 +1,125 @@
+"""Startup cost: app import time, time to first responses and worker memory.
+
+Each mode runs in a fresh interpreter, imports ``app`` (timed), then forks a
+child the way a gunicorn master forks a worker. The child serves, through
+the Flask test client, the index page (what a health check sees), the
+layout and the callbacks the page fires on load, timing each from the fork,
+and reports its unique (not shared with the master) memory afterwards.
+
+* ``lazy``    - the default: nothing heavy happens at import
+* ``preload`` - ``STARTUP_PRELOAD=1``, as run under ``gunicorn --preload``:
+  data and heavy modules are loaded in the master before the fork
+
+    python benchmarks/startup_time.py [--modes lazy preload]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = {'lazy': {}, 'preload': {'STARTUP_PRELOAD': '1'}}
+HEAVY_MODULES = ['pandas.core.frame', 'plotly.express._chart_types']
+
+
+def initial_props(layout):
+    props = {}
+    stack = [layout]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+        elif isinstance(node, dict) and 'props' in node:
+            if 'id' in node['props']:
+                props[node['props']['id']] = node['props']
+            stack.append(node['props'].get('children'))
+    return props
+
+
+def callback_body(spec, props):
+    """``_dash-update-component`` body of a server callback, with its inputs and state taken from ``props``."""
+    def values(deps):
+        return [{'id': dep['id'], 'property': dep['property'],
+                 'value': props.get(dep['id'], {}).get(dep['property'])} for dep in deps]
+
+    # Multi-output callbacks ('..a.value...b.value..') take a list, as the renderer sends it
+    outputs = [dict(zip(('id', 'property'), output.split('@')[0].rsplit('.', 1)))
+               for output in spec['output'].strip('.').split('...')]
+    return {'output': spec['output'], 'outputs': outputs if spec['output'].startswith('..') else outputs[0],
+            'inputs': values(spec['inputs']), 'changedPropIds': [], 'state': values(spec['state'])}
+
+
+def callback_bodies(dependencies, props):
+    """Bodies of the server callbacks the page fires on load."""
+    return [callback_body(spec, props) for spec in dependencies
+            if spec.get('clientside_function') is None and not spec.get('prevent_initial_call')]
+
+
+def worker(app, forked):
+    import psutil
+
+    client = app.server.test_client()
+    timings = {}
+
+    def timed(name, method, url, **kwargs):
+        response = getattr(client, method)(url, **kwargs)
+        assert response.status_code in (200, 204), (url, response.status_code)
+        timings[name] = time.perf_counter() - forked
+        return response
+
+    timed('index', 'get', '/')
+    props = initial_props(timed('layout', 'get', '/_dash-layout').get_json())
+    bodies = callback_bodies(client.get('/_dash-dependencies').get_json(), props)
+    for i, body in enumerate(bodies):
+        timed('first callback' if i == 0 else 'callbacks', 'post', '/_dash-update-component', json=body)
+    return {'seconds': timings, 'uss_mb': psutil.Process().memory_full_info().uss / 2 ** 20}
+
+
+def child():
+    start = time.perf_counter()
+    import app
+    imported = time.perf_counter() - start
+    loaded = [name.split('.')[0] for name in HEAVY_MODULES if name in sys.modules]
+
+    read, write = os.pipe()
+    forked = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read)
+        with os.fdopen(write, 'w') as out:
+            json.dump(worker(app, forked), out)
+        os._exit(0)
+    os.close(write)
+    with os.fdopen(read) as result:
+        report = json.load(result)
+    os.waitpid(pid, 0)
+    report.update(import_s=imported, heavy_loaded=loaded)
+    print(json.dumps(report))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--modes', nargs='+', default=list(MODES), choices=list(MODES))
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        sys.path.insert(0, ROOT)
+        return child()
+
+    print(f"{'mode':<9}{'import s':>9}{'index s':>9}{'layout s':>10}{'1st callback s':>16}{'all callbacks s':>17}"
+          f"{'worker USS MB':>15}  heavy modules at import")
+    for mode in args.modes:
+        env = {**os.environ, **MODES[mode]}
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), '--child'], env=env,
+                             capture_output=True, text=True, check=True).stdout
+        report = json.loads(out.strip().splitlines()[-1])
+        seconds = report['seconds']
+        print(f"{mode:<9}{report['import_s']:>9.2f}{seconds['index']:>9.2f}{seconds['layout']:>10.2f}"
+              f"{seconds['first callback']:>16.2f}{seconds.get('callbacks', seconds['first callback']):>17.2f}"
+              f"{report['uss_mb']:>15.0f}  {', '.join(report['heavy_loaded']) or '-'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,334 @@
+"""Reproducible benchmark suite for the dashboard callbacks.
+
+For each ``--scale`` a synthetic dataset with the real schema is generated
+(``synthetic_data.py``, cached under ``--work``) and the app is imported in a
+fresh process whose working directory holds only that dataset. Every
+scenario below is then replayed twice:
+
+* ``direct`` - calling the chart helpers the callbacks call (``get_*_chart``)
+* ``flask``  - POSTing ``_dash-update-component`` through the Flask test client
+
+Each step of a scenario changes one control; the charts whose callbacks it
+triggers are taken from the registered callback graph. Reported per chart and
+per scenario: latency p50/p95/p99/mean, payload bytes (response body for
+``flask``, figure JSON for ``direct``) and the Python allocation peak
+(tracemalloc, from one extra traced replay), plus the process RSS high-water mark.
+The figure cache and background callbacks are off so every call does the
+work (``--cache`` keeps the cache).
+
+Results are written as JSON; ``--compare`` diffs two result files.
+
+    python benchmarks/suite.py --scale 1 10 [--repeat 3] [--out results.json]
+    python benchmarks/suite.py --compare before.json after.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import synthetic_data  # noqa: E402
+
+SOURCES_3 = ['coal_consumption', 'oil_consumption', 'gas_consumption']
+DEFAULT_STATE = {
+    'country-dropdown': 'World',
+    'year-slider': [1965, 2022],
+    'energy-source-checklist': SOURCES_3,
+    'map-projection-dropdown': 'natural earth',
+    'map-metric-dropdown': 'primary_energy_consumption',
+    'map-percapita-toggle': [],
+    'map-year-slider': 2020,
+    'map-animate-toggle': [],
+    'comparison-countries': ['Africa', 'Asia', 'Europe', 'North America', 'South America'],
+    'comparison-measure': 'consumption',
+    'comparison-rollup': [],
+    'correlation-view': 'matrix',
+    'correlation-window': 10,
+}
+
+
+def scenarios(countries):
+    """name -> list of (control id, new value) steps, applied in order."""
+    return {
+        'country_switch': [('country-dropdown', c) for c in countries[:8]],
+        'year_range_drag': [('year-slider', [1965, end]) for end in range(1980, 2023, 3)],
+        'source_toggles': [('energy-source-checklist', SOURCES_3[:i] + extra)
+                           for i in (1, 2, 3) for extra in ([], ['solar_consumption', 'wind_consumption'])],
+        'map_year_scrub': [('map-year-slider', year) for year in range(2000, 2021, 2)],
+        'map_animation': [('map-animate-toggle', ['animate']), ('map-metric-dropdown', 'coal_consumption'),
+                          ('map-percapita-toggle', ['per_capita'])],
+    }
+
+
+# ─── child process: one scale ─────────────────────────────────────────────
+
+def control_values(state):
+    """Layout property values for a dashboard state, incl. the stores clientside callbacks fill."""
+    values = dict(state)
+    values['map-projection-family'] = 'orthographic' if state['map-projection-dropdown'] == 'orthographic' else 'natural earth'
+    values['year-slider-settled'] = state['year-slider']
+    values['map-year-slider-settled'] = state['map-year-slider']
+    return values
+
+
+def triggered(app, control_id):
+    """(output, input specs, state specs) of the server callbacks ``control_id`` reaches, following clientside hops."""
+    specs = app.app._callback_list
+    frontier, seen, found = [control_id], set(), []
+    while frontier:
+        current = frontier.pop()
+        for spec in specs:
+            if not any(dep['id'] == current for dep in spec['inputs']):
+                continue
+            component_id = spec['output'].strip('.').rsplit('.', 1)[0]
+            if spec.get('clientside_function') is not None:
+                if component_id not in seen:
+                    seen.add(component_id)
+                    frontier.append(component_id)
+            else:
+                found.append((spec['output'], spec['inputs'], spec['state']))
+    return found
+
+
+def chart_id(output):
+    component_id = output.rsplit('.', 1)[0]
+    return 'global-energy-map' if component_id == 'map-figure-store' else component_id
+
+
+def call_direct(app, output, state):
+    graph_id = chart_id(output)
+    if graph_id == 'global-energy-map':
+        figure = app.get_global_energy_map(control_values(state)['map-projection-family'], state['map-metric-dropdown'],
+                                           state['map-percapita-toggle'], state['map-year-slider'],
+                                           state['map-animate-toggle'])
+    elif graph_id == 'energy-correlation-heatmap':
+        figure = app.get_correlation_heatmap(state['country-dropdown'], state['year-slider'],
+                                             state['energy-source-checklist'])
+    elif graph_id == 'country-comparison-chart':
+        figure = app.get_comparison_chart(state['comparison-countries'], state['year-slider'],
+                                          state['energy-source-checklist'], state['comparison-measure'],
+                                          state['comparison-rollup'])
+    elif graph_id in app.SOURCE_CHART_BUILDERS:
+        figure = app.get_source_chart(graph_id, state['country-dropdown'], state['year-slider'],
+                                      state['energy-source-checklist'])
+    else:
+        figure = app.get_country_chart(graph_id, state['country-dropdown'], state['year-slider'])
+    return len(fast_json.to_bytes(figure))
+
+
+def call_flask(client, output, inputs, states, state, changed, shown):
+    """POST one callback; ``shown`` holds the series keys the browser would mirror from the figures."""
+    values = dict(control_values(state), **shown)
+    component_id, prop = output.rsplit('.', 1)
+    body = {'output': output, 'outputs': {'id': component_id, 'property': prop},
+            'inputs': [{'id': dep['id'], 'property': dep['property'], 'value': values.get(dep['id'])} for dep in inputs],
+            'changedPropIds': [changed],
+            'state': [{'id': dep['id'], 'property': dep['property'], 'value': values.get(dep['id'])} for dep in states]}
+    response = client.post('/_dash-update-component', json=body)
+    if response.status_code not in (200, 204):
+        raise RuntimeError(f'{output}: HTTP {response.status_code}')
+    return response.data
+
+
+def remember_series(output, data, shown):
+    """Mirror a figure's layout.meta.series into its '<graph id>-series' store, as the clientside callback does."""
+    component_id = output.rsplit('.', 1)[0]
+    figure = json.loads(data)['response'][component_id]['figure']
+    if '__dash_patch_update' not in figure:
+        shown[f'{component_id}-series'] = (figure.get('layout', {}).get('meta') or {}).get('series')
+
+
+def summarize(samples):
+    ms = np.array([s[0] for s in samples]) * 1000
+    return {'n': len(ms), 'p50_ms': float(np.percentile(ms, 50)), 'p95_ms': float(np.percentile(ms, 95)),
+            'p99_ms': float(np.percentile(ms, 99)), 'mean_ms': float(ms.mean()),
+            'bytes_mean': float(np.mean([s[1] for s in samples]))}
+
+
+def run_scale(args):
+    global fast_json
+    sys.path.insert(0, ROOT)
+    load_start = time.perf_counter()
+    import app
+    import fast_json
+    load_s = time.perf_counter() - load_start
+
+    client = app.server.test_client()
+    countries = sorted(app.get_country_index().blocks)
+
+    def replay(steps, mode):
+        per_chart, step_ms, shown = {}, [], {}
+        state = dict(DEFAULT_STATE)
+        if not args.cache:
+            app.figure_cache.clear()
+            app._cached_source_data.cache_clear()
+        for control_id, value in steps:
+            state[control_id] = value
+            step_start = time.perf_counter()
+            for output, inputs, states in triggered(app, control_id):
+                start = time.perf_counter()
+                if mode == 'direct':
+                    size = call_direct(app, output, state)
+                else:
+                    data = call_flask(client, output, inputs, states, state, f'{control_id}.value', shown)
+                    size = len(data)
+                per_chart.setdefault(chart_id(output), []).append((time.perf_counter() - start, size))
+                if mode == 'flask' and states:
+                    remember_series(output, data, shown)
+            step_ms.append((time.perf_counter() - step_start) * 1000)
+        return per_chart, step_ms
+
+    results = {}
+    for name, steps in scenarios(countries).items():
+        results[name] = {}
+        for mode in ('direct', 'flask'):
+            per_chart, step_ms = {}, []
+            for _ in range(args.repeat):
+                charts, steps_ms = replay(steps, mode)
+                for graph_id, samples in charts.items():
+                    per_chart.setdefault(graph_id, []).extend(samples)
+                step_ms += steps_ms
+            # Separate pass for the allocation peak: tracing slows every call down
+            tracemalloc.start()
+            replay(steps, mode)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results[name][mode] = {
+                'charts': {graph_id: summarize(samples) for graph_id, samples in sorted(per_chart.items())},
+                'interaction': {'n': len(step_ms), 'p50_ms': float(np.percentile(step_ms, 50)),
+                                'p95_ms': float(np.percentile(step_ms, 95)), 'p99_ms': float(np.percentile(step_ms, 99)),
+                                'mean_ms': float(np.mean(step_ms))},
+                'bytes_per_interaction': float(sum(s[1] for samples in per_chart.values() for s in samples) / len(step_ms)),
+                'tracemalloc_peak_mb': peak / 1e6,
+            }
+    return {
+        'rows': int(len(app.get_df())),
+        'countries': len(countries),
+        'import_s': load_s,
+        'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'scenarios': results,
+    }
+
+
+# ─── parent process ───────────────────────────────────────────────────────
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def dataset_dir(work, scale, seed):
+    directory = os.path.join(work, f'scale-{scale:g}-seed-{seed}')
+    if not os.path.exists(os.path.join(directory, 'Data', 'World Energy Consumption.csv')):
+        print(f'generating {scale:g}x dataset ...', file=sys.stderr)
+        synthetic_data.write(os.path.join(directory, 'Data'), scale, seed)
+    return directory
+
+
+def run(args):
+    import dash
+    import pandas as pd
+    import plotly
+
+    report = {
+        'meta': {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'git': git_revision(),
+                 'python': platform.python_version(), 'platform': platform.platform(),
+                 'cpus': os.cpu_count(), 'dash': dash.__version__, 'plotly': plotly.__version__,
+                 'pandas': pd.__version__, 'numpy': np.__version__,
+                 'repeat': args.repeat, 'cache': args.cache, 'seed': args.seed},
+        'scales': {},
+    }
+    for scale in args.scale:
+        cwd = dataset_dir(args.work, scale, args.seed)
+        env = dict(os.environ, BACKGROUND_CALLBACKS='none', FIGURE_POOL='none')
+        if not args.cache:
+            env['FIGURE_CACHE_BACKEND'] = 'none'
+        child = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', '--repeat', str(args.repeat)]
+                               + (['--cache'] if args.cache else []),
+                               cwd=cwd, env=env, capture_output=True, text=True)
+        if child.returncode:
+            sys.exit(f'{scale:g}x run failed:\n{child.stderr}')
+        report['scales'][f'{scale:g}x'] = json.loads(child.stdout.strip().splitlines()[-1])
+        print_scale(f'{scale:g}x', report['scales'][f'{scale:g}x'])
+
+    out = args.out or os.path.join(BENCH_DIR, 'results', f"{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump(report, f, indent=1, sort_keys=True)
+    print(f'results: {out}')
+
+
+def print_scale(label, result):
+    print(f"\n{label}: {result['rows']:,} rows, {result['countries']} countries, import {result['import_s']:.2f} s, "
+          f"max RSS {result['max_rss_mb']:.0f} MB")
+    print(f"{'scenario':<18}{'mode':<8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'KB/step':>10}{'peak MB':>9}  slowest chart (p95)")
+    for name, modes in result['scenarios'].items():
+        for mode, r in modes.items():
+            slowest = max(r['charts'].items(), key=lambda item: item[1]['p95_ms'])
+            i = r['interaction']
+            print(f"{name:<18}{mode:<8}{i['p50_ms']:>9.1f}{i['p95_ms']:>9.1f}{i['p99_ms']:>9.1f}"
+                  f"{r['bytes_per_interaction'] / 1e3:>10.1f}{r['tracemalloc_peak_mb']:>9.1f}  "
+                  f"{slowest[0]} {slowest[1]['p95_ms']:.1f} ms")
+
+
+def compare(before_path, after_path):
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    print(f"before {before['meta'].get('git')} ({before['meta']['timestamp']})  "
+          f"after {after['meta'].get('git')} ({after['meta']['timestamp']})")
+    print(f"{'scale':<7}{'scenario':<18}{'mode':<8}{'p95 before':>12}{'p95 after':>11}{'change':>9}"
+          f"{'KB before':>11}{'KB after':>10}")
+    for scale, result in after['scales'].items():
+        old = before['scales'].get(scale)
+        if old is None:
+            continue
+        for name, modes in result['scenarios'].items():
+            for mode, r in modes.items():
+                o = old['scenarios'].get(name, {}).get(mode)
+                if o is None:
+                    continue
+                p95_old, p95_new = o['interaction']['p95_ms'], r['interaction']['p95_ms']
+                print(f"{scale:<7}{name:<18}{mode:<8}{p95_old:>12.1f}{p95_new:>11.1f}"
+                      f"{(p95_new - p95_old) / p95_old * 100:>8.0f}%"
+                      f"{o['bytes_per_interaction'] / 1e3:>11.1f}{r['bytes_per_interaction'] / 1e3:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=float, nargs='+', default=[1])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--cache', action='store_true', help='keep the figure cache on')
+    parser.add_argument('--work', default=os.path.join(tempfile.gettempdir(), 'energy-dashboard-bench'),
+                        help='where generated datasets are kept')
+    parser.add_argument('--out', help='result JSON path (default benchmarks/results/<timestamp>.json)')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'))
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+    elif args.child:
+        print(json.dumps(run_scale(args)))
+    else:
+        run(args)
+
+
+if __name__ == '__main__':
+    main()
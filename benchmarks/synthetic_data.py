@@ -0,0 +1,126 @@
+"""Synthetic 'World Energy Consumption.csv' with the real schema, at any scale.
+
+The real file has one row per (country or region, year) from 1900 to 2022
+and ~130 columns: population/GDP, then a family of columns per energy source
+(``*_consumption``, ``*_share_energy``, ``*_electricity``, ...). Scale 1x
+matches its shape (~220 entities x 123 years); 10x and 100x add entities, so
+per-country slices keep their real length while the table grows.
+
+Values follow smooth per-entity growth curves with source-specific start
+years (no solar before 1965, ...), missing early history and a scattering of
+gaps, so filters, ``dropna`` and per-capita divisions behave as on the real
+data. Output is deterministic for a given ``--seed``.
+
+    python benchmarks/synthetic_data.py --scale 10 --out /tmp/bench10/Data
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+YEARS = np.arange(1900, 2023)
+BASE_ENTITIES = 220
+SOURCES = {
+    # prefix: first year with data
+    'biofuel': 1990, 'coal': 1900, 'gas': 1900, 'hydro': 1900, 'nuclear': 1965, 'oil': 1900,
+    'other_renewable': 1965, 'renewables': 1900, 'solar': 1965, 'wind': 1965,
+    'fossil': 1900, 'low_carbon': 1900,
+}
+SOURCE_COLUMNS = ['{}_cons_change_pct', '{}_cons_change_twh', '{}_consumption', '{}_elec_per_capita',
+                  '{}_electricity', '{}_energy_per_capita', '{}_share_elec', '{}_share_energy']
+OTHER_COLUMNS = ['carbon_intensity_elec', 'electricity_demand', 'electricity_generation', 'energy_cons_change_pct',
+                 'energy_cons_change_twh', 'energy_per_capita', 'energy_per_gdp', 'greenhouse_gas_emissions',
+                 'net_elec_imports', 'net_elec_imports_share_demand', 'per_capita_electricity',
+                 'primary_energy_consumption']
+REGIONS = ['World', 'Africa', 'Asia', 'Europe', 'North America', 'South America', 'Oceania',
+           'High-income countries', 'Low-income countries', 'Upper-middle-income countries',
+           'Lower-middle-income countries', 'European Union (27)', 'Non-OECD (EI)', 'OECD (EI)']
+
+
+def columns():
+    cols = ['country', 'year', 'iso_code', 'population', 'gdp']
+    for prefix in SOURCES:
+        cols += [pattern.format(prefix) for pattern in SOURCE_COLUMNS]
+    return cols + OTHER_COLUMNS
+
+
+def entities(scale):
+    count = int(BASE_ENTITIES * scale)
+    names, codes = [], []
+    for i in range(count - len(REGIONS)):
+        names.append(f'Country {i:05d}')
+        # Mostly real-looking ISO-3 codes, some OWID_* aggregates and blanks
+        codes.append(f'{chr(65 + i % 26)}{chr(65 + i // 26 % 26)}{chr(65 + i // 676 % 26)}' if i % 20 else
+                     (f'OWID_{i:04d}' if i % 40 else ''))
+    names += REGIONS
+    codes += ['OWID_WRL'] + [''] * (len(REGIONS) - 1)
+    return names, codes
+
+
+def generate(scale=1, seed=0):
+    rng = np.random.default_rng(seed)
+    names, codes = entities(scale)
+    n_entities, n_years = len(names), len(YEARS)
+    t = (YEARS - YEARS[0]) / (YEARS[-1] - YEARS[0])
+
+    def curve(low, high, start_year=1900):
+        """Per-entity logistic growth (entities x years), NaN before start_year."""
+        size = np.exp(rng.uniform(np.log(low), np.log(high), (n_entities, 1)))
+        midpoint = rng.uniform(0.3, 0.9, (n_entities, 1))
+        values = size / (1 + np.exp(-10 * (t - midpoint)))
+        values *= rng.lognormal(0, 0.05, values.shape)
+        values[:, YEARS < start_year] = np.nan
+        return values
+
+    data = {
+        'country': np.repeat(names, n_years),
+        'year': np.tile(YEARS, n_entities),
+        'iso_code': np.repeat(codes, n_years),
+    }
+    population = curve(1e5, 1e9)
+    data['population'] = population
+    data['gdp'] = curve(1e9, 2e13, 1920)
+    for prefix, start_year in SOURCES.items():
+        consumption = curve(0.1, 5e3, start_year)
+        data[f'{prefix}_consumption'] = consumption
+        change = np.diff(consumption, axis=1, prepend=np.nan)
+        data[f'{prefix}_cons_change_twh'] = change
+        with np.errstate(divide='ignore', invalid='ignore'):
+            data[f'{prefix}_cons_change_pct'] = 100 * change / (consumption - change)
+            data[f'{prefix}_energy_per_capita'] = consumption * 1e9 / population
+        data[f'{prefix}_share_energy'] = rng.uniform(0, 60, consumption.shape)
+        data[f'{prefix}_electricity'] = curve(0.01, 1e3, max(start_year, 1985))
+        data[f'{prefix}_elec_per_capita'] = curve(1, 5e3, max(start_year, 1985))
+        data[f'{prefix}_share_elec'] = curve(0.1, 80, max(start_year, 1985))
+    for col in OTHER_COLUMNS:
+        data[col] = curve(0.1, 1e4, 1965)
+    data['primary_energy_consumption'] = sum(data[f'{p}_consumption'] for p in ('coal', 'oil', 'gas', 'hydro'))
+    data['greenhouse_gas_emissions'] = curve(1, 1e4, 1990)
+
+    for col in columns()[3:]:
+        values = np.asarray(data[col], dtype='float64').ravel()
+        values[rng.random(values.size) < 0.03] = np.nan
+        data[col] = values
+    return pd.DataFrame(data)[columns()]
+
+
+def write(out_dir, scale=1, seed=0):
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, 'World Energy Consumption.csv')
+    generate(scale, seed).to_csv(path, index=False, float_format='%.6g')
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=float, default=1, help='1, 10, 100, ... times the real row count')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default=os.path.join('Data'), help='directory for the CSV')
+    args = parser.parse_args()
+    path = write(args.out, args.scale, args.seed)
+    print(f'wrote {path} ({os.path.getsize(path) / 1e6:.1f} MB)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Bytes over the wire and modelled time to first paint for an initial page load.
+
+Replays a first visit through the Flask test client: the index page, its
+script bundles, the lazily loaded plotly.js and component chunks,
+``_dash-layout``, ``_dash-dependencies`` and every server callback the page
+fires on load (with the layout's initial values).
+It runs once without and once with the compression hook from
+``http_responses.py`` and reports, per request group, the bytes sent and the
+server time.
+
+Time to first paint is modelled, not measured in a browser, as
+server time + bytes / bandwidth + one round trip per request wave
+(page, bundles, layout, callbacks) for each ``--mbps`` link speed.
+
+    python benchmarks/wire_bytes.py [--mbps 5 50] [--rtt-ms 50]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('FIGURE_CACHE_BACKEND', 'none')
+
+import app  # noqa: E402
+import http_responses  # noqa: E402
+from startup_time import callback_bodies  # noqa: E402
+
+ACCEPT = {'Accept-Encoding': 'gzip, deflate, br'}
+# Chunks the page loads lazily for its graphs, sliders and dropdowns
+ASYNC_BUNDLES = [
+    '/_dash-component-suites/plotly/package_data/plotly.min.js',
+    '/_dash-component-suites/dash/dcc/async-graph.js',
+    '/_dash-component-suites/dash/dcc/async-slider.js',
+    '/_dash-component-suites/dash/dcc/async-dropdown.js',
+]
+REQUEST_WAVES = 4
+
+
+def initial_props():
+    props = {}
+    for component in app.serve_layout()._traverse():
+        component_id = getattr(component, 'id', None)
+        if component_id is not None:
+            props[component_id] = component.to_plotly_json()['props']
+    return props
+
+
+
+def page_load(client):
+    groups = {}
+
+    def fetch(group, method, url, **kwargs):
+        start = time.perf_counter()
+        response = getattr(client, method)(url, headers=ACCEPT, **kwargs)
+        elapsed = time.perf_counter() - start
+        assert response.status_code == 200, (url, response.status_code)
+        sent, server_s, count = groups.get(group, (0, 0.0, 0))
+        groups[group] = (sent + len(response.data), server_s + elapsed, count + 1)
+        return response
+
+    fetch('index', 'get', '/')
+    scripts = re.findall(r'src="(/_dash-component-suites/[^"]+)"', client.get('/').get_data(as_text=True))
+    for url in scripts + ASYNC_BUNDLES:
+        fetch('bundles', 'get', url)
+    fetch('layout', 'get', '/_dash-layout')
+    fetch('layout', 'get', '/_dash-dependencies')
+    for body in callback_bodies(app.app._callback_list, initial_props()):
+        fetch('callbacks', 'post', '/_dash-update-component', json=body)
+    return groups
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--mbps', type=float, nargs='+', default=[5, 50])
+    parser.add_argument('--rtt-ms', type=float, default=50)
+    args = parser.parse_args()
+
+    optimizer = next(f for f in app.server.after_request_funcs[None]
+                     if isinstance(f, http_responses.ResponseOptimizer))
+    client = app.server.test_client()
+    results = {}
+    for label, enabled in (('uncompressed', False), ('compressed', True)):
+        optimizer.compression = enabled
+        page_load(client)  # warm caches (bundle compression, map frames)
+        results[label] = page_load(client)
+
+    print(f"encoding: {'br' if http_responses.brotli else 'gzip'}")
+    print(f"{'group':<12}{'requests':>9}{'bytes before':>15}{'bytes after':>14}{'ratio':>8}"
+          f"{'ms before':>11}{'ms after':>10}")
+    for group, (before, before_s, count) in results['uncompressed'].items():
+        after, after_s, _ = results['compressed'][group]
+        print(f"{group:<12}{count:>9}{before:>15,}{after:>14,}{before / after:>7.1f}x"
+              f"{before_s * 1000:>11.1f}{after_s * 1000:>10.1f}")
+
+    for mbps in args.mbps:
+        paint = {}
+        for label, groups in results.items():
+            sent = sum(g[0] for g in groups.values())
+            server_s = sum(g[1] for g in groups.values())
+            paint[label] = server_s + sent * 8 / (mbps * 1e6) + REQUEST_WAVES * args.rtt_ms / 1000
+        print(f"modelled first paint @ {mbps:g} Mbps, {args.rtt_ms:g} ms RTT: "
+              f"{paint['uncompressed'] * 1000:.0f} ms -> {paint['compressed'] * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""Per-worker memory of a 4-worker deployment: full float64 table vs the lean data model.
+
+Each mode runs in a fresh interpreter on a copy of the dataset. It imports
+``app`` the way a gunicorn master does and forks ``--workers`` children, as
+the master forks workers. Each worker serves, through the Flask test client,
+the layout and the callbacks the page fires on load. The master waits until
+every worker is done, then measures all of them while they are still alive,
+so pages they share are split between them in PSS.
+
+* ``full``    - the previous data model: every column of the CSV as float64
+  (country still categorical, so the app runs unchanged), read by each worker
+* ``lean``    - the default: only ``USED_COLUMNS``, float32 values, int16 years
+  and integer-coded countries, read from the CSV by each worker
+* ``store``   - the same columns memory-mapped from ``python data_store.py``'s
+  store, shared through the page cache
+* ``preload`` - ``STARTUP_PRELOAD=1`` (``gunicorn --preload``): the lean table
+  and precomputations are loaded once in the master and shared copy-on-write
+
+With ``--scale`` the dataset is a synthetic one of that many times the real
+row count (``synthetic_data.py``) instead of ``Data/``; at 1x the libraries
+every worker imports outweigh the table.
+
+Reported per mode: the table's size, mean RSS, USS (memory only that worker
+holds) and PSS (its share of the rest) per worker, and the total PSS of
+master + workers, which is what the deployment costs.
+
+    python benchmarks/worker_memory.py [--workers 4] [--scale 10] [--modes full lean store preload]
+"""
+import argparse
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = {'full': {}, 'lean': {}, 'store': {}, 'preload': {'STARTUP_PRELOAD': '1'}}
+
+
+def full_table():
+    """The table as the app used to hold it: every CSV column, float64."""
+    import pandas as pd
+    from data_store import DATA_CSV
+
+    df = pd.read_csv(DATA_CSV)
+    df['country'] = df['country'].astype('category')
+    return df.sort_values(['country', 'year'], kind='stable', ignore_index=True)
+
+
+def page_callbacks(client):
+    from startup_time import callback_bodies, initial_props
+
+    props = initial_props(client.get('/_dash-layout').get_json())
+    return callback_bodies(client.get('/_dash-dependencies').get_json(), props)
+
+
+def worker(app, mode):
+    import data_store
+
+    if mode == 'full':
+        data_store.swap_snapshot(data_store.Snapshot(full_table(), 'full'))
+    client = app.server.test_client()
+    for body in page_callbacks(client):
+        response = client.post('/_dash-update-component', json=body)
+        assert response.status_code in (200, 204), response.status_code
+    df = data_store.current_snapshot().df
+    return df.memory_usage(deep=True).sum() / 2 ** 20
+
+
+def child(mode, workers):
+    import psutil
+
+    if mode == 'store':
+        import data_store
+        data_store.build_store()
+    import app
+
+    pids, pipes = [], []
+    for _ in range(workers):
+        read, write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read)
+            table_mb = worker(app, mode)
+            os.write(write, f'{table_mb}\n'.encode())
+            while True:  # alive until the master has measured every worker
+                signal.pause()
+        os.close(write)
+        pids.append(pid)
+        pipes.append(read)
+    table_mb = [float(os.fdopen(read).readline()) for read in pipes]
+
+    memory = [psutil.Process(pid).memory_full_info() for pid in pids]
+    master = psutil.Process().memory_full_info()
+    for pid in pids:
+        os.kill(pid, 9)
+        os.waitpid(pid, 0)
+    mb = 2 ** 20
+    print(json.dumps({
+        'table_mb': table_mb[0],
+        'rss_mb': sum(m.rss for m in memory) / len(memory) / mb,
+        'uss_mb': sum(m.uss for m in memory) / len(memory) / mb,
+        'pss_mb': sum(m.pss for m in memory) / len(memory) / mb,
+        'total_pss_mb': (master.pss + sum(m.pss for m in memory)) / mb,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--scale', type=float, help='synthetic dataset of this scale instead of Data/')
+    parser.add_argument('--modes', nargs='+', default=list(MODES), choices=list(MODES))
+    parser.add_argument('--child', choices=list(MODES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        sys.path.insert(0, ROOT)
+        return child(args.child, args.workers)
+
+    workdir = tempfile.mkdtemp()
+    if args.scale:
+        import synthetic_data
+        synthetic_data.write(os.path.join(workdir, 'Data'), args.scale)
+    else:
+        shutil.copytree('Data', os.path.join(workdir, 'Data'), ignore=shutil.ignore_patterns('store', 'profiles', '*cache*', '*.json'))
+    try:
+        print(f"{'mode':<9}{'table MB':>9}{'RSS MB':>8}{'USS MB':>8}{'PSS MB':>8}{f'total PSS MB ({args.workers}+1)':>22}")
+        for mode in args.modes:
+            env = {**os.environ, **MODES[mode], 'DATA_REFRESH_INTERVAL': '0', 'FIGURE_CACHE_BACKEND': 'memory',
+                   'BACKGROUND_CALLBACKS': 'none'}
+            out = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', mode, '--workers', str(args.workers)],
+                                 cwd=workdir, env=env, capture_output=True, text=True, check=True).stdout
+            report = json.loads(out.strip().splitlines()[-1])
+            print(f"{mode:<9}{report['table_mb']:>9.1f}{report['rss_mb']:>8.0f}{report['uss_mb']:>8.0f}"
+                  f"{report['pss_mb']:>8.0f}{report['total_pss_mb']:>22.0f}")
+            shutil.rmtree(os.path.join(workdir, 'Data', 'store'), ignore_errors=True)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
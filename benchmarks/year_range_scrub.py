@@ -0,0 +1,80 @@
+"""Bytes and server time per year-slider event for the time-series charts.
+
+"before" rebuilds and serializes the figure for every range, as each slider
+event used to (``get_source_chart`` / ``get_country_chart``, figure cache
+off); "after" POSTs the chart callback through the Flask test client with the
+series key the browser holds, so the response is the axis-range Patch. The
+"after" time includes Flask/Dash dispatch, which "before" does not.
+
+    python benchmarks/year_range_scrub.py [--country World]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('FIGURE_CACHE_BACKEND', 'none')
+
+import plotly.io as pio  # noqa: E402
+
+import app  # noqa: E402
+
+SOURCES = ['coal_consumption', 'oil_consumption', 'gas_consumption']
+
+
+def drag(start=1965, stop=2022):
+    """Year ranges of a drag of the right handle, one event per year."""
+    return [[start, end] for end in range(start + 5, stop + 1)]
+
+
+def rebuild(graph_id, country, year_range):
+    if graph_id in app.SOURCE_CHART_BUILDERS:
+        figure = app.get_source_chart(graph_id, country, year_range, SOURCES)
+    else:
+        figure = app.get_country_chart(graph_id, country, year_range)
+    return len(pio.to_json(figure, validate=False))
+
+
+def patch_request(client, graph_id, country, year_range, shown_series):
+    inputs = [{'id': 'country-dropdown', 'property': 'value', 'value': country},
+              {'id': 'year-slider-settled', 'property': 'data', 'value': year_range}]
+    if graph_id in app.SOURCE_CHART_BUILDERS:
+        inputs.append({'id': 'energy-source-checklist', 'property': 'value', 'value': SOURCES})
+    body = {'output': f'{graph_id}.figure', 'outputs': {'id': graph_id, 'property': 'figure'},
+            'inputs': inputs, 'changedPropIds': ['year-slider-settled.data'],
+            'state': [{'id': f'{graph_id}-series', 'property': 'data', 'value': shown_series}]}
+    return len(client.post('/_dash-update-component', json=body).data)
+
+
+def timed(fn, ranges):
+    sizes, ms = [], []
+    for year_range in ranges:
+        start = time.perf_counter()
+        sizes.append(fn(year_range))
+        ms.append((time.perf_counter() - start) * 1000)
+    return statistics.mean(sizes), statistics.median(ms)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--country', default='World')
+    args = parser.parse_args()
+    if not app.YEAR_WINDOW_CHARTS:
+        sys.exit('INCREMENTAL_YEARS is off')
+
+    client = app.server.test_client()
+    ranges = drag()
+    print(f"{len(ranges)} slider events per drag")
+    print(f"{'chart':<40}{'before B':>10}{'before ms':>11}{'after B':>9}{'after ms':>10}")
+    for graph_id in app.YEAR_WINDOW_CHARTS:
+        sources = SOURCES if graph_id in app.SOURCE_CHART_BUILDERS else []
+        shown_series = app.series_key(args.country, sources)
+        before_bytes, before_ms = timed(lambda r: rebuild(graph_id, args.country, r), ranges)
+        after_bytes, after_ms = timed(lambda r: patch_request(client, graph_id, args.country, r, shown_series), ranges)
+        print(f"{graph_id:<40}{before_bytes:>10.0f}{before_ms:>11.1f}{after_bytes:>9.0f}{after_ms:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""Source correlations for any year range from per-entity prefix sums.
+
+The correlation heatmap used to run ``DataFrame.corr()`` over the selected
+rows on every callback, which is too slow to repeat for every window of a
+rolling view. ``CorrelationEngine`` keeps, per entity and for every pair of
+the 9 source columns (i, j), running sums over the years in which both
+sources have a value::
+
+    n[i, j]    count
+    sx[i, j]   sum of x_i
+    sxx[i, j]  sum of x_i ** 2
+    sxy[i, j]  sum of x_i * x_j
+
+so the Pearson correlations of any k sources over any year range are a
+difference of two prefix rows and O(k^2) arithmetic, and every window of a
+rolling correlation is computed in one vectorized pass. Pairs use the years
+in which both sources have a value (pairwise-complete, like ``corr()`` on a
+frame with missing values). Values are centered on each source's mean
+before summing, which keeps ``sxx - sx ** 2 / n`` accurate.
+
+Prefix tables come from the aggregate cube's consumption values
+(aggregate_cube.py) and are built on first use of an entity (about 320 KB
+each for 123 years); the ``CORRELATION_CACHE_SIZE`` most recently used
+entities are kept. After a data refresh the tables of entities whose rows
+did not change are carried over to the new snapshot.
+
+Environment::
+
+    CORRELATION_CACHE_SIZE=64   entities whose prefix tables are kept
+"""
+import os
+import threading
+from collections import OrderedDict, namedtuple
+
+from aggregate_cube import cube_for
+from data_store import get_snapshot, register_derived_update
+from startup import lazy_import
+
+np = lazy_import('numpy')
+
+# Each table is (years + 1, sources, sources); row t sums the first t years
+PrefixSums = namedtuple('PrefixSums', ['n', 'sx', 'sxx', 'sxy'])
+
+
+def prefix_sums(values):
+    """``PrefixSums`` of a (year, source) array, NaN where a source has no value."""
+    valid = ~np.isnan(values)
+    mean = np.where(valid, values, 0).sum(axis=0, dtype='float64') / np.maximum(valid.sum(axis=0), 1)
+    x = np.where(valid, values - mean, 0.0)
+    both = valid[:, :, None] & valid[:, None, :]
+    tables = (both, x[:, :, None] * both, (x ** 2)[:, :, None] * both, x[:, :, None] * x[:, None, :])
+    return PrefixSums(*(np.concatenate([np.zeros((1,) + table.shape[1:]), np.cumsum(table, axis=0)])
+                        for table in tables))
+
+
+def correlations(sums, lo, hi, cols):
+    """Correlations[..., k, k] of ``cols`` between prefix rows ``lo`` and ``hi`` (ints or arrays)."""
+    grid = np.ix_(cols, cols)
+    n, sx, sxx, sxy = ((table[hi] - table[lo])[(Ellipsis,) + grid] for table in sums)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_x = sx / n
+        cov = sxy - sx * np.swapaxes(mean_x, -1, -2)
+        var = sxx - sx * mean_x
+        r = cov / np.sqrt(var * np.swapaxes(var, -1, -2))
+    # A constant series (variance at rounding level) has no correlation
+    flat = var <= 1e-12 * sxx
+    r[(n < 2) | flat | np.swapaxes(flat, -1, -2)] = np.nan
+    r = np.clip(r, -1, 1)
+    diagonal = np.arange(len(cols))
+    r[..., diagonal, diagonal] = np.where(np.isnan(r[..., diagonal, diagonal]), np.nan, 1.0)
+    return r, n
+
+
+class CorrelationEngine:
+    def __init__(self, cube, cache_size=64):
+        self.cube = cube
+        self.cache_size = cache_size
+        self._prefixes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def prefix(self, entity):
+        """``PrefixSums`` of one entity, built on first use and kept for the ``cache_size`` latest."""
+        with self._lock:
+            sums = self._prefixes.get(entity)
+            if sums is not None:
+                self._prefixes.move_to_end(entity)
+                return sums
+        sums = prefix_sums(self.cube.values[0][self.cube.entity_index[entity]])
+        with self._lock:
+            self._prefixes[entity] = sums
+            while len(self._prefixes) > self.cache_size:
+                self._prefixes.popitem(last=False)
+        return sums
+
+    def updated(self, cube, changed):
+        """An engine over ``cube`` keeping the prefix tables of entities not in ``changed``."""
+        engine = CorrelationEngine(cube, self.cache_size)
+        if np.array_equal(cube.years, self.cube.years) and cube.source_index == self.cube.source_index:
+            with self._lock:
+                engine._prefixes.update((entity, sums) for entity, sums in self._prefixes.items()
+                                        if entity not in changed and entity in cube.entity_index)
+        return engine
+
+    def _axes(self, entity, sources, year_range):
+        if entity not in self.cube.entity_index:
+            return None
+        cols = np.array([self.cube.source_index[source] for source in sources], dtype=np.intp)
+        lo = int(np.searchsorted(self.cube.years, year_range[0], side='left'))
+        hi = int(np.searchsorted(self.cube.years, year_range[1], side='right'))
+        return self.prefix(entity), cols, lo, hi
+
+    def matrix(self, entity, sources, year_range):
+        """(correlations[k, k], years used per pair[k, k]), or None for an unknown entity."""
+        axes = self._axes(entity, sources, year_range)
+        if axes is None:
+            return None
+        sums, cols, lo, hi = axes
+        return correlations(sums, lo, max(lo, hi), cols)
+
+    def rolling(self, entity, sources, year_range, window):
+        """(window end years, correlations[window, k, k]) of every ``window``-year window in range."""
+        axes = self._axes(entity, sources, year_range)
+        if axes is None:
+            return None
+        sums, cols, lo, hi = axes
+        ends = np.arange(lo + window, hi + 1)
+        r, _ = correlations(sums, ends - window, ends, cols)
+        return self.cube.years[ends - 1], r
+
+
+def engine_from_env(cube, environ=os.environ):
+    return CorrelationEngine(cube, int(environ.get('CORRELATION_CACHE_SIZE', '64')))
+
+
+def get_correlation_engine():
+    return get_snapshot().derived('correlation_engine', lambda snapshot: engine_from_env(cube_for(snapshot)))
+
+
+register_derived_update('correlation_engine',
+                        lambda engine, snapshot, changes: engine.updated(cube_for(snapshot), changes.countries))
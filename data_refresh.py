@@ -0,0 +1,131 @@
+"""Reload the dataset in the background when its file changes, without restarting workers.
+
+Each worker process runs a ``DataRefresher`` thread (started on the first
+request, so it also runs in forked gunicorn workers) that polls the file
+``load_dataframe`` reads - the store's ``meta.json`` or the CSV - every
+``DATA_REFRESH_INTERVAL`` seconds. When its size or mtime changed and its
+content hash differs from the loaded snapshot's version, the file is loaded
+(CSV in ``DATA_REFRESH_CHUNK_ROWS``-row chunks), diffed against the current
+table by (country, year) row, and a new ``Snapshot`` is swapped in:
+
+* precomputations that register an update (aggregate cube, correlation
+  prefix tables, map frames) are carried over, recomputing only the changed
+  countries or years, before the swap, so the first requests after it are
+  not cold;
+* cache keys include the data version of the countries / years a figure
+  reads (``Snapshot.data_version``), so cached figures of unchanged
+  countries stay valid and those of changed ones are never served again;
+* every request pins the snapshot that was current when it first read
+  data (``data_store.get_snapshot``), so in-flight requests finish on the
+  old data.
+
+A failed load keeps the current snapshot. ``/_data/version`` reports the
+loaded version and the last refresh. Environment::
+
+    DATA_REFRESH_INTERVAL=30      seconds between checks (0 = off)
+    DATA_REFRESH_CHUNK_ROWS=5000  CSV rows parsed per chunk
+"""
+import os
+import threading
+import time
+import warnings
+
+from flask import jsonify
+
+from data_store import (DATA_CSV, DATA_STORE_DIR, current_snapshot, data_source, diff_frames, file_digest,
+                        load_dataframe, swap_snapshot)
+
+
+class DataRefresher:
+    def __init__(self, csv_path=DATA_CSV, store_dir=DATA_STORE_DIR, interval=30, chunk_rows=5000):
+        self.csv_path = csv_path
+        self.store_dir = store_dir
+        self.interval = interval
+        self.chunk_rows = chunk_rows
+        self.last_refresh = None
+        self.refreshes = 0
+        self._fingerprint = None
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread_pid = None
+
+    def fingerprint(self):
+        source = data_source(self.csv_path, self.store_dir)
+        try:
+            stat = os.stat(source)
+        except OSError:
+            return None
+        return source, stat.st_size, stat.st_mtime_ns
+
+    def check(self):
+        """Load the data file if it changed; True when a new snapshot was swapped in."""
+        with self._lock:
+            fingerprint = self.fingerprint()
+            snapshot = current_snapshot()
+            if fingerprint is None or fingerprint == self._fingerprint:
+                return False
+            version = file_digest(fingerprint[0])[:12]
+            if version == snapshot.version:
+                self._fingerprint = fingerprint
+                return False
+
+            start = time.perf_counter()
+            df = load_dataframe(self.csv_path, self.store_dir, self.chunk_rows)
+            loaded = time.perf_counter()
+            changes = diff_frames(snapshot.df, df)
+            swap_snapshot(snapshot.followed_by(df, version, changes, source=fingerprint[0]))
+            self._fingerprint = fingerprint
+            self.refreshes += 1
+            self.last_refresh = {
+                'from': snapshot.version, 'to': version, 'at': time.time(),
+                'load_seconds': round(loaded - start, 3), 'update_seconds': round(time.perf_counter() - loaded, 3),
+                'changed_countries': len(changes.countries), 'changed_years': len(changes.years),
+            }
+            return True
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.check()
+            except Exception as e:
+                warnings.warn(f'Data refresh failed, keeping the loaded data: {e}')
+
+    def start(self):
+        """Start the polling thread in this process (once per process; forks get their own)."""
+        if not self.interval or self._thread_pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread_pid != os.getpid():
+                self._thread_pid = os.getpid()
+                threading.Thread(target=self._run, name='data-refresh', daemon=True).start()
+
+    def stats(self):
+        snapshot = current_snapshot()
+        return {
+            'version': snapshot.version,
+            'source': snapshot.source,
+            'rows': len(snapshot.df),
+            'interval': self.interval,
+            'refreshes': self.refreshes,
+            'last_refresh': self.last_refresh,
+        }
+
+
+def refresher_from_env(environ=os.environ):
+    return DataRefresher(interval=float(environ.get('DATA_REFRESH_INTERVAL', 30)),
+                         chunk_rows=int(environ.get('DATA_REFRESH_CHUNK_ROWS', 5000)) or None)
+
+
+def init_app(server, refresher=None):
+    refresher = refresher or refresher_from_env()
+
+    @server.before_request
+    def _start_refresher():
+        refresher.start()
+
+    @server.route('/_data/version')
+    def data_version():
+        return jsonify(refresher.stats())
+
+    return refresher
@@ -0,0 +1,507 @@
+"""Typed, memory-mapped column store for the World Energy Consumption dataset.
+
+The raw CSV is wide (100+ columns) and parses to float64/object columns, so
+every gunicorn worker that reads it at import time pays the parse cost and
+keeps a private copy. ``python data_store.py`` is a one-time build step that
+keeps only the columns the dashboard uses, downcasts them (float32 values,
+int16 years, categorical country/iso_code) and writes one ``.npy`` file per
+column. The app memory-maps those files, so workers share the page cache
+instead of each holding the data.
+
+If the store has not been built, or is older than the CSV, the CSV is read
+directly with the same column selection and dtypes.
+
+Rows are kept sorted by (country, year) so each country is one contiguous,
+year-sorted block. ``CountryIndex`` maps countries to those blocks, turning a
+country + year-range selection into two binary searches and a slice.
+
+The loaded table is held in an immutable ``Snapshot`` together with its
+index and anything derived from it (``Snapshot.derived``). A data refresh
+(data_refresh.py) builds a new snapshot and swaps it in; requests pin the
+snapshot that was current when they first read data, so they finish on the
+data they started with.
+
+Columns outside ``USED_COLUMNS`` (the share / change / per-capita variants)
+are not kept in memory. The build step writes them to ``extra/`` in the
+store, in the same row order, and ``Snapshot.column`` memory-maps one there
+on first use; without a store it reads the column from the CSV, as float32
+in the snapshot's row order.
+
+What the layout needs (countries, year bounds, slider marks) is also kept in
+``LAYOUT_META``, a few KB of JSON tied to the data file's size and mtime,
+so a worker can serve pages before it has loaded the data.
+"""
+import hashlib
+import json
+import os
+import threading
+import warnings
+from collections import namedtuple
+
+from flask import g, has_request_context
+
+from startup import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+DATA_CSV = os.path.join('Data', 'World Energy Consumption.csv')
+DATA_STORE_DIR = os.path.join('Data', 'store')
+LAYOUT_META = os.path.join('Data', 'layout_meta.json')
+STORE_VERSION = 2
+
+ENERGY_SOURCES = [
+    'coal_consumption', 'oil_consumption', 'gas_consumption', 'nuclear_consumption',
+    'hydro_consumption', 'solar_consumption', 'wind_consumption',
+    'biofuel_consumption', 'other_renewable_consumption'
+]
+
+# Display names used by the checklist and every per-source chart, e.g. 'Other Renewable'
+SOURCE_LABELS = {source: source.replace('_consumption', '').replace('_', ' ').title() for source in ENERGY_SOURCES}
+
+# Metrics offered by the map's metric dropdown
+MAP_METRICS = [
+    'primary_energy_consumption', 'coal_consumption', 'oil_consumption', 'gas_consumption',
+    'nuclear_consumption', 'hydro_consumption', 'solar_consumption', 'wind_consumption',
+    'renewables_consumption'
+]
+
+CATEGORICAL_COLUMNS = ['country', 'iso_code']
+VALUE_COLUMNS = (['population', 'gdp', 'primary_energy_consumption', 'greenhouse_gas_emissions',
+                  'renewables_consumption'] + ENERGY_SOURCES)
+USED_COLUMNS = CATEGORICAL_COLUMNS + ['year'] + VALUE_COLUMNS
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+_derived_updates = {}
+
+
+def read_csv(csv_path=DATA_CSV, chunk_rows=None):
+    """Read the raw CSV, keeping only USED_COLUMNS in compact dtypes.
+
+    With ``chunk_rows`` the file is parsed that many rows at a time, which
+    bounds the parser's working memory and lets other threads run between
+    chunks (background refreshes).
+    """
+    header = pd.read_csv(csv_path, nrows=0).columns
+    usecols = [col for col in USED_COLUMNS if col in header]
+    dtype = {col: 'float32' for col in VALUE_COLUMNS if col in usecols}
+    if chunk_rows:
+        raw = pd.concat(pd.read_csv(csv_path, usecols=usecols, dtype=dtype, chunksize=chunk_rows), ignore_index=True)
+    else:
+        raw = pd.read_csv(csv_path, usecols=usecols, dtype=dtype)
+    # Converted after parsing so the categories come out sorted, chunked or not
+    for col in CATEGORICAL_COLUMNS:
+        if col in raw:
+            raw[col] = raw[col].astype('category')
+    raw['year'] = raw['year'].astype('int16')
+    # One contiguous, year-sorted block per country (see CountryIndex)
+    raw = raw.sort_values(['country', 'year'], kind='stable', ignore_index=True)
+    return raw[usecols]
+
+
+def read_columns(names, df, csv_path=DATA_CSV):
+    """CSV columns ``names`` as float32, aligned with the (country, year) rows of ``df`` (NaN where missing)."""
+    raw = pd.read_csv(csv_path, usecols=['country', 'year', *names],
+                      dtype={'country': str, **{name: 'float32' for name in names}})
+    keys = pd.DataFrame({'country': df['country'].astype(str).to_numpy(), 'year': df['year'].to_numpy()})
+    # A left merge keeps the rows of ``keys`` in order
+    aligned = keys.merge(raw.astype({'year': keys['year'].dtype}), on=['country', 'year'], how='left')
+    return {name: aligned[name].to_numpy() for name in names}
+
+
+def read_column(name, df, csv_path=DATA_CSV):
+    """CSV column ``name`` as float32, aligned with the (country, year) rows of ``df`` (NaN where missing)."""
+    if name in CATEGORICAL_COLUMNS or name == 'year' or name not in pd.read_csv(csv_path, nrows=0).columns:
+        raise KeyError(f'{name!r} is not a value column of {csv_path!r}')
+    return read_columns([name], df, csv_path)[name]
+
+
+def read_store_column(name, store_dir=DATA_STORE_DIR, rows=None):
+    """Memory-mapped ``extra/`` column ``name`` of the store, or None when the store (with ``rows`` rows) lacks it."""
+    meta = read_store_meta(store_dir)
+    if meta is None or name not in meta.get('extra', []) or (rows is not None and meta['rows'] != rows):
+        return None
+    return np.load(os.path.join(store_dir, 'extra', f'{name}.npy'), mmap_mode='r')
+
+
+def _save_column(path, values):
+    # Replace rather than overwrite: running workers may have the old file memory-mapped
+    with open(path + '.tmp', 'wb') as f:
+        np.save(f, values)
+    os.replace(path + '.tmp', path)
+
+
+def build_store(csv_path=DATA_CSV, store_dir=DATA_STORE_DIR):
+    """Convert the CSV into one ``.npy`` file per column plus ``meta.json``."""
+    table = read_csv(csv_path)
+    os.makedirs(store_dir, exist_ok=True)
+
+    columns = {}
+    for col in table.columns:
+        series = table[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes = series.cat.codes.to_numpy().astype('int16')
+            _save_column(os.path.join(store_dir, f'{col}.npy'), codes)
+            columns[col] = {'kind': 'category', 'categories': [str(c) for c in series.cat.categories]}
+        else:
+            _save_column(os.path.join(store_dir, f'{col}.npy'), series.to_numpy())
+            columns[col] = {'kind': 'values', 'dtype': str(series.dtype)}
+
+    # The other value columns, read on demand (Snapshot.column)
+    extra = [col for col in pd.read_csv(csv_path, nrows=0).columns if col not in USED_COLUMNS]
+    os.makedirs(os.path.join(store_dir, 'extra'), exist_ok=True)
+    for col, values in (read_columns(extra, table, csv_path) if extra else {}).items():
+        _save_column(os.path.join(store_dir, 'extra', f'{col}.npy'), values)
+
+    stat = os.stat(csv_path)
+    meta = {
+        'version': STORE_VERSION,
+        'rows': len(table),
+        'columns': columns,
+        'extra': extra,
+        'source': {'path': csv_path, 'size': stat.st_size, 'mtime': stat.st_mtime},
+    }
+    # Write meta.json last so a half-built store is never treated as valid
+    meta_path = os.path.join(store_dir, 'meta.json')
+    with open(meta_path + '.tmp', 'w') as f:
+        json.dump(meta, f)
+    os.replace(meta_path + '.tmp', meta_path)
+    return meta
+
+
+def read_store_meta(store_dir=DATA_STORE_DIR):
+    try:
+        with open(os.path.join(store_dir, 'meta.json')) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get('version') == STORE_VERSION else None
+
+
+def store_is_current(csv_path=DATA_CSV, store_dir=DATA_STORE_DIR):
+    meta = read_store_meta(store_dir)
+    if meta is None:
+        return False
+    if not os.path.exists(csv_path):
+        return True
+    return os.stat(csv_path).st_mtime <= meta['source']['mtime']
+
+
+def load_store(store_dir=DATA_STORE_DIR):
+    """Memory-map the column store into a DataFrame without copying values."""
+    meta = read_store_meta(store_dir)
+    if meta is None:
+        raise FileNotFoundError(f'No data store found in {store_dir!r}; run `python data_store.py`')
+    data = {}
+    for col, spec in meta['columns'].items():
+        values = np.load(os.path.join(store_dir, f'{col}.npy'), mmap_mode='r')
+        if spec['kind'] == 'category':
+            data[col] = pd.Categorical.from_codes(values, categories=spec['categories'])
+        else:
+            data[col] = values
+    return pd.DataFrame(data, copy=False)
+
+
+def data_source(csv_path=DATA_CSV, store_dir=DATA_STORE_DIR):
+    """The file ``load_dataframe`` reads: the store's ``meta.json`` when current, else the CSV."""
+    if store_is_current(csv_path, store_dir):
+        return os.path.join(store_dir, 'meta.json')
+    return csv_path
+
+
+def file_digest(path, block_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _file_fingerprint(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [path, stat.st_size, stat.st_mtime_ns]
+
+
+def load_dataframe(csv_path=DATA_CSV, store_dir=DATA_STORE_DIR, chunk_rows=None):
+    if store_is_current(csv_path, store_dir):
+        return load_store(store_dir)
+    return read_csv(csv_path, chunk_rows)
+
+
+class CountryIndex:
+    """Country -> contiguous row block of a (country, year)-sorted frame."""
+
+    def __init__(self, df):
+        codes = df['country'].cat.codes.to_numpy()
+        self.df = df
+        self.years = df['year'].to_numpy()
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        stops = np.r_[starts[1:], len(codes)]
+        categories = df['country'].cat.categories
+        self.blocks = {categories[codes[start]]: (int(start), int(stop))
+                       for start, stop in zip(starts, stops) if codes[start] >= 0}
+        if len(self.blocks) != len(starts) - int((codes[starts] < 0).sum()):
+            raise ValueError('rows must be sorted by country so each country is one contiguous block')
+
+    def bounds(self, country, year_range):
+        """Row positions ``(lo, hi)`` of ``country`` with ``year_range[0] <= year <= year_range[1]``."""
+        start, stop = self.blocks.get(country, (0, 0))
+        years = self.years[start:stop]
+        lo = start + int(np.searchsorted(years, year_range[0], side='left'))
+        hi = start + int(np.searchsorted(years, year_range[1], side='right'))
+        return lo, hi
+
+    def select(self, country, year_range):
+        """Rows for ``country`` with ``year_range[0] <= year <= year_range[1]``."""
+        lo, hi = self.bounds(country, year_range)
+        return self.df.iloc[lo:hi]
+
+
+# Countries and years whose rows differ between two snapshots
+Changes = namedtuple('Changes', ['countries', 'years'])
+
+
+def same_rows(old, new):
+    """Whether two tables have the same columns and the same (country, year) in every row."""
+    return (list(old.columns) == list(new.columns) and len(old) == len(new)
+            and old['country'].cat.categories.equals(new['country'].cat.categories)
+            and np.array_equal(old['country'].cat.codes.to_numpy(), new['country'].cat.codes.to_numpy())
+            and np.array_equal(old['year'].to_numpy(), new['year'].to_numpy()))
+
+
+def changed_rows(old, new):
+    """Mask of the rows with any value changed between two tables with ``same_rows``, or None."""
+    changed = np.zeros(len(new), dtype=bool)
+    for column in new.columns:
+        a, b = old[column], new[column]
+        if isinstance(a.dtype, pd.CategoricalDtype):
+            if not a.cat.categories.equals(b.cat.categories):
+                return None
+            a, b = a.cat.codes, b.cat.codes
+        a, b = a.to_numpy(), b.to_numpy()
+        if a.dtype != b.dtype or a.dtype.kind not in 'biuf':
+            return None
+        differs = a != b
+        if a.dtype.kind == 'f':
+            differs &= ~(np.isnan(a) & np.isnan(b))
+        changed |= differs
+    return changed
+
+
+def diff_frames(old, new):
+    """``Changes`` between two tables: rows added, removed or with any value changed.
+
+    A reload of the same rows (the usual case) compares columns in place;
+    otherwise rows are matched on (country, year) and compared by hash.
+    """
+    changed = changed_rows(old, new) if same_rows(old, new) else None
+    if changed is not None:
+        rows = np.flatnonzero(changed)
+        return Changes(frozenset(new['country'].to_numpy()[rows].astype(str)),
+                       frozenset(int(year) for year in new['year'].to_numpy()[rows]))
+
+    def row_hashes(df):
+        keys = pd.DataFrame({'country': df['country'].astype(str).to_numpy(), 'year': df['year'].to_numpy()})
+        keys['hash'] = pd.util.hash_pandas_object(df.drop(columns='country'), index=False).to_numpy()
+        return keys
+
+    rows = row_hashes(old).merge(row_hashes(new), on=['country', 'year'], how='outer', indicator=True)
+    changed = rows[(rows['_merge'] != 'both') | (rows['hash_x'] != rows['hash_y'])]
+    return Changes(frozenset(changed['country']), frozenset(int(year) for year in changed['year']))
+
+
+class Snapshot:
+    """One loaded version of the dataset and everything derived from it.
+
+    ``version`` identifies the source file's content. ``country_versions`` and
+    ``year_versions`` hold, per country and per year, the version in which its
+    rows last changed, so caches keyed on them survive refreshes that do not
+    touch their data.
+    """
+
+    def __init__(self, df, version, source=None, csv_path=DATA_CSV):
+        self.df = df
+        self.version = version
+        self.source = source
+        self.csv_path = csv_path
+        self.country_index = CountryIndex(df)
+        self.country_versions = dict.fromkeys(self.country_index.blocks, version)
+        self.year_versions = dict.fromkeys((int(year) for year in np.unique(df['year'])), version)
+        self._derived = {}
+        # Re-entrant: one derived value may be built from another (engine -> cube)
+        self._lock = threading.RLock()
+
+    def derived(self, name, build):
+        """``build(snapshot)``, computed once per snapshot."""
+        value = self._derived.get(name)
+        if value is None:
+            with self._lock:
+                value = self._derived.get(name)
+                if value is None:
+                    value = self._derived[name] = build(self)
+        return value
+
+    def column(self, name):
+        """Values of column ``name`` in row order; columns not in ``df`` are read from the store or the CSV once."""
+        if name in self.df:
+            return self.df[name].to_numpy()
+        return self.derived(f'column:{name}', lambda snapshot: snapshot._read_column(name))
+
+    def _read_column(self, name):
+        # A snapshot loaded from the store reads it there, so it works without the CSV
+        if self.source is not None and os.path.basename(self.source) == 'meta.json':
+            values = read_store_column(name, os.path.dirname(self.source), rows=len(self.df))
+            if values is not None:
+                return values
+        if not os.path.exists(self.csv_path):
+            raise KeyError(f'{name!r} is not in the column store and {self.csv_path!r} is missing')
+        return read_column(name, self.df, self.csv_path)
+
+    def followed_by(self, df, version, changes, source=None):
+        """The next snapshot; precomputations with a registered update are carried over incrementally."""
+        snapshot = Snapshot(df, version, source=source, csv_path=self.csv_path)
+        snapshot.country_versions = {country: version if country in changes.countries else self.country_versions.get(country, version)
+                                     for country in snapshot.country_versions}
+        snapshot.year_versions = {year: version if year in changes.years else self.year_versions.get(year, version)
+                                  for year in snapshot.year_versions}
+        for name, value in list(self._derived.items()):
+            if name in _derived_updates:
+                try:
+                    snapshot._derived[name] = _derived_updates[name](value, snapshot, changes)
+                except (KeyError, IndexError, ValueError) as e:
+                    # The new rows do not line up with the previous value (e.g. a renamed
+                    # column); it is rebuilt from scratch on first use instead. Anything
+                    # else fails the refresh, which keeps the loaded data (data_refresh.py).
+                    warnings.warn(f'Rebuilding {name!r} for data version {version} instead of updating it: {e!r}')
+        return snapshot
+
+    def data_version(self, countries=(), years=()):
+        """Version of the rows for the given countries and years, for cache keys."""
+        return ([self.country_versions.get(country) for country in countries] +
+                [self.year_versions.get(int(year)) for year in years])
+
+
+def register_derived_update(name, update):
+    """``update(previous value, new snapshot, changes)`` builds ``name`` for a refreshed snapshot."""
+    _derived_updates[name] = update
+
+
+def load_snapshot(csv_path=DATA_CSV, store_dir=DATA_STORE_DIR):
+    source = data_source(csv_path, store_dir)
+    version = file_digest(source)[:12] if os.path.exists(source) else 'none'
+    return Snapshot(load_dataframe(csv_path, store_dir), version, source=source, csv_path=csv_path)
+
+
+def current_snapshot():
+    """The latest snapshot, loading the data on first use."""
+    global _snapshot
+    if _snapshot is None:
+        with _snapshot_lock:
+            if _snapshot is None:
+                _snapshot = load_snapshot()
+    return _snapshot
+
+
+def swap_snapshot(snapshot):
+    global _snapshot
+    _snapshot = snapshot
+
+
+def get_snapshot():
+    """The snapshot the current request started on (see data_refresh.py), else the latest."""
+    if has_request_context():
+        # Pinned on first use, so requests that never read data never load it
+        if 'data_snapshot' not in g:
+            g.data_snapshot = current_snapshot()
+        return g.data_snapshot
+    return current_snapshot()
+
+
+def layout_meta_for(df):
+    """Countries (in row order), year bounds and decade years of ``df``."""
+    years = sorted(int(year) for year in df['year'].unique())
+    return {
+        'countries': [str(country) for country in df['country'].unique()],
+        'years': [years[0], years[-1]],
+        'decades': [year for year in years if year % 10 == 0],
+    }
+
+
+def data_fingerprint(csv_path=DATA_CSV, store_dir=DATA_STORE_DIR):
+    """Path, size and mtime of the data file, to tie files derived from it to its current content."""
+    return _file_fingerprint(data_source(csv_path, store_dir))
+
+
+def snapshot_fingerprint(snapshot):
+    """``data_fingerprint`` of the snapshot's source file, or None when the file no longer holds its version."""
+    fingerprint = _file_fingerprint(snapshot.source) if snapshot.source else None
+    # Fingerprint first: a file replaced after it no longer matches the version
+    if fingerprint is not None and file_digest(snapshot.source)[:12] == snapshot.version:
+        return fingerprint
+    return None
+
+
+def read_layout_meta(path=LAYOUT_META, csv_path=DATA_CSV, store_dir=DATA_STORE_DIR):
+    """The saved layout metadata, or None when missing or older than the data file."""
+    try:
+        with open(path) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get('source') == data_fingerprint(csv_path, store_dir) else None
+
+
+def write_layout_meta(snapshot, path=LAYOUT_META):
+    """``layout_meta_for`` the snapshot, saved when the data file still holds its version."""
+    meta = layout_meta_for(snapshot.df)
+    fingerprint = snapshot_fingerprint(snapshot)
+    if fingerprint is not None:
+        try:
+            with open(path + '.tmp', 'w') as f:
+                json.dump({**meta, 'source': fingerprint}, f)
+            os.replace(path + '.tmp', path)
+        except OSError:
+            pass  # read-only data directory: derived from the data every start
+    return meta
+
+
+def layout_metadata():
+    """What the layout's controls need, without loading the data when the saved copy is current."""
+    if _snapshot is None:
+        meta = read_layout_meta()
+        if meta is not None:
+            return meta
+    return get_snapshot().derived('layout_meta', write_layout_meta)
+
+
+def get_df():
+    """Return the dashboard DataFrame, loading it on first use."""
+    return get_snapshot().df
+
+
+def get_country_index():
+    return get_snapshot().country_index
+
+
+def get_column(name):
+    """One column of the dashboard data as an array, loading it on demand if it is not kept in memory."""
+    return get_snapshot().column(name)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Build the memory-mapped data store from the energy CSV.')
+    parser.add_argument('--csv', default=DATA_CSV, help='source CSV file')
+    parser.add_argument('--out', default=DATA_STORE_DIR, help='output store directory')
+    args = parser.parse_args()
+
+    built = build_store(args.csv, args.out)
+    print(f"Wrote {built['rows']} rows x {len(built['columns'])} columns (+{len(built['extra'])} on demand) to {args.out}")
+    if args.out == DATA_STORE_DIR:
+        write_layout_meta(load_snapshot(args.csv, args.out))
+        print(f"Wrote {LAYOUT_META}")
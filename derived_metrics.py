@@ -0,0 +1,119 @@
+"""Per-capita values of the map's metrics, computed once per data snapshot.
+
+Per-capita values used to be derived per request, and only for the map.
+``MetricTable`` computes every registered metric for every column in
+``DERIVED_COLUMNS`` (the map's metrics) in one vectorized pass over the
+table. It keeps one float32 (column, row) array per metric in the table's
+row order, under 1 MB for the real dataset; the map's frames read it
+(map_frames.py), so no request divides columns.
+
+Metrics are registered with ``register_metric`` at import. Only the one a
+chart reads is built in:
+
+* ``per_capita`` - kWh per person
+
+A chart that offers another derived metric (share, year-over-year change,
+...) registers it here; every registered metric is computed for every
+snapshot, so none is registered before a chart reads it. The table is built
+on first use per snapshot; for a refreshed snapshot only the rows of changed
+countries are recomputed before it is swapped in (data_refresh.py).
+"""
+from collections import namedtuple
+
+from aggregate_cube import TWH_TO_KWH
+from data_store import MAP_METRICS, get_snapshot, register_derived_update
+from startup import lazy_import
+
+np = lazy_import('numpy')
+
+DERIVED_COLUMNS = MAP_METRICS
+
+Metric = namedtuple('Metric', ['name', 'label', 'unit', 'compute'])
+METRICS = {}
+
+
+def register_metric(name, label, unit, compute):
+    """Add a metric; ``compute(inputs)`` returns its (column, row) values from ``MetricInputs``."""
+    METRICS[name] = Metric(name, label, unit, compute)
+
+
+def metric_label(name):
+    """Axis / legend title of a metric, e.g. 'Per Capita (kWh)'."""
+    metric = METRICS[name]
+    return f'{metric.label} ({metric.unit})'
+
+
+class MetricInputs:
+    """The values metrics are computed from: derived columns as (column, row) and population."""
+
+    def __init__(self, df, columns):
+        self.values = df[columns].to_numpy(dtype='float32').T
+        self.population = df['population'].to_numpy(dtype='float32')
+
+
+def ratio(numerator, denominator, scale):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = numerator / denominator * scale
+    values[~np.isfinite(values)] = np.nan
+    return values.astype('float32', copy=False)
+
+
+register_metric('per_capita', 'Per Capita', 'kWh', lambda inputs: ratio(inputs.values, inputs.population, TWH_TO_KWH))
+
+
+class MetricTable:
+    """Every registered metric for every derived column of a table, in its row order."""
+
+    def __init__(self, df, columns=DERIVED_COLUMNS, blocks=None):
+        """``blocks`` (country -> row block, see ``CountryIndex``) lets ``updated`` reuse rows."""
+        self.columns = [column for column in columns if column in df.columns]
+        self.column_index = {column: i for i, column in enumerate(self.columns)}
+        self.blocks = blocks
+        inputs = MetricInputs(df, self.columns)
+        self.arrays = {name: np.ascontiguousarray(metric.compute(inputs), dtype='float32')
+                       for name, metric in METRICS.items()}
+
+    def updated(self, df, blocks, countries):
+        """Table for ``df`` (row blocks ``blocks``), recomputing only the rows of ``countries``."""
+        columns = [column for column in DERIVED_COLUMNS if column in df.columns]
+        if self.blocks is None or columns != self.columns:
+            return MetricTable(df, columns, blocks)
+        table = MetricTable.__new__(MetricTable)
+        table.columns, table.column_index, table.blocks = self.columns, self.column_index, blocks
+        table.arrays = {name: np.empty((len(self.columns), len(df)), dtype='float32') for name in self.arrays}
+        # Rows outside any country block (no country) are always recomputed
+        recompute = np.ones(len(df), dtype=bool)
+        for country, (start, stop) in blocks.items():
+            old = self.blocks.get(country)
+            if country in countries or old is None or old[1] - old[0] != stop - start:
+                continue
+            for name, values in table.arrays.items():
+                values[:, start:stop] = self.arrays[name][:, old[0]:old[1]]
+            recompute[start:stop] = False
+        rows = np.flatnonzero(recompute)
+        if len(rows):
+            inputs = MetricInputs(df.iloc[rows], self.columns)
+            for name, values in table.arrays.items():
+                values[:, rows] = METRICS[name].compute(inputs)
+        return table
+
+    def values(self, metric, column):
+        """Values of ``metric`` for ``column``, one per table row."""
+        return self.arrays[metric][self.column_index[column]]
+
+    @property
+    def nbytes(self):
+        return sum(values.nbytes for values in self.arrays.values())
+
+
+def metric_table_for(snapshot):
+    return snapshot.derived('metric_table',
+                            lambda snapshot: MetricTable(snapshot.df, blocks=snapshot.country_index.blocks))
+
+
+def get_metric_table():
+    return metric_table_for(get_snapshot())
+
+
+register_derived_update('metric_table', lambda table, snapshot, changes: table.updated(
+    snapshot.df, snapshot.country_index.blocks, changes.countries))
@@ -0,0 +1,84 @@
+"""Opt-in fast JSON path for figure responses.
+
+Dash serializes every callback response with ``plotly.io.json.to_json_plotly``.
+With ``FAST_JSON=1`` (requires ``orjson>=3.9.15``):
+
+* plotly's encoder is pinned to the orjson engine, which writes NumPy arrays
+  natively instead of walking them through ``PlotlyJSONEncoder``;
+* the figure cache stores each figure once as JSON bytes wrapped in an
+  ``orjson.Fragment``. Dash embeds a fragment into the response verbatim, so
+  a cache hit costs no re-encoding (and no decoding for the SQLite backend).
+
+Without orjson the setting is ignored with a warning and figures are cached
+and encoded as before. With the setting off, plotly's encoder is pinned to
+its default JSON engine: left on ``auto`` it would pick orjson whenever it is
+installed.
+
+The gain is the cache hit, not the encoder. On the synthetic dataset
+(benchmarks/figure_serialization.py) a pre-serialized hit is sent 70-110x
+faster than a fresh encode, while encoding itself with orjson is 1.1-2x
+faster for the single-year maps and about 0.7-0.8x, i.e. slower, for the
+animated map: plotly's orjson engine first walks every frame to convert its
+values, which costs more than the default encoder saves.
+"""
+import json
+import os
+import warnings
+
+import plotly.io as pio
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+HAS_FRAGMENT = orjson is not None and hasattr(orjson, 'Fragment')
+
+
+def fast_json_from_env(environ=os.environ):
+    """Whether ``FAST_JSON`` asks for the fast path and orjson can provide it."""
+    requested = environ.get('FAST_JSON', '0').lower() in ('1', 'true', 'yes', 'on')
+    if requested and not HAS_FRAGMENT:
+        warnings.warn('FAST_JSON requires orjson>=3.9.15; using the default JSON encoder')
+        return False
+    return requested
+
+
+def configure(enabled):
+    """Pin plotly's JSON engine: orjson on the fast path, else the default encoder even when orjson is installed."""
+    pio.json.config.default_engine = 'orjson' if enabled else 'json'
+
+
+def dumps(figure, engine=None):
+    """Figure (dict or go.Figure) -> JSON bytes, using plotly's numpy-aware encoders."""
+    return pio.json.to_json_plotly(figure, engine=engine).encode('utf-8')
+
+
+def serialize(figure):
+    """Pre-serialized figure that Dash's orjson encoder embeds as-is."""
+    return orjson.Fragment(dumps(figure, engine='orjson'))
+
+
+def is_serialized(value):
+    return HAS_FRAGMENT and isinstance(value, orjson.Fragment)
+
+
+def to_bytes(value):
+    """JSON bytes of a figure, reusing the pre-serialized form when there is one."""
+    if is_serialized(value):
+        return orjson.dumps(value)
+    return dumps(value)
+
+
+def to_python(value):
+    """Plain dict for a pre-serialized figure (e.g. to pickle it); other values pass through."""
+    if is_serialized(value):
+        return orjson.loads(orjson.dumps(value))
+    return value
+
+
+def loads(data, serialized=False):
+    """Inverse of ``to_bytes``: a fragment on the fast path, else a plain dict."""
+    if serialized:
+        return orjson.Fragment(data if isinstance(data, bytes) else data.encode('utf-8'))
+    return json.loads(data)
@@ -0,0 +1,231 @@
+"""Memoized figure cache for the dashboard callbacks.
+
+Figures are cached per chart under a key built from the normalized inputs that
+chart actually uses (e.g. country, year range and the canonical source list),
+so the many users asking for the same view share one build.
+
+Backends:
+
+* ``MemoryBackend`` - per-process LRU with optional TTL.
+* ``SQLiteBackend`` - one SQLite file shared by every gunicorn worker on the
+  host, with the same LRU/TTL bounds.
+
+Configured from the environment (see ``cache_from_env``)::
+
+    FIGURE_CACHE_BACKEND=memory|sqlite|none   (default: memory)
+    FIGURE_CACHE_SIZE=512                     max entries
+    FIGURE_CACHE_TTL=3600                     seconds, 0 = no expiry
+    FIGURE_CACHE_PATH=Data/figure_cache.sqlite
+
+With the ``FAST_JSON`` path on (see ``fast_json.py``) figures are cached
+pre-serialized, so hits are returned without re-encoding.
+"""
+import contextlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import fast_json
+
+
+class MemoryBackend:
+    def __init__(self, max_entries=512, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, created = entry
+            if self.ttl and time.time() - created > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    """LRU/TTL figure store in a SQLite file shared across processes.
+
+    Figures are stored as plotly JSON and come back as plain dicts, which Dash
+    serializes like any figure, or as pre-serialized fragments when
+    ``serialized`` is set.
+    """
+
+    def __init__(self, path, max_entries=2048, ttl=None, serialized=False):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.serialized = serialized
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS figures ('
+                         'key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS figures_accessed ON figures (accessed)')
+
+    def _connect(self):
+        # One connection per thread and process: a forked worker (gunicorn --preload)
+        # must not reuse the connection the master opened
+        conn, pid = getattr(self._local, 'conn', (None, None))
+        if conn is None or pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10)
+            self._local.conn = (conn, os.getpid())
+        return conn
+
+    def get(self, key):
+        conn = self._connect()
+        row = conn.execute('SELECT value, created FROM figures WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        value, created = row
+        now = time.time()
+        with conn:
+            if self.ttl and now - created > self.ttl:
+                conn.execute('DELETE FROM figures WHERE key = ?', (key,))
+                return None
+            conn.execute('UPDATE figures SET accessed = ? WHERE key = ?', (now, key))
+        return fast_json.loads(value, serialized=self.serialized)
+
+    def set(self, key, value):
+        conn = self._connect()
+        now = time.time()
+        with conn:
+            conn.execute('INSERT OR REPLACE INTO figures (key, value, created, accessed) VALUES (?, ?, ?, ?)',
+                         (key, fast_json.to_bytes(value).decode('utf-8'), now, now))
+            conn.execute('DELETE FROM figures WHERE key IN '
+                         '(SELECT key FROM figures ORDER BY accessed DESC LIMIT -1 OFFSET ?)', (self.max_entries,))
+
+    def clear(self):
+        conn = self._connect()
+        with conn:
+            conn.execute('DELETE FROM figures')
+
+    def __len__(self):
+        return self._connect().execute('SELECT COUNT(*) FROM figures').fetchone()[0]
+
+
+class FigureCache:
+    """Per-chart memoization with hit/miss counters."""
+
+    def __init__(self, backend, serialize=False):
+        self.backend = backend
+        self.serialize = serialize
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @staticmethod
+    def make_key(chart, key_parts):
+        return chart + ':' + json.dumps(key_parts, separators=(',', ':'), default=str)
+
+    def _count(self, chart, outcome):
+        with self._lock:
+            counters = self._stats.setdefault(chart, {'hits': 0, 'misses': 0})
+            counters[outcome] += 1
+
+    def get_or_build(self, chart, key_parts, build):
+        key = self.make_key(chart, key_parts)
+        figure = self.backend.get(key) if self.backend is not None else None
+        if self.backend is None:
+            figure = build()
+        elif figure is not None:
+            self._count(chart, 'hits')
+        else:
+            self._count(chart, 'misses')
+            figure = build()
+            if self.serialize:
+                figure = fast_json.serialize(figure)
+            self.backend.set(key, figure)
+        recorded = getattr(self._local, 'recorded', None)
+        if recorded is not None:
+            recorded.append((key, figure))
+        return figure
+
+    @contextlib.contextmanager
+    def recording(self):
+        """Collect the ``(key, figure)`` of every lookup in this thread, hit or built (app.build_view)."""
+        recorded = self._local.recorded = []
+        try:
+            yield recorded
+        finally:
+            self._local.recorded = None
+
+    def warm(self, entries):
+        """Store ``(key, figure)`` pairs built ahead of time (prerender.py, shared_views.py); returns how many were stored."""
+        if self.backend is None:
+            return 0
+        stored = 0
+        for key, figure in entries:
+            self.backend.set(key, fast_json.serialize(figure) if self.serialize else figure)
+            stored += 1
+        return stored
+
+    def stats(self):
+        with self._lock:
+            charts = {chart: dict(counters) for chart, counters in self._stats.items()}
+        hits = sum(c['hits'] for c in charts.values())
+        misses = sum(c['misses'] for c in charts.values())
+        return {
+            'backend': type(self.backend).__name__ if self.backend is not None else None,
+            'serialized': self.serialize,
+            'entries': len(self.backend) if self.backend is not None else 0,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+            'charts': charts,
+        }
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+        with self._lock:
+            self._stats.clear()
+
+
+def entries_json(entries):
+    """JSON bytes of ``(key, figure)`` pairs; pre-serialized figures are embedded as they are."""
+    body = b','.join(b'[' + json.dumps(key).encode('utf-8') + b',' + fast_json.to_bytes(figure) + b']'
+                     for key, figure in entries)
+    return b'[' + body + b']'
+
+
+def cache_from_env(environ=os.environ):
+    kind = environ.get('FIGURE_CACHE_BACKEND', 'memory').lower()
+    max_entries = int(environ.get('FIGURE_CACHE_SIZE', 512))
+    ttl = float(environ.get('FIGURE_CACHE_TTL', 3600)) or None
+    serialize = fast_json.fast_json_from_env(environ)
+    if kind == 'none':
+        backend = None
+    elif kind == 'sqlite':
+        backend = SQLiteBackend(environ.get('FIGURE_CACHE_PATH', os.path.join('Data', 'figure_cache.sqlite')),
+                                max_entries=max_entries, ttl=ttl, serialized=serialize)
+    elif kind == 'memory':
+        backend = MemoryBackend(max_entries=max_entries, ttl=ttl)
+    else:
+        raise ValueError(f'Unknown FIGURE_CACHE_BACKEND {kind!r} (expected memory, sqlite or none)')
+    return FigureCache(backend, serialize=serialize and backend is not None)
@@ -0,0 +1,133 @@
+"""Plain-dict figures for the hot charts, equivalent to plotly.express output.
+
+Every px call validates its arguments, copies the frame, groups it by color
+and then validates the resulting ``go.Figure`` property by property, several
+milliseconds per chart even for a few dozen points. The helpers here write
+the same figure JSON directly from NumPy arrays:
+
+* numeric arrays become plotly.js typed arrays (``{'dtype', 'bdata'}``), the
+  encoding ``go.Figure`` uses for NumPy data;
+* the template is resolved once (``template_json``);
+* traces and axes carry exactly the properties px sets, so the browser gets
+  the same figure. tests/test_figure_dicts.py checks that against the px
+  versions; ``python benchmarks/figure_builders.py`` times both.
+
+The less frequent charts (sunburst, treemap, correlation heatmaps, animated
+map) still use plotly.express.
+"""
+import base64
+from functools import lru_cache
+
+import plotly.colors
+import plotly.io as pio
+
+from startup import lazy_import
+
+np = lazy_import('numpy')
+
+CHART_TEMPLATE = 'plotly_white'
+BOLD = plotly.colors.qualitative.Bold
+
+# NumPy dtype -> plotly.js typed array type
+TYPED_ARRAY_TYPES = {
+    'int8': 'i1', 'uint8': 'u1', 'int16': 'i2', 'uint16': 'u2',
+    'int32': 'i4', 'uint32': 'u4', 'float32': 'f4', 'float64': 'f8',
+}
+
+
+@lru_cache(maxsize=None)
+def template_json():
+    return pio.templates[CHART_TEMPLATE].to_plotly_json()
+
+
+def typed_array(values):
+    """``values`` encoded the way ``go.Figure`` encodes a NumPy array."""
+    values = np.asarray(values)
+    if not values.size:
+        return values
+    if values.dtype == 'int64':
+        # plotly.js has no 64-bit ints: narrowed to the smallest type that fits
+        for dtype in ('int8', 'int16', 'int32'):
+            info = np.iinfo(dtype)
+            if info.min <= values.min() and values.max() <= info.max:
+                values = values.astype(dtype)
+                break
+    kind = TYPED_ARRAY_TYPES.get(str(values.dtype))
+    if kind is None:
+        return values
+    return {'dtype': kind, 'bdata': base64.b64encode(np.ascontiguousarray(values)).decode('ascii')}
+
+
+def xy_layout(title, x_title=None, y_title=None, xaxis=None, yaxis=None, legend=None, **layout):
+    """Layout of a px figure with one pair of cartesian axes."""
+    x = {'anchor': 'y', 'domain': [0.0, 1.0]}
+    y = {'anchor': 'x', 'domain': [0.0, 1.0]}
+    if x_title is not None:
+        x['title'] = {'text': x_title}
+    if y_title is not None:
+        y['title'] = {'text': y_title}
+    return {
+        'template': template_json(),
+        'title': {'text': title},
+        'xaxis': {**x, **(xaxis or {})},
+        'yaxis': {**y, **(yaxis or {})},
+        'legend': {'tracegroupgap': 0, **(legend or {})},
+        **layout,
+    }
+
+
+def no_data_annotation(text):
+    return {'text': text, 'xref': 'paper', 'yref': 'paper', 'x': 0.5, 'y': 0.5, 'showarrow': False,
+            'font': {'size': 14, 'color': 'gray'}}
+
+
+def xy_trace(kind, x=None, y=None, hovertemplate='<extra></extra>', name='', showlegend=False, **props):
+    """One px cartesian trace (``kind`` 'scatter' or 'bar'); no x / y for px's empty figures."""
+    trace = {'type': kind, 'name': name, 'legendgroup': name, 'showlegend': showlegend,
+             'hovertemplate': hovertemplate, 'orientation': 'v', 'xaxis': 'x', 'yaxis': 'y'}
+    if x is not None:
+        trace['x'] = typed_array(x)
+        trace['y'] = typed_array(y)
+    trace.update(props)
+    return trace
+
+
+def line_props(color, width=None):
+    line = {'color': color, 'dash': 'solid'}
+    if width is not None:
+        line['width'] = width
+    return {'mode': 'lines', 'line': line, 'marker': {'symbol': 'circle'}}
+
+
+def grouped_traces(groups, x_label, y_label, group_label, colors=BOLD, width=None, stack=False, groupnorm=None):
+    """px.line / px.area traces with ``color=``: one per ``(name, x, y)`` group, in order."""
+    traces = []
+    for i, (name, x, y) in enumerate(groups):
+        color = colors[i % len(colors)]
+        if stack:
+            props = {'mode': 'lines', 'line': {'color': color}, 'marker': {'symbol': 'circle'},
+                     'fillpattern': {'shape': ''}, 'stackgroup': '1'}
+            if groupnorm:
+                props['groupnorm'] = groupnorm
+        else:
+            props = line_props(color, width)
+        traces.append(xy_trace('scatter', x, y, name=name, showlegend=True,
+                               hovertemplate=f'{group_label}={name}<br>{x_label}=%{{x}}<br>{y_label}=%{{y}}<extra></extra>',
+                               **props))
+    return traces
+
+
+def pie(values, labels, title, hovertemplate='label=%{label}<br>value=%{value}<extra></extra>', colorway=None, **props):
+    """px.pie of ``values`` named by ``labels``."""
+    trace = {'type': 'pie', 'values': typed_array(values), 'labels': list(labels), 'name': '', 'legendgroup': '',
+             'showlegend': True, 'hovertemplate': hovertemplate, 'domain': {'x': [0.0, 1.0], 'y': [0.0, 1.0]}}
+    trace.update(props)
+    layout = {'template': template_json(), 'title': {'text': title}, 'legend': {'tracegroupgap': 0}}
+    if colorway is not None:
+        layout['piecolorway'] = list(colorway)
+    return {'data': [trace], 'layout': layout}
+
+
+def default_color():
+    """The color px gives a trace without ``color=``: the template's first."""
+    return template_json()['layout']['colorway'][0]
@@ -0,0 +1,125 @@
+"""Concurrent construction of independent figures.
+
+Building a whole view (11 charts that share no state) happens when the
+Share button stores a view's figures (``app.store_shared_view``), for each
+view ``prerender.py`` renders, and in ``update_graphs`` (benchmarks).
+``FigurePool.build_all`` submits every figure to a thread or process pool and
+collects the results in output order, so the wall-clock cost approaches the
+slowest single chart on a multi-core host.
+
+Thread workers run each figure in a copy of the caller's context
+(``contextvars``): the Flask request context, and with it the snapshot the
+request pinned (``data_store.get_snapshot``), and the chart ``metrics``
+attributes stages to. Callers pin the snapshot before fanning out. Process
+workers are forked with the data of the moment; passing the data version as
+``generation`` forks them again after a refresh. A figure that raises, or is
+not ready ``FIGURE_TIMEOUT`` seconds after the set was submitted, is replaced
+by the caller's error placeholder. A timed out build cannot be interrupted;
+its worker finishes in the background and the result is discarded.
+
+Environment::
+
+    FIGURE_POOL=auto|thread|process|none   (auto: thread with several CPUs, else none)
+    FIGURE_POOL_WORKERS=<n>                default: one per CPU, at most 11
+    FIGURE_TIMEOUT=30                      seconds, 0 = no limit
+
+``none`` builds the figures one after another in the calling thread, with
+errors still mapped to placeholders but no timeout.
+"""
+import atexit
+import concurrent.futures
+import contextvars
+import multiprocessing
+import os
+import threading
+import time
+
+import fast_json
+
+MAX_WORKERS = 11
+
+
+def _build(fn, args):
+    # Runs in the pool; pre-serialized figures cannot cross a process boundary
+    return fast_json.to_python(fn(*args))
+
+
+class FigurePool:
+    def __init__(self, kind='thread', workers=None, timeout=None):
+        if kind not in ('thread', 'process', 'none'):
+            raise ValueError(f'Unknown FIGURE_POOL {kind!r} (expected thread, process or none)')
+        self.kind = kind
+        self.workers = workers or min(os.cpu_count() or 1, MAX_WORKERS)
+        self.timeout = timeout
+        self._executor = None
+        self._executor_key = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self, generation=None):
+        with self._lock:
+            # An executor inherited through fork has no threads or processes behind it
+            key = (os.getpid(), generation if self.kind == 'process' else None)
+            if self._executor is not None and self._executor_key != key:
+                if self._executor_key[0] == os.getpid():
+                    self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+            if self._executor is None:
+                self._executor_key = key
+                if self.kind == 'process':
+                    # fork: workers inherit the loaded data instead of re-importing the app
+                    self._executor = concurrent.futures.ProcessPoolExecutor(
+                        self.workers, mp_context=multiprocessing.get_context('fork'))
+                else:
+                    self._executor = concurrent.futures.ThreadPoolExecutor(
+                        self.workers, thread_name_prefix='figure')
+                atexit.register(self.shutdown)
+            return self._executor
+
+    def build_all(self, specs, placeholder, generation=None):
+        """Run ``fn(*args)`` for each ``(fn, args)`` in ``specs``; results in input order.
+
+        ``placeholder(error)`` supplies the figure for a build that failed or timed out.
+        """
+        if self.kind == 'none':
+            return [self._run_inline(fn, args, placeholder) for fn, args in specs]
+
+        executor = self._get_executor(generation)
+        if self.kind == 'process':
+            futures = [executor.submit(_build, fn, args) for fn, args in specs]
+        else:
+            # One context copy per figure: a context cannot be entered by two threads at once
+            futures = [executor.submit(contextvars.copy_context().run, fn, *args) for fn, args in specs]
+        deadline = time.monotonic() + self.timeout if self.timeout else None
+        figures = []
+        for future in futures:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                figures.append(future.result(timeout=remaining))
+            except concurrent.futures.TimeoutError:
+                future.cancel()
+                figures.append(placeholder(TimeoutError(f'figure not ready after {self.timeout:g}s')))
+            except Exception as e:
+                figures.append(placeholder(e))
+        return figures
+
+    @staticmethod
+    def _run_inline(fn, args, placeholder):
+        try:
+            return fn(*args)
+        except Exception as e:
+            return placeholder(e)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None and self._executor_key[0] == os.getpid():
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def pool_from_env(environ=os.environ):
+    workers = int(environ.get('FIGURE_POOL_WORKERS', 0)) or None
+    timeout = float(environ.get('FIGURE_TIMEOUT', 30)) or None
+    kind = environ.get('FIGURE_POOL', 'auto').lower()
+    if kind == 'auto':
+        kind = 'thread' if (os.cpu_count() or 1) > 1 else 'none'
+    return FigurePool(kind, workers=workers, timeout=timeout)
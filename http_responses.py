@@ -0,0 +1,139 @@
+"""Compression and HTTP cache validators for the dashboard's Flask server.
+
+Callback responses carry up to eleven figures (or a whole map animation) as
+JSON, and the Dash component bundles are several megabytes of JavaScript;
+both compress by 5-10x. ``init_app`` installs an ``after_request`` hook that:
+
+* compresses responses above ``COMPRESS_MIN_BYTES`` with brotli (when the
+  ``brotli`` package is installed and the client accepts it) or gzip. Component
+  bundles never change while the server runs, so their compressed bodies are
+  kept in memory and compressed once per encoding;
+* adds a weak ETag (a hash of the uncompressed body) and
+  ``Cache-Control: no-cache`` to the page, ``_dash-layout``,
+  ``_dash-dependencies`` and callback responses, which are deterministic for a
+  given request. A matching ``If-None-Match`` gets an empty 304.
+
+Environment::
+
+    COMPRESS_MIN_BYTES=1024   smallest body to compress (0 = compress everything)
+    COMPRESS_LEVEL=6          gzip level
+    BROTLI_QUALITY=5          brotli quality
+    HTTP_COMPRESSION=1        0 disables compression (validators stay on)
+"""
+import gzip
+import hashlib
+import os
+import threading
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/html', 'application/javascript', 'text/javascript', 'text/css')
+VALIDATED_ENDPOINTS = ('_dash-update-component', '_dash-layout', '_dash-dependencies')
+STATIC_PREFIX = '_dash-component-suites/'
+STATIC_CACHE_SIZE = 64
+
+
+def accepted_encoding(accept_encoding, has_brotli=brotli is not None):
+    """'br', 'gzip' or None for an Accept-Encoding header value."""
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    if has_brotli and accepted.get('br', 0) > 0:
+        return 'br'
+    if accepted.get('gzip', accepted.get('*', 0)) > 0:
+        return 'gzip'
+    return None
+
+
+def compress(data, encoding, gzip_level=6, brotli_quality=5):
+    if encoding == 'br':
+        return brotli.compress(data, quality=brotli_quality)
+    return gzip.compress(data, compresslevel=gzip_level, mtime=0)
+
+
+def body_etag(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class ResponseOptimizer:
+    def __init__(self, min_bytes=1024, gzip_level=6, brotli_quality=5, compression=True):
+        self.min_bytes = min_bytes
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.compression = compression
+        self._static = {}
+        self._static_lock = threading.Lock()
+
+    def _compress_static(self, key, data, encoding):
+        with self._static_lock:
+            body = self._static.get(key)
+        if body is None:
+            body = compress(data, encoding, self.gzip_level, self.brotli_quality)
+            with self._static_lock:
+                if len(self._static) >= STATIC_CACHE_SIZE:
+                    self._static.pop(next(iter(self._static)))
+                self._static[key] = body
+        return body
+
+    def __call__(self, response):
+        if response.status_code != 200 or response.direct_passthrough or response.is_streamed:
+            return response
+        path = request.path.lstrip('/')
+        endpoint = path.rsplit('/', 1)[-1]
+        is_static = STATIC_PREFIX in path
+
+        if endpoint in VALIDATED_ENDPOINTS or response.mimetype == 'text/html':
+            etag = body_etag(response.get_data())
+            response.set_etag(etag, weak=True)
+            response.cache_control.no_cache = True
+            if request.if_none_match.contains_weak(etag):
+                response.status_code = 304
+                response.set_data(b'')
+                return response
+
+        if not self.compression or 'Content-Encoding' in response.headers:
+            return response
+        if response.mimetype not in COMPRESSIBLE_TYPES:
+            return response
+        data = response.get_data()
+        if len(data) < self.min_bytes:
+            return response
+        encoding = accepted_encoding(request.headers.get('Accept-Encoding'))
+        if encoding is None:
+            return response
+
+        if is_static:
+            body = self._compress_static((path, encoding), data, encoding)
+        else:
+            body = compress(data, encoding, self.gzip_level, self.brotli_quality)
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        return response
+
+
+def optimizer_from_env(environ=os.environ):
+    return ResponseOptimizer(
+        min_bytes=int(environ.get('COMPRESS_MIN_BYTES', 1024)),
+        gzip_level=int(environ.get('COMPRESS_LEVEL', 6)),
+        brotli_quality=int(environ.get('BROTLI_QUALITY', 5)),
+        compression=environ.get('HTTP_COMPRESSION', '1').lower() not in ('0', 'false', 'no', 'off'),
+    )
+
+
+def init_app(server, optimizer=None):
+    optimizer = optimizer or optimizer_from_env()
+    server.after_request(optimizer)
+    return optimizer
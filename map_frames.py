@@ -0,0 +1,169 @@
+"""Precomputed per-year frames for the Interactive Global Energy Map.
+
+The single-year map used to filter the whole table by year, divide by
+population, drop missing values and run it through plotly.express on every
+slider move. ``MapFrames`` does that work once for every
+(metric, per-capita) pair, reading per-capita values (kWh per person) from the
+snapshot's ``MetricTable`` (derived_metrics.py): rows with a value are grouped
+by year into compact arrays (iso_code, country, value, gdp, population), so a
+map request is a pair of array slices plus figure assembly.
+
+The animated map is built from the same arrays but bounded: only rows with a
+real ISO-3 code are kept (aggregate regions cannot be drawn), years are taken
+at a stride so there are at most ``MAP_ANIMATION_MAX_FRAMES`` frames, and
+values are rounded to ``MAP_ANIMATION_DIGITS`` significant digits. The
+resulting tables are memoized per (metric, per-capita) pair.
+
+Frames belong to a data snapshot; after a data refresh (data_refresh.py) only
+the years whose rows changed are recomputed and spliced into the new frames.
+Environment::
+
+    MAP_ANIMATION_MAX_FRAMES=30   adaptive stride target (0 = every year)
+    MAP_ANIMATION_STRIDE=0        fixed year stride, overrides the target
+    MAP_ANIMATION_DIGITS=4        significant digits (0 = no rounding)
+"""
+import math
+import os
+import threading
+
+from data_store import MAP_METRICS, get_snapshot, register_derived_update
+from derived_metrics import metric_table_for
+from startup import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+ANIMATION_MAX_FRAMES = int(os.environ.get('MAP_ANIMATION_MAX_FRAMES', 30))
+ANIMATION_STRIDE = int(os.environ.get('MAP_ANIMATION_STRIDE', 0))
+ANIMATION_DIGITS = int(os.environ.get('MAP_ANIMATION_DIGITS', 4))
+
+
+def animation_years(years, stride=0, max_frames=ANIMATION_MAX_FRAMES):
+    """Every ``stride``-th year counting back from the latest one.
+
+    With ``stride=0`` the stride is chosen so at most ``max_frames`` years
+    remain (``max_frames=0`` keeps every year).
+    """
+    years = np.unique(years)
+    if not stride:
+        stride = math.ceil(len(years) / max_frames) if max_frames else 1
+    return years[::-1][::max(stride, 1)][::-1]
+
+
+def round_significant(values, digits):
+    if not digits:
+        return values
+    with np.errstate(divide='ignore', invalid='ignore'):
+        magnitude = np.floor(np.log10(np.abs(values)))
+        scale = 10.0 ** (digits - 1 - magnitude)
+        rounded = np.round(values * scale) / scale
+    return np.where(np.isfinite(rounded), rounded, values).astype(values.dtype)
+
+
+class YearFrames:
+    """Rows with a value for one (metric, per_capita) pair, sorted by year."""
+
+    def __init__(self, years, fields):
+        self.years = years
+        self.fields = fields
+
+    def bounds(self, years):
+        """Row positions ``(lo, hi)`` of each of the sorted ``years``."""
+        return zip(np.searchsorted(self.years, years, side='left'), np.searchsorted(self.years, years, side='right'))
+
+    def year(self, year):
+        lo = int(np.searchsorted(self.years, year, side='left'))
+        hi = int(np.searchsorted(self.years, year, side='right'))
+        return {name: values[lo:hi] for name, values in self.fields.items()}
+
+    def all_years(self):
+        return dict(self.fields, year=self.years)
+
+    def spliced(self, new, years):
+        """These frames with the rows of the sorted ``years`` replaced by those in ``new``."""
+        # Each year comes wholly from one side, so slices in year order keep the table order within a year
+        slices, start = [], 0
+        for (old_lo, old_hi), (new_lo, new_hi) in zip(self.bounds(years), new.bounds(years)):
+            slices += [(self, slice(start, old_lo)), (new, slice(new_lo, new_hi))]
+            start = old_hi
+        slices.append((self, slice(start, None)))
+        return YearFrames(np.concatenate([frames.years[rows] for frames, rows in slices]), {
+            name: np.concatenate([frames.fields[name][rows] for frames, rows in slices]) for name in self.fields})
+
+
+class MapFrames:
+    def __init__(self, df, table, metrics=MAP_METRICS, rows=None):
+        """Frames of ``df``, whose rows are ``rows`` (default: all) of the table ``table`` was built from."""
+        # Stable sort keeps the table's country order within each year
+        order = np.argsort(df['year'].to_numpy(), kind='stable')
+        positions = order if rows is None else rows[order]
+        years = df['year'].to_numpy()[order]
+        iso_code = df['iso_code'].to_numpy(dtype=object)[order]
+        country = df['country'].to_numpy(dtype=object)[order]
+        population = df['population'].to_numpy()[order]
+        gdp = df['gdp'].to_numpy()[order]
+
+        self.metrics = [metric for metric in metrics if metric in df.columns]
+        self.frames = {}
+        self._animations = {}
+        self._animations_lock = threading.Lock()
+        for metric in self.metrics:
+            raw = df[metric].to_numpy()[order]
+            per_capita = table.values('per_capita', metric)[positions]
+            for normalize, values in ((False, raw), (True, per_capita)):
+                keep = ~np.isnan(values)
+                self.frames[metric, normalize] = YearFrames(years[keep], {
+                    'iso_code': iso_code[keep],
+                    'country': country[keep],
+                    'value': values[keep],
+                    'gdp': gdp[keep],
+                    'population': population[keep],
+                })
+
+    def get(self, metric, per_capita):
+        return self.frames[metric, bool(per_capita)]
+
+    def updated(self, df, table, changed_years):
+        """Frames for ``df``, recomputing only ``changed_years``; animations are rebuilt on use."""
+        changed = np.array(sorted(changed_years), dtype=df['year'].dtype)
+        if len(changed) > len(np.unique(df['year'])) // 2:
+            return MapFrames(df, table, self.metrics)
+        rows = np.flatnonzero(df['year'].isin(changed).to_numpy())
+        updated = MapFrames(df.iloc[rows], table, self.metrics, rows=rows)
+        for key, old in self.frames.items():
+            updated.frames[key] = old.spliced(updated.frames[key], changed)
+        return updated
+
+    def animation(self, metric, per_capita, stride=ANIMATION_STRIDE, max_frames=ANIMATION_MAX_FRAMES,
+                  digits=ANIMATION_DIGITS, countries_only=True):
+        """Bounded long table (year, iso_code, country, metric, gdp, population) for px animations."""
+        key = (metric, bool(per_capita), stride, max_frames, digits, countries_only)
+        with self._animations_lock:
+            table = self._animations.get(key)
+        if table is not None:
+            return table
+
+        fields = self.get(metric, per_capita).all_years()
+        keep = np.isin(fields['year'], animation_years(fields['year'], stride, max_frames))
+        if countries_only:
+            # Regions have no iso_code or an OWID_* placeholder; neither can be drawn
+            keep &= pd.Series(fields['iso_code']).str.len().eq(3).to_numpy()
+        table = pd.DataFrame({
+            'year': fields['year'][keep],
+            'iso_code': fields['iso_code'][keep],
+            'country': fields['country'][keep],
+            metric: round_significant(fields['value'][keep], digits),
+            'gdp': np.round(fields['gdp'][keep]),
+            'population': np.round(fields['population'][keep]),
+        })
+        with self._animations_lock:
+            self._animations[key] = table
+        return table
+
+
+def get_map_frames():
+    return get_snapshot().derived('map_frames', lambda snapshot: MapFrames(snapshot.df, metric_table_for(snapshot)))
+
+
+register_derived_update('map_frames', lambda frames, snapshot, changes: frames.updated(snapshot.df, metric_table_for(snapshot),
+                                                                                       changes.years))
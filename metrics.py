@@ -0,0 +1,256 @@
+"""Hot-path timing for the chart callbacks, exported in Prometheus text format.
+
+Every chart callback runs inside ``chart(graph_id)``; the data helpers and
+builders mark their work with ``stage(name)``, so each section's time is split
+into:
+
+* ``filter``    - selecting the country/year rows or the map's year frame
+* ``transform`` - pandas/NumPy reshaping (the shared source pipeline)
+* ``build``     - figure construction (plotly.express / figure dicts)
+* ``serialize`` - encoding the response after the callback returns, measured
+                  around the request (includes Dash's own dispatch overhead)
+
+Only figure-cache misses run the first three stages. ``init_app`` also
+records the uncompressed response size per chart and a count of callbacks
+per triggering input (``initial`` for page-load calls), and serves all of it
+at ``/metrics`` together with the requests ``request_guard`` skipped.
+
+Profiling: with ``PROFILE_REQUESTS=1``, a callback request whose URL or page
+(Referer) carries ``?profile=1`` is run under cProfile, or pyinstrument with
+``?profile=pyinstrument`` if installed, and the profile is written to
+``PROFILE_DIR`` (default ``Data/profiles``).
+"""
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import parse_qs, urlsplit
+
+from flask import Response, g, has_request_context, request
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BYTES_BUCKETS = (1e3, 5e3, 1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 5e6)
+CALLBACK_PATH = '_dash-update-component'
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0, 0.0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            series[1] += 1
+            series[2] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = {key: (list(counts), count, total) for key, (counts, count, total) in self._series.items()}
+        for label_values, (counts, count, total) in sorted(series.items()):
+            labels = _labels(self.labels, label_values)
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound:g}"}} {bucket_count}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f'{self.name}_sum{{{labels}}} {total:.6f}')
+            lines.append(f'{self.name}_count{{{labels}}} {count}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, labels):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            values = dict(self._values)
+        for label_values, value in sorted(values.items()):
+            lines.append(f'{self.name}{{{_labels(self.labels, label_values)}}} {value}')
+        return lines
+
+
+def _labels(names, values):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+STAGE_SECONDS = Histogram('dashboard_figure_stage_seconds', 'Time per chart and hot-path stage.',
+                          ('chart', 'stage'), SECONDS_BUCKETS)
+CALLBACK_SECONDS = Histogram('dashboard_callback_seconds', 'Chart callback time, cache hits included.',
+                             ('chart',), SECONDS_BUCKETS)
+PAYLOAD_BYTES = Histogram('dashboard_figure_payload_bytes', 'Uncompressed callback response size per chart.',
+                          ('chart',), BYTES_BUCKETS)
+CALLBACKS = Counter('dashboard_callbacks_total', 'Chart callbacks per triggering input.', ('chart', 'trigger'))
+SUPERSEDED = Counter('dashboard_superseded_callbacks_total',
+                     'Callback requests skipped because a newer one for the same chart arrived.', ('chart',))
+REGISTRY = [STAGE_SECONDS, CALLBACK_SECONDS, PAYLOAD_BYTES, CALLBACKS, SUPERSEDED]
+
+# A context variable, so figure_pool's worker threads attribute stages to the caller's chart
+_current_chart = contextvars.ContextVar('metrics_chart', default=None)
+_request_lock = threading.Lock()
+
+
+@contextmanager
+def chart(graph_id):
+    """Attribute the stages run inside this block to ``graph_id``."""
+    token = _current_chart.set(graph_id)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        _current_chart.reset(token)
+        CALLBACK_SECONDS.observe(elapsed, graph_id)
+        if has_request_context():
+            # Pooled builds of one request add to the same total from several threads
+            with _request_lock:
+                g.metrics_callback_seconds = getattr(g, 'metrics_callback_seconds', 0.0) + elapsed
+
+
+@contextmanager
+def stage(name):
+    graph_id = _current_chart.get()
+    if graph_id is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, graph_id, name)
+
+
+def render(extra_lines=()):
+    lines = []
+    for metric in REGISTRY:
+        lines += metric.render()
+    lines += list(extra_lines)
+    return '\n'.join(lines) + '\n'
+
+
+def _profile_mode():
+    flags = parse_qs(request.query_string.decode('latin-1'))
+    if 'profile' not in flags and request.referrer:
+        flags = parse_qs(urlsplit(request.referrer).query)
+    return flags.get('profile', [None])[0]
+
+
+def _start_profiler(mode):
+    if mode == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            mode = 'cprofile'
+        else:
+            profiler = Profiler()
+            profiler.start()
+            return 'pyinstrument', profiler
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return 'cprofile', profiler
+
+
+def _dump_profile(kind, profiler, profile_dir, label):
+    os.makedirs(profile_dir, exist_ok=True)
+    stem = os.path.join(profile_dir, f'{time.strftime("%Y%m%d-%H%M%S")}-{int(time.time() * 1000) % 1000:03d}-{label}')
+    if kind == 'pyinstrument':
+        profiler.stop()
+        with open(stem + '.html', 'w') as f:
+            f.write(profiler.output_html())
+    else:
+        profiler.disable()
+        profiler.dump_stats(stem + '.prof')
+
+
+def _callback_outputs(body):
+    """Chart ids a callback request updates, e.g. ['energy-mix-pie-chart']."""
+    outputs = body.get('outputs')
+    if isinstance(outputs, dict):
+        outputs = [outputs]
+    return [o['id'] for o in outputs or [] if isinstance(o, dict) and isinstance(o.get('id'), str)]
+
+
+def init_app(server, extra_metrics=None, output_aliases=None, profiling=None, profile_dir=None):
+    """Install the request hooks and the ``/metrics`` route.
+
+    ``extra_metrics()`` may return more exposition lines (e.g. cache counters);
+    ``output_aliases`` maps output component ids to chart names.
+    """
+    output_aliases = output_aliases or {}
+    if profiling is None:
+        profiling = os.environ.get('PROFILE_REQUESTS', '0').lower() in ('1', 'true', 'yes', 'on')
+    profile_dir = profile_dir or os.environ.get('PROFILE_DIR', os.path.join('Data', 'profiles'))
+
+    @server.before_request
+    def _start_request():
+        if not request.path.endswith(CALLBACK_PATH):
+            return
+        g.metrics_start = time.perf_counter()
+        if profiling:
+            mode = _profile_mode()
+            if mode and mode != '0':
+                g.metrics_profiler = _start_profiler(mode)
+
+    @server.after_request
+    def _finish_request(response):
+        start = getattr(g, 'metrics_start', None)
+        if start is None:
+            return response
+        body = request.get_json(silent=True) or {}
+        charts = [output_aliases.get(c, c) for c in _callback_outputs(body)] or ['unknown']
+        label = charts[0] if len(charts) == 1 else 'multi'
+        triggers = body.get('changedPropIds') or ['initial']
+
+        profiler = getattr(g, 'metrics_profiler', None)
+        if profiler is not None:
+            _dump_profile(*profiler, profile_dir, label)
+
+        if response.status_code == 200 and not response.direct_passthrough:
+            PAYLOAD_BYTES.observe(len(response.get_data()), label)
+        overhead = time.perf_counter() - start - getattr(g, 'metrics_callback_seconds', 0.0)
+        STAGE_SECONDS.observe(max(overhead, 0.0), label, 'serialize')
+        if 'cacheKey' not in request.args:  # background job polls are not new callbacks
+            for trigger in triggers:
+                CALLBACKS.inc(label, trigger)
+        return response
+
+    @server.route('/metrics')
+    def prometheus_metrics():
+        extra = extra_metrics() if extra_metrics else ()
+        return Response(render(extra), mimetype='text/plain; version=0.0.4')
+
+    return server
+
+
+def counter_lines(name, help_text, label_names, values):
+    """Exposition lines for counters kept elsewhere: ``values`` maps label tuples to numbers."""
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+    for label_values, value in sorted(values.items()):
+        lines.append(f'{name}{{{_labels(label_names, label_values)}}} {value}')
+    return lines
+
@@ -0,0 +1,172 @@
+"""Pre-rendered default views for the most visited countries, and the app's warm start from them.
+
+Most visits show a handful of countries with the default controls (coal,
+oil and gas, every year). ``python prerender.py --top 20`` builds that view
+for the top-N countries ahead of time: 'World' (the page default), then the
+entities with the highest primary energy consumption in their latest year,
+plus the map and comparison charts every first visit requests. Countries are
+built in parallel on a process pool forked after the data is loaded, and
+each country's figures on the figure pool (``app.build_view``). Each figure
+is built by the getter its chart callback uses and recorded under its figure
+cache key (``app.default_view_specs``). The directory gets:
+
+* ``figures/<country>.json`` - ``[key, figure]`` pairs, ``_shared.json`` for
+  the map and comparison;
+* ``images/<country>/<chart>.<format>`` - static exports through kaleido,
+  when it is installed (``pip install kaleido``; skipped with a warning
+  otherwise, ``--images none`` to turn them off);
+* ``manifest.json`` - the data file's fingerprint, the countries and counts.
+
+Each worker loads the figures into its figure cache at startup
+(``warm_cache``) when the manifest matches the data file, so those views are
+cache hits from the first request; after a data change the directory is
+ignored until it is rebuilt. The cache's size and TTL still apply.
+Environment::
+
+    PRERENDER_DIR=Data/prerendered   directory written by the CLI and read at startup
+"""
+import concurrent.futures
+import glob
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import time
+import warnings
+
+from data_store import data_fingerprint
+
+PRERENDER_DIR = os.environ.get('PRERENDER_DIR', os.path.join('Data', 'prerendered'))
+SHARED = '_shared'
+
+
+def file_name(country):
+    return re.sub(r'[^0-9A-Za-z]+', '-', country).strip('-').lower() or 'unnamed'
+
+
+def read_manifest(directory=PRERENDER_DIR):
+    """The directory's manifest, or None when missing or built from other data."""
+    try:
+        with open(os.path.join(directory, 'manifest.json')) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get('source') == data_fingerprint() else None
+
+
+def warm_cache(cache, directory=PRERENDER_DIR):
+    """Load the pre-rendered figures into ``cache``; returns how many were stored."""
+    if cache.backend is None or read_manifest(directory) is None:
+        return 0
+    stored = 0
+    for path in sorted(glob.glob(os.path.join(directory, 'figures', '*.json'))):
+        try:
+            with open(path) as f:
+                stored += cache.warm(json.load(f))
+        except (OSError, ValueError) as e:
+            warnings.warn(f'Skipping pre-rendered figures {path!r}: {e}')
+    return stored
+
+
+# ═══ Building ═══
+def top_countries(snapshot, n):
+    """'World', then the entities with the highest primary energy consumption in their latest year."""
+    df = snapshot.df[['country', 'primary_energy_consumption']].dropna()
+    latest = df.groupby('country', observed=True)['primary_energy_consumption'].last()
+    ranked = [str(country) for country in latest.sort_values(ascending=False, kind='stable').index]
+    countries = ['World'] if 'World' in snapshot.country_index.blocks else []
+    return (countries + [country for country in ranked if country not in countries])[:n]
+
+
+def kaleido_available():
+    try:
+        import kaleido  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def render(name, specs, directory, image_format):
+    """Build ``specs`` on the figure pool, recording their entries; write them and the images. Runs in a pool worker."""
+    import plotly.io as pio
+
+    import app
+    import fast_json
+    from figure_cache import entries_json
+
+    start = time.perf_counter()
+    recorded = app.build_view(specs)
+    entries = [entry for spec_entries in recorded for entry in spec_entries]
+    with open(os.path.join(directory, 'figures', f'{name}.json'), 'wb') as f:
+        f.write(entries_json(entries))
+    if image_format:
+        os.makedirs(os.path.join(directory, 'images', name), exist_ok=True)
+        # Each getter's own lookup is the last it records
+        for (graph_id, _, _), spec_entries in zip(specs, recorded):
+            pio.write_image(fast_json.to_python(spec_entries[-1][1]),
+                            os.path.join(directory, 'images', name, f'{graph_id}.{image_format}'),
+                            format=image_format, width=1000, height=500)
+    return name, len(entries), time.perf_counter() - start
+
+
+def prerender(countries=None, top=20, directory=PRERENDER_DIR, workers=None, image_format='png'):
+    """Build the default views into ``directory`` (replaced when done); returns the manifest."""
+    import app
+    from data_store import current_snapshot, snapshot_fingerprint
+
+    snapshot = current_snapshot()
+    fingerprint = snapshot_fingerprint(snapshot)
+    if fingerprint is None:
+        raise RuntimeError('The data file changed while loading it; run prerender.py again')
+    countries = countries or top_countries(snapshot, top)
+    if image_format and not kaleido_available():
+        warnings.warn('Static images need kaleido (pip install kaleido); writing figure JSON only')
+        image_format = None
+
+    building = f'{directory}.building-{os.getpid()}'
+    shutil.rmtree(building, ignore_errors=True)
+    os.makedirs(os.path.join(building, 'figures'))
+    # The shared charts load the precomputations the forked workers then share
+    results = [render(SHARED, app.shared_view_specs(), building, image_format)]
+    jobs = [(file_name(country), app.default_view_specs(country)) for country in countries]
+    with concurrent.futures.ProcessPoolExecutor(workers or os.cpu_count(),
+                                                mp_context=multiprocessing.get_context('fork')) as pool:
+        results += pool.map(render, *zip(*jobs), [building] * len(jobs), [image_format] * len(jobs))
+
+    manifest = {
+        'source': fingerprint,
+        'version': snapshot.version,
+        'built': time.time(),
+        'countries': countries,
+        'figures': sum(count for _, count, _ in results),
+        'images': image_format,
+        'seconds': {name: round(seconds, 3) for name, _, seconds in results},
+    }
+    with open(os.path.join(building, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=1)
+    # Swap the finished directory in; a worker starting between the two renames starts cold
+    retired = f'{directory}.old-{os.getpid()}'
+    if os.path.exists(directory):
+        os.replace(directory, retired)
+    os.replace(building, directory)
+    shutil.rmtree(retired, ignore_errors=True)
+    return manifest
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Pre-render the default views of the most visited countries.')
+    parser.add_argument('--top', type=int, default=20, help='number of countries, World first')
+    parser.add_argument('--countries', nargs='+', help='explicit countries instead of the top-N')
+    parser.add_argument('--out', default=PRERENDER_DIR, help='output directory')
+    parser.add_argument('--workers', type=int, help='build processes (default: one per CPU)')
+    parser.add_argument('--images', default='png', choices=['png', 'svg', 'pdf', 'none'], help='static image format')
+    args = parser.parse_args()
+
+    os.environ.setdefault('BACKGROUND_CALLBACKS', 'none')
+    os.environ.setdefault('DATA_REFRESH_INTERVAL', '0')
+    built = prerender(args.countries, args.top, args.out, args.workers, None if args.images == 'none' else args.images)
+    print(f"Wrote {built['figures']} figures for {len(built['countries'])} countries to {args.out} "
+          f"in {sum(built['seconds'].values()):.1f} s of build time")
@@ -0,0 +1,117 @@
+"""Skip callback requests that a newer request from the same page superseded.
+
+When a callback is requested again before its response arrives (the next
+slider step, another dropdown value), the Dash renderer ignores the older
+response, but the server would still filter, build and serialize it. The
+``REQUEST_PRE_HOOK`` renderer hook tags every callback request with an id
+drawn once per page load; each request takes a ticket for its (page, output)
+on arrival, and ``check(chart)`` raises ``PreventUpdate`` once a later request
+for the same output from the same page has arrived. ``skip_superseded``
+checks before a callback touches the data and again before its figure is
+serialized, and the figure helpers check between filtering and building, so
+a stale request stops at the next of those points.
+
+Tickets are per process, and only requests the server has accepted can
+supersede anything: this helps threaded servers (``gunicorn --threads``, the
+dev server), where a burst of requests runs concurrently. With sync workers
+the burst waits in the socket backlog, one request at a time, and the
+client-side settle delay on the sliders (app.py) is what coalesces it.
+Requests without a page id (API clients, benchmarks) are never skipped.
+
+Environment::
+
+    REQUEST_GUARD=1     0 disables the check
+"""
+import functools
+import itertools
+import os
+import threading
+
+from dash.exceptions import PreventUpdate
+from flask import g, has_request_context, request
+
+import metrics
+
+# Dash renderer ``request_pre`` hook: one random id per page load, sent in every callback payload
+REQUEST_PRE_HOOK = '''function(payload) {
+    window.dashboardPageId = window.dashboardPageId || Math.random().toString(36).slice(2);
+    payload.page = window.dashboardPageId;
+}'''
+
+
+class RequestGuard:
+    """Latest ticket per (page, output), for the ``max_keys`` most recently active."""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._latest = {}
+        self._tickets = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def arrive(self, key):
+        with self._lock:
+            ticket = next(self._tickets)
+            self._latest.pop(key, None)
+            self._latest[key] = ticket
+            if len(self._latest) > self.max_keys:
+                del self._latest[next(iter(self._latest))]
+        return ticket
+
+    def is_latest(self, key, ticket):
+        return self._latest.get(key, ticket) == ticket
+
+
+_guard = None
+
+
+def guard_from_env(environ=os.environ):
+    """A ``RequestGuard``, or None when ``REQUEST_GUARD`` is off."""
+    if environ.get('REQUEST_GUARD', '1').lower() in ('0', 'false', 'no', 'off'):
+        return None
+    return RequestGuard()
+
+
+def superseded():
+    """True inside a callback request that a newer one for the same outputs replaced."""
+    if _guard is None or not has_request_context():
+        return False
+    ticket = getattr(g, 'request_guard_ticket', None)
+    return ticket is not None and not _guard.is_latest(*ticket)
+
+
+def check(chart):
+    if superseded():
+        metrics.SUPERSEDED.inc(chart)
+        raise PreventUpdate
+
+
+def skip_superseded(chart):
+    """Callback decorator: ``check(chart)`` before the callback runs and before its result is sent."""
+    def decorate(callback):
+        @functools.wraps(callback)
+        def guarded(*args, **kwargs):
+            check(chart)
+            result = callback(*args, **kwargs)
+            check(chart)
+            return result
+        return guarded
+    return decorate
+
+
+def init_app(server, guard=None):
+    global _guard
+    _guard = guard or guard_from_env()
+    if _guard is None:
+        return None
+
+    @server.before_request
+    def _take_ticket():
+        # Background callback polls belong to the request that started the job
+        if not request.path.endswith(metrics.CALLBACK_PATH) or 'cacheKey' in request.args:
+            return
+        body = request.get_json(silent=True) or {}
+        if body.get('page') is not None and body.get('output') is not None:
+            key = (str(body['page']), body['output'])
+            g.request_guard_ticket = (key, _guard.arrive(key))
+
+    return _guard
@@ -0,0 +1,226 @@
+"""Shareable dashboard views: the controls in the URL, the figures in a stored bundle.
+
+A view is the page's country, year range and sources plus the map's metric,
+projection, per-capita toggle, year and animation toggle (``ViewState``). The
+Share button writes it into the page URL (``dcc.Location``) with a content
+hash of the normalized state, e.g.::
+
+    ?country=World&years=1990-2020&sources=coal,oil,gas&map=primary_energy
+     &projection=natural+earth&per_capita=0&map_year=2020&animate=0&view=5d41402abc4b
+
+and stores the view's 11 figures as one bundle under that hash: ``[key,
+figure]`` pairs recorded under their figure cache keys (``FigureCache.
+recording``), gzip-compressed JSON, with the data version they were built
+from. Opening the link restores the controls from the URL, and first loads
+the bundle into the figure cache, so the chart callbacks the controls fire
+are cache hits instead of builds; ``/_view/<hash>`` serves the compressed
+bundle as it is stored. Only the Share button stores bundles: a link whose
+bundle is missing or was built from older data opens like any visit, the
+chart callbacks building its figures. The query alone describes the view,
+so a link still works after its bundle is evicted; ``?view=<hash>`` on its
+own works while the bundle is kept. A URL without ``view`` is not restored.
+
+Bundles live in one SQLite file shared by the workers. Bundles older than
+``SHARED_VIEW_MAX_AGE`` are dropped, and past ``SHARED_VIEW_MAX_MB`` of
+compressed bundles the least recently opened ones go first. A bundle is
+loaded into the figure cache of the worker that restores the link; with
+several workers, ``FIGURE_CACHE_BACKEND=sqlite`` shares it with the others.
+Environment::
+
+    SHARED_VIEWS=1                              0 stores no bundles (links still restore the controls)
+    SHARED_VIEW_PATH=Data/shared_views.sqlite
+    SHARED_VIEW_MAX_AGE=2592000                 seconds (30 days), 0 = no limit
+    SHARED_VIEW_MAX_MB=256                      compressed bundle size kept, 0 = no limit
+"""
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from urllib.parse import parse_qs, urlencode
+
+from data_store import ENERGY_SOURCES, MAP_METRICS
+from figure_cache import entries_json
+
+MAP_PROJECTIONS = ['natural earth', 'orthographic', 'equirectangular', 'robinson', 'mercator']
+SUFFIX = '_consumption'
+
+ViewState = namedtuple('ViewState', ['country', 'years', 'sources', 'projection', 'metric',
+                                     'per_capita', 'map_year', 'animate'])
+
+
+def view_state(country, year_range, sources, projection, metric, percapita_toggle, map_year, animate_toggle):
+    """Normalized ``ViewState`` of the controls' values (sources in checklist order, toggles as bools)."""
+    selected = set(sources or [])
+    return ViewState(country, (int(year_range[0]), int(year_range[1])),
+                     tuple(source for source in ENERGY_SOURCES if source in selected),
+                     projection, metric, 'per_capita' in (percapita_toggle or []), int(map_year),
+                     'animate' in (animate_toggle or []))
+
+
+def view_hash(state):
+    """Compact content hash of a view: 12 hex digits of the SHA-1 of its canonical JSON."""
+    return hashlib.sha1(json.dumps(list(state), separators=(',', ':')).encode('utf-8')).hexdigest()[:12]
+
+
+def short_name(column):
+    return column[:-len(SUFFIX)] if column.endswith(SUFFIX) else column
+
+
+def to_query(state):
+    """URL query of a view, ending with its hash."""
+    return '?' + urlencode({
+        'country': state.country,
+        'years': f'{state.years[0]}-{state.years[1]}',
+        'sources': ','.join(short_name(source) for source in state.sources),
+        'map': short_name(state.metric),
+        'projection': state.projection,
+        'per_capita': int(state.per_capita),
+        'map_year': state.map_year,
+        'animate': int(state.animate),
+        'view': view_hash(state),
+    })
+
+
+def _year(value, default, bounds):
+    try:
+        year = int(value)
+    except (TypeError, ValueError):
+        return default
+    return min(max(year, bounds[0]), bounds[1])
+
+
+def from_query(search, default, countries, store=None):
+    """The ``ViewState`` a URL query describes, or None when it names no view.
+
+    Values that are missing or not offered by the controls fall back to
+    ``default``'s, years are clamped to its range. A query with only
+    ``view=<hash>`` is looked up in ``store``.
+    """
+    params = {name: values[-1] for name, values in parse_qs((search or '').lstrip('?'), keep_blank_values=True).items()}
+    if set(params) <= {'view'}:
+        return store.state(params['view']) if store is not None and 'view' in params else None
+
+    bounds = default.years
+    years = params.get('years', '').split('-')
+    year_range = sorted(_year(year, fallback, bounds) for year, fallback in zip(years + [None, None], bounds))
+    metric = params.get('map', '') + SUFFIX
+    if 'sources' in params:
+        names = {name + SUFFIX for name in params['sources'].split(',')}
+        sources = tuple(source for source in ENERGY_SOURCES if source in names)
+    else:
+        sources = default.sources
+    return ViewState(
+        params['country'] if params.get('country') in countries else default.country,
+        tuple(year_range),
+        sources,
+        params['projection'] if params.get('projection') in MAP_PROJECTIONS else default.projection,
+        metric if metric in MAP_METRICS else default.metric,
+        params.get('per_capita', str(int(default.per_capita))) == '1',
+        _year(params.get('map_year'), default.map_year, bounds),
+        params.get('animate', str(int(default.animate))) == '1',
+    )
+
+
+def state_from_json(text):
+    country, years, sources, *rest = json.loads(text)
+    return ViewState(country, tuple(years), tuple(sources), *rest)
+
+
+def encode_bundle(entries):
+    """gzip-compressed JSON of ``[key, figure]`` pairs (``figure_cache.entries_json``)."""
+    return gzip.compress(entries_json(entries), compresslevel=6, mtime=0)
+
+
+def decode_bundle(bundle):
+    return json.loads(gzip.decompress(bundle))
+
+
+class BundleStore:
+    """Compressed view bundles by hash in a SQLite file shared across processes, bounded by age and size."""
+
+    def __init__(self, path, max_age=None, max_bytes=None):
+        self.path = path
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS views ('
+                         'hash TEXT PRIMARY KEY, state TEXT NOT NULL, version TEXT NOT NULL, bundle BLOB NOT NULL, '
+                         'size INTEGER NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS views_accessed ON views (accessed)')
+
+    def _connect(self):
+        # One connection per thread and process, as in figure_cache.SQLiteBackend
+        conn, pid = getattr(self._local, 'conn', (None, None))
+        if conn is None or pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10)
+            self._local.conn = (conn, os.getpid())
+        return conn
+
+    def _expired(self, created, now):
+        return self.max_age and now - created > self.max_age
+
+    def get(self, digest):
+        """``(state, data version, compressed bundle)`` of a stored view, or None."""
+        conn = self._connect()
+        row = conn.execute('SELECT state, version, bundle, created FROM views WHERE hash = ?', (digest,)).fetchone()
+        if row is None:
+            return None
+        state, version, bundle, created = row
+        now = time.time()
+        with conn:
+            if self._expired(created, now):
+                conn.execute('DELETE FROM views WHERE hash = ?', (digest,))
+                return None
+            conn.execute('UPDATE views SET accessed = ? WHERE hash = ?', (now, digest))
+        return state_from_json(state), version, bytes(bundle)
+
+    def state(self, digest):
+        row = self._connect().execute('SELECT state FROM views WHERE hash = ?', (digest,)).fetchone()
+        return state_from_json(row[0]) if row is not None else None
+
+    def put(self, state, version, bundle):
+        conn = self._connect()
+        now = time.time()
+        with conn:
+            conn.execute('INSERT OR REPLACE INTO views (hash, state, version, bundle, size, created, accessed) '
+                         'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                         (view_hash(state), json.dumps(list(state)), version, bundle, len(bundle), now, now))
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        if self.max_age:
+            conn.execute('DELETE FROM views WHERE created < ?', (now - self.max_age,))
+        if self.max_bytes:
+            conn.execute('DELETE FROM views WHERE hash IN (SELECT hash FROM '
+                         '(SELECT hash, SUM(size) OVER (ORDER BY accessed DESC, hash) AS kept FROM views) '
+                         'WHERE kept > ?)', (self.max_bytes,))
+
+    def stats(self):
+        count, size = self._connect().execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM views').fetchone()
+        return {'views': count, 'bytes': size, 'max_bytes': self.max_bytes, 'max_age': self.max_age}
+
+    def clear(self):
+        conn = self._connect()
+        with conn:
+            conn.execute('DELETE FROM views')
+
+    def __len__(self):
+        return self._connect().execute('SELECT COUNT(*) FROM views').fetchone()[0]
+
+
+def store_from_env(environ=os.environ):
+    """A ``BundleStore``, or None when ``SHARED_VIEWS`` is off."""
+    if environ.get('SHARED_VIEWS', '1').lower() in ('0', 'false', 'no', 'off'):
+        return None
+    return BundleStore(environ.get('SHARED_VIEW_PATH', os.path.join('Data', 'shared_views.sqlite')),
+                       max_age=float(environ.get('SHARED_VIEW_MAX_AGE', 30 * 24 * 3600)) or None,
+                       max_bytes=int(float(environ.get('SHARED_VIEW_MAX_MB', 256)) * 2 ** 20) or None)
@@ -0,0 +1,65 @@
+"""Fast worker startup: deferred heavy imports and gunicorn ``--preload`` support.
+
+Importing the app used to parse the CSV (through the layout) and import
+pandas and plotly.express, about 2 s before a worker could answer a health
+check. Now:
+
+* the layout's dropdown options, year bounds and slider marks come from a
+  small metadata file next to the data (``data_store.layout_metadata``),
+  so serving a page does not load the data;
+* pandas, NumPy and plotly.express are bound through ``lazy_import``, which
+  imports them on first attribute access, i.e. in the first callback that
+  builds a figure.
+
+With ``STARTUP_PRELOAD=1`` the app does the opposite and loads the data,
+the heavy modules and the precomputations at import. Run that under
+``gunicorn --preload app:server``: the master loads everything once and the
+forked workers share those pages copy-on-write. ``preload`` ends with
+``gc.freeze()`` so the garbage collector never writes to (and so copies)
+the objects created before the fork. Environment::
+
+    STARTUP_PRELOAD=0   load data and heavy modules at import (with --preload)
+"""
+import gc
+import importlib
+import os
+import sys
+import types
+
+
+class LazyModule(types.ModuleType):
+    """Stand-in for a module that imports it on first attribute access.
+
+    Unlike ``importlib.util.LazyLoader`` nothing is put in ``sys.modules``
+    early, so libraries that check whether pandas is already imported (plotly's
+    JSON encoder does, on every response) do not trigger the import.
+    """
+
+    def __getattr__(self, attr):
+        module = importlib.import_module(self.__name__)
+        # Later lookups hit the copied attributes directly
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+
+def lazy_import(name):
+    """``import name``, deferred to the first attribute access unless already imported."""
+    return sys.modules.get(name) or LazyModule(name)
+
+
+def preload_from_env(environ=os.environ):
+    return environ.get('STARTUP_PRELOAD', '0').lower() in ('1', 'true', 'yes', 'on')
+
+
+def preload(modules=(), warm=()):
+    """Load the data, ``modules`` and each ``warm()`` now, then freeze everything for forked workers."""
+    from data_store import current_snapshot, layout_metadata
+
+    for module in modules:
+        importlib.import_module(module.__name__)
+    current_snapshot()
+    layout_metadata()
+    for fn in warm:
+        fn()
+    gc.collect()
+    gc.freeze()
@@ -0,0 +1,38 @@
+"""The tests run the app against a small synthetic dataset (benchmarks/synthetic_data.py).
+
+The app reads ``Data/`` relative to the working directory and builds its
+layout when imported, so the dataset is written to a temporary directory and
+made the working directory before the test modules are collected. Background
+callbacks, data refreshes, the figure cache and pool, shared views and
+pre-rendered figures are off.
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'benchmarks')]
+
+ENVIRONMENT = {'BACKGROUND_CALLBACKS': 'none', 'DATA_REFRESH_INTERVAL': '0', 'FIGURE_CACHE_BACKEND': 'none',
+               'FIGURE_POOL': 'none', 'SHARED_VIEWS': '0', 'PRERENDER_DIR': os.path.join('Data', 'none')}
+
+_cwd = None
+_workdir = None
+
+
+def pytest_configure(config):
+    global _cwd, _workdir
+    import synthetic_data
+
+    for name, value in ENVIRONMENT.items():
+        os.environ.setdefault(name, value)
+    _cwd, _workdir = os.getcwd(), tempfile.mkdtemp()
+    synthetic_data.write(os.path.join(_workdir, 'Data'), scale=0.1)
+    os.chdir(_workdir)
+
+
+def pytest_unconfigure(config):
+    if _workdir is not None:
+        os.chdir(_cwd)
+        shutil.rmtree(_workdir, ignore_errors=True)
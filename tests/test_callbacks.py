@@ -0,0 +1,32 @@
+"""Every registered server callback, replayed once through the Flask test client.
+
+The benchmarks replay the page's callbacks the same way (startup_time.py's
+``callback_body``), so a callback whose outputs or inputs change shape fails
+here first. Inputs and state are the layout's initial values; callbacks that
+only fire on a user action (Share, the shared view restore) are replayed with
+them too.
+
+    python -m pytest -q tests
+"""
+import pytest
+
+import app
+from startup_time import callback_body, initial_props
+
+SERVER_CALLBACKS = [spec for spec in app.app._callback_list if spec.get('clientside_function') is None]
+
+
+@pytest.fixture(scope='module')
+def client():
+    return app.server.test_client()
+
+
+@pytest.fixture(scope='module')
+def props(client):
+    return initial_props(client.get('/_dash-layout').get_json())
+
+
+@pytest.mark.parametrize('spec', SERVER_CALLBACKS, ids=lambda spec: spec['output'].strip('.').split('@')[0][:60])
+def test_callback_replays(client, props, spec):
+    response = client.post('/_dash-update-component', json=callback_body(spec, props))
+    assert response.status_code in (200, 204), response.get_data(as_text=True)[:500]
@@ -0,0 +1,64 @@
+"""Refreshed snapshots: ``diff_frames`` and the incremental updates of the metric table and map frames.
+
+    python -m pytest -q tests
+"""
+import numpy as np
+import pytest
+
+import data_store
+from derived_metrics import MetricTable, metric_table_for
+from map_frames import MapFrames
+
+METRIC = 'coal_consumption'
+
+
+@pytest.fixture(scope='module')
+def snapshot():
+    snapshot = data_store.load_snapshot()
+    metric_table_for(snapshot)
+    snapshot.derived('map_frames', lambda snapshot: MapFrames(snapshot.df, metric_table_for(snapshot)))
+    return snapshot
+
+
+def edited(snapshot, drop_year=None):
+    """A copy of the table with one country's values changed for a few years (and a year of rows dropped)."""
+    df = snapshot.df.copy()
+    country = sorted(snapshot.country_index.blocks)[-1]
+    rows = df['country'].eq(country) & df['year'].between(2000, 2005)
+    df.loc[rows, METRIC] = df.loc[rows, METRIC].fillna(0) + 1
+    if drop_year is not None:
+        df = df[df['year'].ne(drop_year) | df['country'].eq(country)].reset_index(drop=True)
+    return df, country
+
+
+@pytest.mark.parametrize('drop_year', [None, 1990])
+def test_diff_frames(snapshot, drop_year):
+    df, country = edited(snapshot, drop_year)
+    changes = data_store.diff_frames(snapshot.df, df)
+    assert data_store.same_rows(snapshot.df, df) == (drop_year is None)
+    if drop_year is None:
+        assert changes == data_store.Changes(frozenset([country]), frozenset(range(2000, 2006)))
+    else:
+        assert country in changes.countries and drop_year in changes.years
+        assert set(range(2000, 2006)) <= changes.years
+    assert data_store.diff_frames(snapshot.df, snapshot.df.copy()) == data_store.Changes(frozenset(), frozenset())
+
+
+@pytest.mark.parametrize('drop_year', [None, 1990])
+def test_updates_match_a_full_build(snapshot, drop_year):
+    df, _ = edited(snapshot, drop_year)
+    refreshed = snapshot.followed_by(df, 'edited', data_store.diff_frames(snapshot.df, df))
+    table = refreshed._derived['metric_table']
+    full = MetricTable(df)
+    for name, values in full.arrays.items():
+        np.testing.assert_array_equal(table.arrays[name], values)
+
+    frames, full_frames = refreshed._derived['map_frames'], MapFrames(df, full)
+    for key, expected in full_frames.frames.items():
+        np.testing.assert_array_equal(frames.frames[key].years, expected.years)
+        for name, values in expected.fields.items():
+            actual = frames.frames[key].fields[name]
+            if values.dtype == object:
+                # iso_code / country hold NaN for rows without one
+                actual, values = actual.astype(str), values.astype(str)
+            np.testing.assert_array_equal(actual, values)
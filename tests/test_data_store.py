@@ -0,0 +1,43 @@
+"""Columns read on demand (``Snapshot.column``) from the column store and from the CSV.
+
+    python -m pytest -q tests
+"""
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+import data_store
+import synthetic_data
+
+EXTRA_COLUMN = 'coal_share_energy'
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    shutil.copy(os.path.join('Data', 'World Energy Consumption.csv'), tmp_path)
+    return tmp_path
+
+
+def test_csv_column_matches_the_source(data_dir):
+    csv_path = str(data_dir / 'World Energy Consumption.csv')
+    snapshot = data_store.load_snapshot(csv_path, str(data_dir / 'store'))
+    raw = synthetic_data.generate(scale=0.1).set_index(['country', 'year'])[EXTRA_COLUMN]
+    keys = zip(snapshot.df['country'].astype(str), snapshot.df['year'].astype(int))
+    expected = raw.reindex(list(keys)).to_numpy(dtype='float32')
+    np.testing.assert_allclose(snapshot.column(EXTRA_COLUMN), expected, rtol=1e-5)
+
+
+def test_store_column_without_the_csv(data_dir):
+    csv_path, store_dir = str(data_dir / 'World Energy Consumption.csv'), str(data_dir / 'store')
+    data_store.build_store(csv_path, store_dir)
+    expected = data_store.load_snapshot(csv_path, store_dir).column(EXTRA_COLUMN)
+    os.remove(csv_path)
+
+    snapshot = data_store.load_snapshot(csv_path, store_dir)
+    assert snapshot.source == os.path.join(store_dir, 'meta.json')
+    np.testing.assert_array_equal(snapshot.column(EXTRA_COLUMN), expected)
+    assert snapshot.column('coal_consumption') is not None
+    with pytest.raises(KeyError):
+        snapshot.column('no_such_column')
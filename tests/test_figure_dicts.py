@@ -0,0 +1,354 @@
+"""The plain-dict figure builders (figure_dicts.py) against the plotly.express builders they replaced.
+
+The ``px_*`` functions are the app's builders as they were before the charts
+moved to plain dicts, unchanged but for their names. Both versions are built
+from the same inputs on a small synthetic dataset (benchmarks/synthetic_data.py)
+for every chart, country, year range and source set below, including ranges
+without data and an empty source selection, serialized and compared as JSON
+(typed-array data, layout, template). The dataset is set up in conftest.py.
+
+    python -m pytest -q tests
+"""
+import json
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.io as pio
+import pytest
+
+import app
+from aggregate_cube import MEASURE_LABELS
+from app import ACCENT_COLOR, CHART_TEMPLATE, PRIMARY_COLOR, SECONDARY_COLOR
+from data_store import ENERGY_SOURCES, SOURCE_LABELS
+
+COUNTRIES = ['World', 'Africa', 'Country 00003']
+# The last two have no rows: 1900 precedes most series, 1850 precedes the data
+YEAR_RANGES = [[1965, 2022], [2000, 2010], [1900, 1901], [1800, 1850]]
+SOURCE_SETS = [ENERGY_SOURCES[:3], ENERGY_SOURCES, ENERGY_SOURCES[4:5], []]
+COMPARISON_SETS = [[], ['World'], ['Africa', 'Asia', 'Europe', 'North America', 'South America']]
+
+
+# ═══ Previous plotly.express builders ═══
+def px_pie_chart(source_data, selected_country, selected_energy_sources):
+    try:
+        if not selected_energy_sources:
+            pie_chart_figure = px.pie(
+                values=[1],
+                names=['No Data'],
+                title='Please Select At Least One Energy Source',
+                template=CHART_TEMPLATE
+            )
+            pie_chart_figure.update_layout(showlegend=False)
+        else:
+            if source_data.latest_year is not None:
+                energy_values = source_data.latest
+                energy_labels = [SOURCE_LABELS[source] for source in selected_energy_sources]
+
+                pie_chart_figure = px.pie(
+                    values=energy_values,
+                    names=energy_labels,
+                    title=f'Energy Mix for {selected_country} ({source_data.latest_year})',
+                    template=CHART_TEMPLATE,
+                    color_discrete_sequence=px.colors.qualitative.Bold
+                )
+                pie_chart_figure.update_traces(
+                    textposition='inside',
+                    textinfo='percent+label',
+                    hovertemplate='<b>%{label}</b><br>Value: %{value:.2f} TWh<br>Percent: %{percent}<extra></extra>'
+                )
+            else:
+                pie_chart_figure = px.pie(values=[1], names=['No Data'], title='No Data Available', template=CHART_TEMPLATE)
+                pie_chart_figure.update_layout(showlegend=False)
+    except Exception as e:
+        pie_chart_figure = px.pie(values=[1], names=['Error'], title=f'Error: {str(e)}', template=CHART_TEMPLATE)
+    return pie_chart_figure
+
+
+def px_primary_energy_line_chart(filtered_df, selected_country):
+    try:
+        energy_data = filtered_df[['year', 'primary_energy_consumption']].dropna()
+
+        if energy_data.empty:
+            line_chart_figure = px.line(
+                title=f'Total Primary Energy Consumption - {selected_country} (No data available)',
+                template=CHART_TEMPLATE
+            )
+            line_chart_figure.add_annotation(
+                text="No primary energy consumption data available for selected period",
+                xref="paper", yref="paper",
+                x=0.5, y=0.5, showarrow=False,
+                font=dict(size=14, color='gray')
+            )
+        else:
+            line_chart_figure = px.line(
+                energy_data,
+                x='year',
+                y='primary_energy_consumption',
+                title=f'Total Primary Energy Consumption - {selected_country}',
+                labels={'year': 'Year', 'primary_energy_consumption': 'Energy Consumption (TWh)'},
+                template=CHART_TEMPLATE
+            )
+            line_chart_figure.update_traces(line_color=SECONDARY_COLOR, line_width=3)
+            line_chart_figure.update_layout(hovermode='x unified', yaxis=dict(rangemode='tozero'))
+    except Exception as e:
+        line_chart_figure = {'layout': {'title': f'Error: {str(e)}', 'template': CHART_TEMPLATE}}
+    return line_chart_figure
+
+
+def px_trend_chart(source_data, selected_country, selected_energy_sources):
+    try:
+        if not selected_energy_sources:
+            trend_chart_figure = {'layout': {'title': 'Select Energy Sources', 'template': CHART_TEMPLATE}}
+        else:
+            trend_df = source_data.long
+
+            if trend_df.empty:
+                trend_chart_figure = {'layout': {'title': 'No data available for selected sources', 'template': CHART_TEMPLATE}}
+            else:
+                trend_chart_figure = px.line(
+                    trend_df,
+                    x='year',
+                    y='Consumption',
+                    color='Energy Source',
+                    title=f'Energy Source Consumption Trends - {selected_country}',
+                    labels={'year': 'Year', 'Consumption': 'Consumption (TWh)', 'Energy Source': 'Energy Source'},
+                    template=CHART_TEMPLATE,
+                    color_discrete_sequence=px.colors.qualitative.Bold
+                )
+                trend_chart_figure.update_traces(line_width=2.5)
+                trend_chart_figure.update_layout(hovermode='x unified', legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1), yaxis=dict(rangemode='tozero'))
+    except Exception as e:
+        trend_chart_figure = {'layout': {'title': f'Error: {str(e)}', 'template': CHART_TEMPLATE}}
+    return trend_chart_figure
+
+
+def px_stacked_area_chart(source_data, selected_country, selected_energy_sources):
+    try:
+        if not selected_energy_sources:
+            stacked_area_fig = {'layout': {'title': 'Select Energy Sources', 'template': CHART_TEMPLATE}}
+        else:
+            stacked_area_df = source_data.long
+
+            if stacked_area_df.empty:
+                stacked_area_fig = {'layout': {'title': 'No data available for selected sources', 'template': CHART_TEMPLATE}}
+            else:
+                stacked_area_fig = px.area(
+                    stacked_area_df,
+                    x='year',
+                    y='Consumption',
+                    color='Energy Source',
+                    title=f'Stacked Energy Consumption - {selected_country}',
+                    labels={'year': 'Year', 'Consumption': 'Consumption (TWh)', 'Energy Source': 'Energy Source'},
+                    template=CHART_TEMPLATE,
+                    color_discrete_sequence=px.colors.qualitative.Bold
+                )
+                stacked_area_fig.update_layout(hovermode='x unified', legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1), yaxis=dict(rangemode='tozero'))
+    except Exception as e:
+        stacked_area_fig = {'layout': {'title': f'Error: {str(e)}', 'template': CHART_TEMPLATE}}
+    return stacked_area_fig
+
+
+def px_stream_graph(source_data, selected_country, selected_energy_sources):
+    try:
+        if not selected_energy_sources:
+            stream_fig = {'layout': {'title': 'Select Energy Sources', 'template': CHART_TEMPLATE}}
+        else:
+            stream_df = source_data.long
+
+            if stream_df.empty:
+                stream_fig = {'layout': {'title': 'No data available for selected sources', 'template': CHART_TEMPLATE}}
+            else:
+                stream_fig = px.area(
+                    stream_df,
+                    x='year',
+                    y='Consumption',
+                    color='Energy Source',
+                    groupnorm='fraction',
+                    title=f'Proportional Energy Mix Over Time - {selected_country}',
+                    labels={'year': 'Year', 'Consumption': 'Proportion', 'Energy Source': 'Energy Source'},
+                    template=CHART_TEMPLATE,
+                    color_discrete_sequence=px.colors.qualitative.Bold
+                )
+                stream_fig.update_layout(hovermode='x unified', yaxis_tickformat='.0%', legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1))
+    except Exception as e:
+        stream_fig = {'layout': {'title': f'Error: {str(e)}', 'template': CHART_TEMPLATE}}
+    return stream_fig
+
+
+def px_gdp_vs_energy_scatter(filtered_df, selected_country):
+    try:
+        scatter_data = filtered_df[['year', 'gdp', 'primary_energy_consumption']].dropna().copy()
+
+        if scatter_data.empty:
+            scatter_fig = px.scatter(
+                title=f"GDP vs. Energy Consumption - {selected_country} ",
+                template=CHART_TEMPLATE
+            )
+            scatter_fig.add_annotation(
+                text="No GDP or energy data available for selected period",
+                xref="paper", yref="paper",
+                x=0.5, y=0.5, showarrow=False,
+                font=dict(size=14, color='gray')
+            )
+        else:
+            scatter_data['year_label'] = scatter_data['year'].astype(int).astype(str)
+
+            scatter_fig = px.scatter(
+                scatter_data,
+                x="gdp",
+                y="primary_energy_consumption",
+                hover_data={'year': True, 'gdp': ':,.0f', 'primary_energy_consumption': ':.2f', 'year_label': False},
+                title=f"GDP vs. Energy Consumption - {selected_country} ({len(scatter_data)} data points)",
+                labels={
+                    'gdp': 'GDP ($)',
+                    'primary_energy_consumption': 'Energy Consumption (TWh)',
+                    'year': 'Year'
+                },
+                template=CHART_TEMPLATE
+            )
+            scatter_fig.update_traces(
+                marker=dict(size=20, color=SECONDARY_COLOR, line=dict(width=2, color='white'), opacity=0.8),
+                mode='markers+text',
+                text=scatter_data['year_label'],
+                textposition='top center',
+                textfont=dict(size=11, color='#2C3E50')
+            )
+            scatter_fig.update_layout(
+                showlegend=False,
+                hovermode='closest',
+                xaxis=dict(rangemode='tozero'),
+                yaxis=dict(rangemode='tozero')
+            )
+    except Exception as e:
+        scatter_fig = {'layout': {'title': f'Error: {str(e)}', 'template': CHART_TEMPLATE}}
+    return scatter_fig
+
+
+def px_ghg_emissions_chart(filtered_df, selected_country):
+    try:
+        ghg_data = filtered_df[['year', 'greenhouse_gas_emissions']].dropna()
+
+        if ghg_data.empty:
+            ghg_fig = px.bar(
+                title=f"Greenhouse Gas Emissions - {selected_country} (No data available)",
+                template=CHART_TEMPLATE
+            )
+            ghg_fig.add_annotation(
+                text="No greenhouse gas emissions data available for selected period",
+                xref="paper", yref="paper",
+                x=0.5, y=0.5, showarrow=False,
+                font=dict(size=14, color='gray')
+            )
+        else:
+            ghg_fig = px.bar(
+                ghg_data,
+                x="year",
+                y="greenhouse_gas_emissions",
+                title=f"Greenhouse Gas Emissions - {selected_country}",
+                labels={'year': 'Year', 'greenhouse_gas_emissions': 'GHG Emissions (Million Tonnes CO₂)'},
+                template=CHART_TEMPLATE
+            )
+            ghg_fig.update_traces(marker_color=ACCENT_COLOR)
+            ghg_fig.update_layout(yaxis=dict(rangemode='tozero'))
+    except Exception as e:
+        ghg_fig = {'layout': {'title': f'Error: {str(e)}', 'template': CHART_TEMPLATE}}
+    return ghg_fig
+
+
+def px_comparison_chart(comparison, selected_energy_sources, measure):
+    try:
+        if comparison is None:
+            comparison_fig = {'layout': {'title': 'Select Countries and Energy Sources', 'template': CHART_TEMPLATE}}
+        else:
+            entities, years, values = comparison
+            has_value = ~np.isnan(values.ravel())
+            comparison_df = pd.DataFrame({
+                'year': np.tile(years, len(entities))[has_value],
+                'Country': np.repeat(entities, len(years))[has_value],
+                'value': values.ravel()[has_value],
+            })
+
+            if comparison_df.empty:
+                comparison_fig = {'layout': {'title': 'No data available for selected countries', 'template': CHART_TEMPLATE}}
+            else:
+                sources_label = ', '.join(SOURCE_LABELS[source] for source in selected_energy_sources)
+                comparison_fig = px.line(
+                    comparison_df,
+                    x='year',
+                    y='value',
+                    color='Country',
+                    title=f'{MEASURE_LABELS[measure]} - {sources_label}',
+                    labels={'year': 'Year', 'value': MEASURE_LABELS[measure], 'Country': 'Country / Region'},
+                    template=CHART_TEMPLATE,
+                    color_discrete_sequence=px.colors.qualitative.Bold
+                )
+                comparison_fig.update_traces(line_width=2.5)
+                comparison_fig.update_traces(selector={'name': 'Combined'}, line_dash='dash', line_color=PRIMARY_COLOR)
+                comparison_fig.update_layout(hovermode='x unified', legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1), yaxis=dict(rangemode='tozero'))
+    except Exception as e:
+        comparison_fig = {'layout': {'title': f'Error: {str(e)}', 'template': CHART_TEMPLATE}}
+    return comparison_fig
+
+
+# chart -> (px builder, dict builder)
+SOURCE_CHARTS = {
+    'pie': (px_pie_chart, app.build_pie_chart),
+    'trend': (px_trend_chart, app.build_trend_chart),
+    'stacked area': (px_stacked_area_chart, app.build_stacked_area_chart),
+    'stream': (px_stream_graph, app.build_stream_graph),
+}
+COUNTRY_CHARTS = {
+    'primary line': (px_primary_energy_line_chart, app.build_primary_energy_line_chart),
+    'gdp scatter': (px_gdp_vs_energy_scatter, app.build_gdp_vs_energy_scatter),
+    'ghg bar': (px_ghg_emissions_chart, app.build_ghg_emissions_chart),
+}
+
+
+def to_json(figure):
+    return json.loads(pio.json.to_json_plotly(figure))
+
+
+def differences(expected, actual, path=''):
+    """Paths where two figures' JSON differ, with both values."""
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        for key in sorted(set(expected) | set(actual)):
+            if key not in actual or key not in expected:
+                yield f'{path}/{key} only in {"px" if key in expected else "dict"}'
+            else:
+                yield from differences(expected[key], actual[key], f'{path}/{key}')
+    elif isinstance(expected, list) and isinstance(actual, list) and len(expected) == len(actual):
+        for i, (a, b) in enumerate(zip(expected, actual)):
+            yield from differences(a, b, f'{path}[{i}]')
+    elif expected != actual:
+        yield f'{path}: {str(expected)[:60]} != {str(actual)[:60]}'
+
+
+def assert_same_figure(px_build, dict_build, *args):
+    assert list(differences(to_json(px_build(*args)), to_json(dict_build(*args)))) == []
+
+
+@pytest.mark.parametrize('sources', SOURCE_SETS, ids=['3 sources', 'all sources', '1 source', 'no sources'])
+@pytest.mark.parametrize('year_range', YEAR_RANGES, ids=lambda years: '{}-{}'.format(*years))
+@pytest.mark.parametrize('country', COUNTRIES)
+@pytest.mark.parametrize('chart', SOURCE_CHARTS)
+def test_source_chart(chart, country, year_range, sources):
+    source_data = app.build_source_data(app.filter_country_years(country, year_range), sources)
+    assert_same_figure(*SOURCE_CHARTS[chart], source_data, country, sources)
+
+
+@pytest.mark.parametrize('year_range', YEAR_RANGES, ids=lambda years: '{}-{}'.format(*years))
+@pytest.mark.parametrize('country', COUNTRIES)
+@pytest.mark.parametrize('chart', COUNTRY_CHARTS)
+def test_country_chart(chart, country, year_range):
+    assert_same_figure(*COUNTRY_CHARTS[chart], app.filter_country_years(country, year_range), country)
+
+
+@pytest.mark.parametrize('rollup', [False, True], ids=['', 'rollup'])
+@pytest.mark.parametrize('measure', list(MEASURE_LABELS))
+@pytest.mark.parametrize('year_range', YEAR_RANGES, ids=lambda years: '{}-{}'.format(*years))
+@pytest.mark.parametrize('entities', COMPARISON_SETS, ids=['no countries', 'world', 'continents'])
+def test_comparison_chart(entities, year_range, measure, rollup):
+    sources = SOURCE_SETS[0]
+    comparison = app.compare_countries(entities, sources, year_range, measure, rollup) if entities else None
+    assert_same_figure(px_comparison_chart, app.build_comparison_chart, comparison, sources, measure)